@@ -0,0 +1,78 @@
+"""Provider racing against two local stub servers, with and without hedging.
+
+Needs no Ollama, no Groq key and no network. Run from the repository root:
+
+    python -m benchmarks.bench_hedging
+    python -m benchmarks.bench_hedging --primary-ms 1500 --jitter-ms 1200 --secondary-ms 300 --runs 30
+    python -m benchmarks.bench_hedging --bad-primary
+
+The primary is ChatOllama against one stub and the secondary is ChatGroq
+against the OpenAI-compatible endpoint of another. Each instruction is
+generated through the command graph once with the primary alone and once
+with the race; the report gives p50/p95 latency of both, how often the
+race hedged and which provider won.
+"""
+import argparse
+import json
+import threading
+import time
+from langchain_core.messages import HumanMessage
+from benchmarks.bench_pipeline import percentiles
+from benchmarks.fake_llm import load_responses
+from benchmarks.ollama_stub import StubState, serve
+from core.command_graph import create_command_graph
+from core.provider_race import get_provider_latency
+
+MODEL = "stub-model"
+
+def start_stub(port: int, state: StubState):
+    server = serve(port, state)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(graph, instructions, runs):
+    samples = []
+    failures = 0
+    for index in range(runs):
+        instruction = instructions[index % len(instructions)]
+        state = {"messages": [HumanMessage(content=instruction)], "command": "", "status": "", "context": {}}
+        started = time.perf_counter()
+        result = graph.invoke(state, {"configurable": {}})
+        samples.append((time.perf_counter() - started) * 1000)
+        failures += result.get("status") != "completed"
+    return {**percentiles(samples), "failed": failures}
+
+def main():
+    parser = argparse.ArgumentParser(description="Hedged provider racing benchmark")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--primary-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=700, help="+/- variation of the primary's latency")
+    parser.add_argument("--secondary-ms", type=float, default=400)
+    parser.add_argument("--percentile", type=float, default=0.75)
+    parser.add_argument("--bad-primary", action="store_true", help="primary replies are not JSON")
+    parser.add_argument("--port", type=int, default=11600)
+    args = parser.parse_args()
+
+    primary = start_stub(args.port, StubState(
+        [MODEL], reply_seconds=args.primary_ms / 1000, reply_jitter=args.jitter_ms / 1000,
+        bad_replies=args.bad_primary
+    ))
+    secondary = start_stub(args.port + 1, StubState([MODEL], reply_seconds=args.secondary_ms / 1000))
+    common = {"model_name": MODEL, "ollama_url": f"http://127.0.0.1:{args.port}", "llm_timeout": 30}
+    hedge = {
+        "provider": "groq", "api_key": "stub", "groq_url": f"http://127.0.0.1:{args.port + 1}",
+        "percentile": args.percentile, "initial_delay": args.primary_ms / 1000
+    }
+    instructions = list(load_responses())
+
+    report = {"primary_only": run(create_command_graph("ollama", **common), instructions, args.runs)}
+    graph = create_command_graph("ollama", hedge=hedge, **common)
+    report["hedged"] = run(graph, instructions, args.runs)
+    report["hedged"]["secondary_requests"] = secondary.state.replies
+    report["providers"] = get_provider_latency().stats()
+    print(json.dumps(report, indent=2))
+    for server in (primary, secondary):
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Throughput benchmark for the executor's output reader.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_output_reader --mb 50
+    python -m benchmarks.bench_output_reader --mb 5 --legacy
+
+--legacy runs the previous per-line shell.expect() loop for comparison.
+"""
+import argparse
+import json
+import re
+import resource
+import time
+import pexpect
+from core.output_reader import OutputReader
+from core.shell_pool import ShellSession
+
+LINE = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor"
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def run_reader(session: ShellSession, command: str):
+    received = [0]
+
+    def on_output(text):
+        received[0] += len(text)
+
+    reader = OutputReader(session.shell, session.sentinel)
+    session.shell.sendline(command)
+    exit_code = reader.read_until_prompt(on_output, lambda kind, message: None)
+    return received[0], exit_code
+
+def run_legacy(session: ShellSession, command: str):
+    ansi_escape = re.compile(r'(\x9B|\x1B\[)[0-?]*[ -\/]*[@-~]')
+    received = 0
+    session.shell.sendline(command)
+    while True:
+        index = session.shell.expect([session.sentinel_re, pexpect.EOF, '\n'], timeout=None)
+        if session.shell.before:
+            received += len(ansi_escape.sub('', session.shell.before).strip())
+        if index in (0, 1):
+            return received, None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=50, help="megabytes of output to generate")
+    parser.add_argument("--legacy", action="store_true", help="benchmark the per-line expect loop")
+    args = parser.parse_args()
+
+    size = int(args.mb * 1024 * 1024)
+    command = f"yes '{LINE}' | head -c {size}"
+    session = ShellSession()
+    try:
+        cpu_start = cpu_seconds()
+        start = time.perf_counter()
+        received, exit_code = (run_legacy if args.legacy else run_reader)(session, command)
+        elapsed = time.perf_counter() - start
+        cpu = cpu_seconds() - cpu_start
+    finally:
+        session.close()
+
+    print(json.dumps({
+        "engine": "legacy-expect" if args.legacy else "chunked-reader",
+        "bytes": size,
+        "received_chars": received,
+        "exit_code": exit_code,
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(size / elapsed / 1024 / 1024, 2),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_per_mb": round(cpu / args.mb, 4)
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Offline end-to-end latency benchmark with a fake LLM and recorded shell output.
+
+Needs no API key, no Ollama server and no display. Run from the
+repository root:
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --output bench.json
+    python -m benchmarks.bench_pipeline --baseline bench.json --tolerance 0.25
+
+Stages, each reported as p50/p95/p99/mean in milliseconds:
+
+    compile   create_command_graph() with the fake provider
+    invoke    graph.invoke() per recorded reply, streaming and repairs included
+    parse     parse_command_sequence() on the recorded replies (one is
+              deliberately malformed, so "failed" is expected to be non-zero)
+    execute   CommandExecutor over recorded and synthetic transcripts
+
+Recorded transcripts are replayed by cat-ing their saved output through a
+pooled shell, so the reader sees the original bytes. With --baseline the
+run exits with status 1 when a stage's p50 is slower than the baseline by
+more than the tolerance.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from langchain_core.messages import HumanMessage
+from benchmarks.fake_llm import FIXTURES, register_fake_provider
+from core.command_graph import create_command_graph
+from core.command_executor import CommandExecutor
+from core.json_extract import parse_command_sequence
+from core.multiple_command_model import CommandSequence
+from core.shell_pool import ShellPool
+
+TRANSCRIPTS_FILE = os.path.join(FIXTURES, "transcripts.json")
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+    return {
+        "n": len(ordered),
+        "p50_ms": round(rank(50), 3),
+        "p95_ms": round(rank(95), 3),
+        "p99_ms": round(rank(99), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3)
+    }
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000, result
+
+def bench_compile(runs):
+    return percentiles([timed(create_command_graph, "fake")[0] for _ in range(runs)])
+
+def bench_invoke(responses, runs):
+    graph = create_command_graph("fake")
+    samples = []
+    failures = 0
+    for _ in range(runs):
+        for instruction in responses:
+            state = {"messages": [HumanMessage(content=instruction)], "command": "", "status": "", "context": {}}
+            elapsed, result = timed(graph.invoke, state, {"configurable": {"on_entry": lambda entry: None}})
+            samples.append(elapsed)
+            failures += result.get("status") != "completed"
+    return {**percentiles(samples), "failed": failures}
+
+def bench_parse(responses, runs):
+    samples = []
+    failures = 0
+    for _ in range(runs):
+        for raw in responses.values():
+            started = time.perf_counter()
+            try:
+                parse_command_sequence(raw)
+            except ValueError:
+                failures += 1
+            samples.append((time.perf_counter() - started) * 1000)
+    return {**percentiles(samples), "failed": failures}
+
+def transcript_sequence(transcript, scratch):
+    """Build a CommandSequence that replays the transcript's recorded output"""
+    commands = []
+    for index, step in enumerate(transcript["commands"]):
+        command = step["command"]
+        if "output" in step:
+            path = os.path.join(scratch, f"{transcript['name']}-{index}.out")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(step["output"] * step.get("repeat", 1))
+            command = f"cat {path}"
+        commands.append({"order": index + 1, "command": command})
+    return CommandSequence(commands=commands, total_commands=len(commands))
+
+def bench_execute(transcripts, runs, max_workers):
+    pool = ShellPool(spares=0)
+    report = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="nida-bench-") as scratch:
+            for transcript in transcripts:
+                sequence = transcript_sequence(transcript, scratch)
+                samples = []
+                output_bytes = 0
+                # The first, untimed run spawns the shells the timed runs reuse.
+                for run in range(runs + 1):
+                    executor = CommandExecutor(
+                        sequence, session_id=transcript["name"], shell_pool=pool, max_workers=max_workers
+                    )
+                    elapsed, _ = timed(executor.run)
+                    if run:
+                        samples.append(elapsed)
+                    output_bytes = sum(result.output_bytes for result in executor.results)
+                median_s = statistics.median(samples) / 1000
+                report[transcript["name"]] = {
+                    **percentiles(samples),
+                    "output_bytes": output_bytes,
+                    "mb_per_s": round(output_bytes / median_s / 1e6, 2) if median_s else None
+                }
+    finally:
+        pool.close_all()
+    return report
+
+def flatten(report):
+    """Map stage name -> p50 for baseline comparison"""
+    flat = {}
+    for stage, data in report.items():
+        if "p50_ms" in data:
+            flat[stage] = data["p50_ms"]
+        else:
+            flat.update({f"{stage}.{name}": item["p50_ms"] for name, item in data.items()})
+    return flat
+
+def regressions(report, baseline, tolerance):
+    current, previous = flatten(report), flatten(baseline)
+    return {
+        stage: {"baseline_ms": previous[stage], "current_ms": value}
+        for stage, value in current.items()
+        if stage in previous and previous[stage] > 0 and value > previous[stage] * (1 + tolerance)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--compile-runs", type=int, default=20)
+    parser.add_argument("--invoke-runs", type=int, default=10)
+    parser.add_argument("--parse-runs", type=int, default=200)
+    parser.add_argument("--exec-runs", type=int, default=3)
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated model latency per call")
+    parser.add_argument("--stages", default="compile,invoke,parse,execute")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare p50s against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    stages = set(args.stages.split(","))
+
+    responses = register_fake_provider(latency_ms=args.llm_latency_ms)
+    with open(TRANSCRIPTS_FILE, encoding="utf-8") as f:
+        transcripts = json.load(f)
+
+    report = {}
+    if "compile" in stages:
+        report["compile"] = bench_compile(args.compile_runs)
+    if "invoke" in stages:
+        report["invoke"] = bench_invoke(responses, args.invoke_runs)
+    if "parse" in stages:
+        report["parse"] = bench_parse(responses, args.parse_runs)
+    if "execute" in stages:
+        report["execute"] = bench_execute(transcripts, args.exec_runs, args.max_workers)
+
+    result = {"python": sys.version.split()[0], "stages": report}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["stages"]
+        result["regressions"] = regressions(report, baseline, args.tolerance)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result.get("regressions") else 0)
+
+if __name__ == "__main__":
+    main()
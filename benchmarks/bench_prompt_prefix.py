@@ -0,0 +1,158 @@
+"""Prompt-eval benchmark: legacy interleaved prompt vs stable prefix.
+
+Needs a running Ollama server with the model pulled. Run from the
+repository root:
+
+    python -m benchmarks.bench_prompt_prefix --model llama3.2
+    python -m benchmarks.bench_prompt_prefix --model llama3.2 --turns 12 --url http://localhost:11434
+
+Replays the same simulated session twice. The legacy mode sends the old
+single-string prompt, in which context and history sit inside the
+instructions, through /api/generate. The stable mode sends the static
+system prompt plus a per-turn user message through /api/chat. For each
+turn it records Ollama's prompt_eval_count (only the tokens that were not
+reused from the cache) and prompt_eval_duration, and it prints a JSON
+summary.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import requests
+
+from core.prompt_builder import PromptBuilder, remember_turn
+from core.prompts import SYSTEM_PROMPT, TURN_PROMPT
+
+LEGACY_PROMPT = '''You are a Linux command generator. Convert user requests into JSON-formatted command sequences.
+    Previous commands history (for context):
+    {history}
+    Format your response EXACTLY as a JSON object with this structure:
+    {{
+        "commands": [
+            {{
+                "order": 1,
+                "command": "actual command here",
+                "needs_dir_change": 0,
+                "needs_file_check": 0
+            }}
+        ],
+        "total_commands": 1
+    }}
+
+    Rules:
+    - Return ONLY the JSON, no other text
+    - Order must start from 1
+    - Split chained commands (using &&) into separate command entries
+    - needs_dir_change must be 1 for cd commands, 0 otherwise
+    - needs_file_check must be 1 for file operations, 0 otherwise
+    - Each command must be a single, complete, executable bash command
+    - DO NOT use &&, ||, or ; to chain commands - use separate entries instead
+
+    Example:
+    Instead of:
+    "command": "touch file.txt && echo 'text' > file.txt"
+
+    Use:
+    "commands": [
+        {{"order": 1, "command": "touch file.txt", "needs_dir_change": 0, "needs_file_check": 1}},
+        {{"order": 2, "command": "echo 'text' > file.txt", "needs_dir_change": 0, "needs_file_check": 1}}
+    ]
+
+    Context: {context}
+    Command History: {history}
+    Request: {user_input}
+    '''
+
+SESSION = [
+    ("create a folder called demo", ["mkdir demo"]),
+    ("go into demo", ["cd demo"]),
+    ("create notes.txt with hello in it", ["touch notes.txt", "echo 'hello' > notes.txt"]),
+    ("show the contents of notes.txt", ["cat notes.txt"]),
+    ("list files with sizes", ["ls -lh"]),
+    ("count lines in notes.txt", ["wc -l notes.txt"]),
+    ("copy notes.txt to backup.txt", ["cp notes.txt backup.txt"]),
+    ("show disk usage of this folder", ["du -sh ."]),
+]
+
+def request_options(num_predict):
+    return {"num_predict": num_predict, "temperature": 0}
+
+def legacy_request(url, model, instruction, history, num_predict):
+    history_text = "\n".join(
+        f"Instruction: {turn['instruction']}\nCommands: {turn['commands']}" for turn in history
+    )
+    context = {"command_history": history, "last_sequence": history[-1]["commands"] if history else None}
+    prompt = LEGACY_PROMPT.format(context=str(context), history=history_text, user_input=instruction)
+    response = requests.post(f"{url}/api/generate", json={
+        "model": model, "prompt": prompt, "stream": False, "options": request_options(num_predict)
+    }, timeout=600)
+    response.raise_for_status()
+    return response.json()
+
+def stable_request(url, model, instruction, context, builder, num_predict):
+    turn, _ = builder.build(instruction, context)
+    response = requests.post(f"{url}/api/chat", json={
+        "model": model,
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": turn}],
+        "stream": False,
+        "options": request_options(num_predict)
+    }, timeout=600)
+    response.raise_for_status()
+    return response.json()
+
+def run_mode(mode, url, model, turns, num_predict):
+    builder = PromptBuilder(TURN_PROMPT, prefix=SYSTEM_PROMPT)
+    history = []
+    context = {}
+    samples = []
+    for index in range(turns):
+        instruction, commands = SESSION[index % len(SESSION)]
+        if mode == "legacy":
+            data = legacy_request(url, model, instruction, history, num_predict)
+        else:
+            data = stable_request(url, model, instruction, context, builder, num_predict)
+        history.append({"instruction": instruction, "commands": commands})
+        context = remember_turn(context, instruction, commands)
+        samples.append({
+            "turn": index + 1,
+            "prompt_eval_count": data.get("prompt_eval_count", 0),
+            "prompt_eval_ms": round(data.get("prompt_eval_duration", 0) / 1e6, 2),
+            "total_ms": round(data.get("total_duration", 0) / 1e6, 2)
+        })
+    # The first turn pays a cold prefix in both modes; compare the rest.
+    warm = samples[1:] or samples
+    return {
+        "turns": samples,
+        "median_prompt_eval_count": statistics.median(s["prompt_eval_count"] for s in warm),
+        "median_prompt_eval_ms": round(statistics.median(s["prompt_eval_ms"] for s in warm), 2),
+        "median_total_ms": round(statistics.median(s["total_ms"] for s in warm), 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Stable prompt prefix benchmark")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--url", default=os.getenv("OLLAMA_HOST", "http://localhost:11434"))
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--num-predict", type=int, default=64)
+    parser.add_argument("--verbose", action="store_true", help="include per-turn samples")
+    args = parser.parse_args()
+    url = args.url if args.url.startswith("http") else f"http://{args.url}"
+
+    try:
+        report = {mode: run_mode(mode, url, args.model, args.turns, args.num_predict) for mode in ("legacy", "stable")}
+    except requests.RequestException as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(2)
+
+    legacy, stable = report["legacy"], report["stable"]
+    report["speedup_prompt_eval"] = round(
+        legacy["median_prompt_eval_ms"] / stable["median_prompt_eval_ms"], 2
+    ) if stable["median_prompt_eval_ms"] else None
+    if not args.verbose:
+        for mode in ("legacy", "stable"):
+            report[mode].pop("turns")
+    print(json.dumps({"model": args.model, **report}, indent=2))
+
+if __name__ == "__main__":
+    main()
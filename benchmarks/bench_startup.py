@@ -0,0 +1,82 @@
+"""Startup import-time benchmark and regression guard.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-ms 250 --runs 5
+
+Imports main under ``python -X importtime`` in a fresh interpreter,
+reports the slowest modules and fails (exit code 1) when the median
+startup import time exceeds the budget or when a module that should only
+load during background warm-up is imported eagerly.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFERRED_MODULES = [
+    "langgraph",
+    "langchain_groq",
+    "langchain_ollama",
+    "core.nodes_graph",
+    "core.ai_engine",
+    "ui.setup_window",
+]
+
+def measure_once():
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, env=env
+    )
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not parts[1].isdigit():
+            continue
+        modules[parts[2].strip()] = int(parts[1])
+    return process.returncode, modules
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup import-time benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=300.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    totals = []
+    modules = {}
+    for _ in range(args.runs):
+        returncode, modules = measure_once()
+        if returncode != 0 or "main" not in modules:
+            print(json.dumps({"error": "import main failed"}))
+            sys.exit(2)
+        totals.append(modules["main"] / 1000)
+
+    eager = sorted(
+        name for name in modules
+        if any(name == deferred or name.startswith(deferred + ".") for deferred in DEFERRED_MODULES)
+    )
+    median_ms = statistics.median(totals)
+    report = {
+        "runs": args.runs,
+        "median_ms": round(median_ms, 1),
+        "min_ms": round(min(totals), 1),
+        "budget_ms": args.budget_ms,
+        "slowest_modules_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        },
+        "eagerly_imported_deferred_modules": eager,
+        "ok": median_ms <= args.budget_ms and not eager
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Deterministic chat model that replays recorded replies, for offline benchmarks.
+
+    from benchmarks.fake_llm import register_fake_provider
+    register_fake_provider()
+    graph = create_command_graph("fake")
+
+Replies are looked up by the instruction on the prompt's "Request:" line.
+Unknown instructions and repair turns get DEFAULT_RESPONSE.
+"""
+import json
+import os
+import re
+import time
+from typing import Dict
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from core.api_client import LLMClient
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+RESPONSES_FILE = os.path.join(FIXTURES, "responses.json")
+REQUEST_LINE = re.compile(r'^Request: (.*)$', re.MULTILINE)
+DEFAULT_RESPONSE = json.dumps({
+    "commands": [{"order": 1, "command": "ls -la", "needs_dir_change": 0, "needs_file_check": 0}],
+    "total_commands": 1
+})
+
+class RecordedChatModel(BaseChatModel):
+    responses: Dict[str, str] = {}
+    default_response: str = DEFAULT_RESPONSE
+    latency_ms: float = 0.0
+    chunk_chars: int = 16
+
+    @property
+    def _llm_type(self) -> str:
+        return "recorded"
+
+    def reply_for(self, messages) -> str:
+        match = REQUEST_LINE.search(messages[-1].content)
+        if match is None:
+            return self.default_response
+        return self.responses.get(match.group(1).strip(), self.default_response)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply_for(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        text = self.reply_for(messages)
+        for start in range(0, len(text), self.chunk_chars):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text[start:start + self.chunk_chars]))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+def load_responses(path: str = RESPONSES_FILE) -> Dict[str, str]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def register_fake_provider(name: str = "fake", responses: Dict[str, str] = None, latency_ms: float = 0.0):
+    responses = load_responses() if responses is None else responses
+    LLMClient.register_provider(
+        name, lambda **kwargs: RecordedChatModel(responses=responses, latency_ms=latency_ms)
+    )
+    return responses
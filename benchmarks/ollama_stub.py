@@ -0,0 +1,335 @@
+"""Minimal stand-in for the Ollama HTTP API, for exercising the model manager offline.
+
+    python -m benchmarks.ollama_stub --port 11500 --pull-mb 64 --pull-seconds 5
+    OLLAMA_HOST=http://127.0.0.1:11500 python main.py
+
+Serves /api/version, /api/tags, /api/ps, /api/show, /api/delete, a streamed
+/api/pull that reports per-layer progress the way Ollama does, and
+/api/chat and /api/generate with the recorded replies used by fake_llm.
+Pulled models are kept in memory only. A model named "missing" fails to
+pull with the error Ollama gives for unknown models.
+
+/openai/v1/chat/completions answers in the OpenAI format Groq uses, so
+ChatGroq can be pointed at the stub with groq_url. --reply-ms delays
+every chat reply and --bad-replies makes them unparseable, for
+exercising provider racing. /openai/v1/models lists the models and
+refuses the API key "bad". --tpm enforces a tokens-per-minute limit the
+way Groq does: x-ratelimit-* headers on every completion and 429 with
+retry-after once the budget is spent.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.fake_llm import DEFAULT_RESPONSE, load_responses
+
+REQUEST_LINE = re.compile(r'^Request: (.*)$', re.MULTILINE)
+
+def canonical(name: str) -> str:
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+class StubState:
+    def __init__(self, models=(), pull_bytes: int = 64 * 1024 * 1024, pull_seconds: float = 2.0, layers: int = 3,
+                 reply_seconds: float = 0.0, reply_jitter: float = 0.0, bad_replies: bool = False,
+                 tokens_per_minute: int = 0):
+        self.lock = threading.Lock()
+        self.models = {canonical(name): self.describe(canonical(name), pull_bytes) for name in models}
+        self.loaded = set()
+        self.pull_bytes = pull_bytes
+        self.pull_seconds = pull_seconds
+        self.layers = layers
+        self.reply_seconds = reply_seconds
+        self.reply_jitter = reply_jitter
+        self.bad_replies = bad_replies
+        self.replies = 0
+        self.responses = load_responses()
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens_left = float(tokens_per_minute)
+        self.tokens_updated = time.monotonic()
+        self.rate_limited = 0
+
+    def token_budget(self) -> tuple:
+        """Tokens left, refilled continuously over a minute, and seconds until full again; call with lock held"""
+        now = time.monotonic()
+        per_second = self.tokens_per_minute / 60
+        self.tokens_left = min(self.tokens_per_minute, self.tokens_left + (now - self.tokens_updated) * per_second)
+        self.tokens_updated = now
+        return int(self.tokens_left), (self.tokens_per_minute - self.tokens_left) / per_second
+
+    def charge(self, tokens: int):
+        with self.lock:
+            if self.tokens_per_minute:
+                self.token_budget()
+                self.tokens_left -= tokens
+
+    def reply_text(self, messages) -> str:
+        """Recorded reply for the last message's "Request:" line, after the configured delay"""
+        with self.lock:
+            self.replies += 1
+        time.sleep(max(0.0, self.reply_seconds + random.uniform(-self.reply_jitter, self.reply_jitter)))
+        content = messages[-1].get("content", "") if messages else ""
+        if not content:
+            return ""
+        if self.bad_replies:
+            return "Sorry, I cannot produce JSON right now."
+        match = REQUEST_LINE.search(content)
+        return self.responses.get(match.group(1).strip(), DEFAULT_RESPONSE) if match else DEFAULT_RESPONSE
+
+    @staticmethod
+    def describe(name: str, size: int) -> dict:
+        return {
+            "name": name, "model": name, "size": size, "digest": "sha256:" + hashlib.sha256(name.encode("utf-8")).hexdigest(),
+            "modified_at": "2024-01-01T00:00:00Z",
+            "details": {"family": "stub", "parameter_size": "1B", "quantization_level": "Q4_0"}
+        }
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    def body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def send_json(self, data: dict, status: int = 200):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def stream(self, data: dict):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self.send_json({"version": "0.0.0-stub"})
+        elif self.path == "/api/tags":
+            with self.state.lock:
+                self.send_json({"models": list(self.state.models.values())})
+        elif self.path == "/openai/v1/models":
+            if self.headers.get("Authorization") == "Bearer bad":
+                self.send_json({"error": {"message": "Invalid API Key", "type": "invalid_request_error",
+                                          "code": "invalid_api_key"}}, 401)
+                return
+            with self.state.lock:
+                models = [{"id": name.split(":")[0], "object": "model", "owned_by": "stub"} for name in self.state.models]
+            self.send_json({"object": "list", "data": models})
+        elif self.path == "/api/ps":
+            with self.state.lock:
+                loaded = [
+                    {**self.state.models[name], "size": self.state.models[name]["size"] * 5 // 4, "size_vram": 0}
+                    for name in self.state.loaded if name in self.state.models
+                ]
+            self.send_json({"models": loaded})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_DELETE(self):
+        name = canonical(self.body().get("model", ""))
+        with self.state.lock:
+            found = self.state.models.pop(name, None)
+            self.state.loaded.discard(name)
+        self.send_json({} if found else {"error": f"model '{name}' not found"}, 200 if found else 404)
+
+    def do_POST(self):
+        body = self.body()
+        if self.path == "/api/pull":
+            self.pull(body)
+        elif self.path == "/api/show":
+            model = self.state.models.get(canonical(body.get("model", "")))
+            self.send_json(model or {"error": "model not found"}, 200 if model else 404)
+        elif self.path in ("/api/chat", "/api/generate"):
+            self.reply(body)
+        elif self.path == "/openai/v1/chat/completions":
+            self.openai_reply(body)
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def pull(self, body: dict):
+        name = canonical(body.get("model", ""))
+        self.start_stream()
+        self.stream({"status": "pulling manifest"})
+        if name.startswith("missing:"):
+            self.stream({"error": "pull model manifest: file does not exist"})
+            self.end_stream()
+            return
+        state = self.state
+        layer_bytes = state.pull_bytes // state.layers
+        steps = 20
+        for layer in range(state.layers):
+            digest = f"sha256:{layer:064x}"
+            for step in range(steps + 1):
+                self.stream({
+                    "status": f"pulling {digest[7:19]}", "digest": digest,
+                    "total": layer_bytes, "completed": layer_bytes * step // steps
+                })
+                time.sleep(state.pull_seconds / state.layers / steps)
+        for status in ("verifying sha256 digest", "writing manifest", "success"):
+            self.stream({"status": status})
+        with state.lock:
+            state.models[name] = state.describe(name, layer_bytes * state.layers)
+        self.end_stream()
+
+    def reply(self, body: dict):
+        name = canonical(body.get("model", ""))
+        with self.state.lock:
+            if name not in self.state.models:
+                missing = True
+            else:
+                missing = False
+                self.state.loaded.add(name)
+        if missing:
+            self.send_json({"error": f"model '{name}' not found"}, 404)
+            return
+        text = self.state.reply_text(body.get("messages") or [{"content": body.get("prompt", "")}])
+        final = {
+            "model": name, "created_at": "2024-01-01T00:00:00Z", "done": True, "done_reason": "stop",
+            "total_duration": 1000000, "load_duration": 100000, "prompt_eval_count": 1, "prompt_eval_duration": 100000,
+            "eval_count": 1, "eval_duration": 100000
+        }
+        content_key = "message" if self.path == "/api/chat" else "response"
+
+        def content(part):
+            return {"role": "assistant", "content": part} if content_key == "message" else part
+
+        if not body.get("stream", True):
+            self.send_json({**final, content_key: content(text)})
+            return
+        self.start_stream()
+        for start in range(0, len(text), 16):
+            self.stream({"model": name, "created_at": final["created_at"], content_key: content(text[start:start + 16]),
+                         "done": False})
+        self.stream({**final, content_key: content("")})
+        self.end_stream()
+
+    def rate_limit_headers(self) -> dict:
+        state = self.state
+        if not state.tokens_per_minute:
+            return {}
+        with state.lock:
+            remaining, reset = state.token_budget()
+        return {
+            "x-ratelimit-limit-tokens": str(state.tokens_per_minute),
+            "x-ratelimit-remaining-tokens": str(max(0, remaining)),
+            "x-ratelimit-reset-tokens": f"{reset:.2f}s"
+        }
+
+    def openai_reply(self, body: dict):
+        messages = body.get("messages") or []
+        # Roughly four characters per token, like the tokenizers of the models Groq serves
+        prompt_tokens = sum(len(message.get("content") or "") for message in messages) // 4 + 1
+        state = self.state
+        if state.tokens_per_minute:
+            with state.lock:
+                remaining, reset = state.token_budget()
+                limited = remaining < prompt_tokens
+                if limited:
+                    state.rate_limited += 1
+                    retry = (prompt_tokens - remaining) / (state.tokens_per_minute / 60)
+            if limited:
+                payload = json.dumps({"error": {
+                    "message": f"Rate limit reached on tokens per minute (TPM): Limit {state.tokens_per_minute}, "
+                               f"Used {state.tokens_per_minute - remaining}, Requested {prompt_tokens}. "
+                               f"Please try again in {retry:.2f}s.",
+                    "type": "tokens", "code": "rate_limit_exceeded"
+                }}).encode("utf-8")
+                self.send_response(429)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("retry-after", str(max(1, round(retry))))
+                for name, value in self.rate_limit_headers().items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+        text = state.reply_text(messages)
+        completion_tokens = len(text) // 4 + 1
+        state.charge(prompt_tokens + completion_tokens)
+        model = body.get("model", "stub")
+        if not body.get("stream"):
+            payload = json.dumps({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens}
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in self.rate_limit_headers().items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self.send_response(200)
+        for name, value in self.rate_limit_headers().items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(text), 16):
+            self.send_event({"choices": [{"index": 0, "delta": {"content": text[start:start + 16]}, "finish_reason": None}]},
+                            model)
+        self.send_event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}, model)
+        data = b"data: [DONE]\n\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.end_stream()
+
+    def send_event(self, data: dict, model: str):
+        event = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": model, **data}
+        line = f"data: {json.dumps(event)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+def serve(port: int, state: StubState) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama HTTP API")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--model", action="append", default=[], help="model present at start (repeatable)")
+    parser.add_argument("--pull-mb", type=float, default=64)
+    parser.add_argument("--pull-seconds", type=float, default=2.0)
+    parser.add_argument("--reply-ms", type=float, default=0.0, help="delay before every chat reply")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random +/- variation of that delay")
+    parser.add_argument("--bad-replies", action="store_true", help="answer chats with text that is not JSON")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute before answering 429 (0: no limit)")
+    args = parser.parse_args()
+    server = serve(args.port, StubState(
+        args.model, int(args.pull_mb * 1024 * 1024), args.pull_seconds, reply_seconds=args.reply_ms / 1000,
+        reply_jitter=args.jitter_ms / 1000, bad_replies=args.bad_replies, tokens_per_minute=args.tpm
+    ))
+    print(f"stub Ollama API on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
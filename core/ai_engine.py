@@ -1,31 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
 from langchain_core.messages import HumanMessage
+from core.api_client import OllamaTimingHandler
 from core.command_graph import create_command_graph
+from core.command_cache import CommandCache
+from core.example_store import get_example_store
+from core.multiple_command_model import CommandSequence
+from core.prompt_builder import remember_turn
+from core.generation_stats import get_generation_stats
+from core.shell_pool import get_shell_pool
+from core.tracing import configure_langsmith, get_tracer
 
 class CommandProcessor:
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, cache: CommandCache = None, session_id: str = "default"):
         self.config = config
+        self.session_id = session_id
         self.graph = create_command_graph(
             provider=config["provider"],
             model_name=config.get("model_name"),
-            api_key=config.get("api_key")
+            api_key=config.get("api_key"),
+            keep_alive=config.get("keep_alive"),
+            ollama_options=config.get("ollama_options"),
+            prompt_budget=config.get("prompt_budget"),
+            structured_output=config.get("structured_output"),
+            llm_timeout=config.get("llm_timeout"),
+            ollama_url=config.get("ollama_url"),
+            groq_url=config.get("groq_url"),
+            hedge=config.get("hedge"),
+            groq_limits=config.get("groq_limits"),
+            usage_session=session_id
         )
+        configure_langsmith(config.get("langsmith"))
         self.context = {}
-    
-    def generate_command(self, prompt: str):
+        self.cache = cache
+        self.history_window = config.get("cache_history_window", 0)
+        self.instructions = []
+        self.last_from_cache = False
+        self.reused_from = None
+        self.last_timings = {}
+        self.trace_id = None
+
+    def cache_key(self, prompt: str) -> str:
+        history = self.instructions[-self.history_window:] if self.history_window else []
+        return CommandCache.make_key(
+            prompt,
+            self.config["provider"],
+            self.config.get("model_name") or "",
+            cwd=get_shell_pool().session_cwd(self.session_id) or self.config.get("cwd") or os.getcwd(),
+            history=history
+        )
+
+    def generate_command(self, prompt: str, bypass_cache: bool = False, on_entry=None, cancel_event=None):
+        tracer = get_tracer()
+        self.trace_id = tracer.new_trace()
+        with tracer.span("request", provider=self.config["provider"]) as attrs:
+            command = self.generate(prompt, bypass_cache, on_entry, cancel_event)
+            attrs["cached"] = self.last_from_cache
+            attrs["reused"] = self.reused_from is not None
+        return command
+
+    def remember(self, prompt: str, sequence: CommandSequence):
+        """Record a turn answered without the graph"""
+        self.context = {
+            **remember_turn(self.context, prompt, sequence),
+            "last_sequence": sequence.model_dump()
+        }
+        self.instructions.append(prompt)
+
+    def generate(self, prompt: str, bypass_cache: bool = False, on_entry=None, cancel_event=None):
+        self.last_from_cache = False
+        self.reused_from = None
+        self.last_timings = {}
+        key = None
+        if self.cache is not None and self.config.get("use_cache", True):
+            key = self.cache_key(prompt)
+            if not bypass_cache:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.last_from_cache = True
+                    self.remember(prompt, cached)
+                    return cached
+
+        examples = []
+        if self.config.get("examples", True):
+            store = get_example_store(self.config)
+            with get_tracer().span("example_lookup") as attrs:
+                matches = store.search(prompt)
+                attrs["matches"] = len(matches)
+            duplicate = None if bypass_cache else store.near_duplicate(prompt, matches)
+            if duplicate is not None:
+                self.reused_from = duplicate["instruction"]
+                # Not cached under this instruction: a wrong reuse must not outlive the one offer
+                self.remember(prompt, duplicate["sequence"])
+                return duplicate["sequence"]
+            examples = store.few_shot(matches)
+
         config = {
             "messages": [HumanMessage(content=prompt)],  
             "command": "",
             "status": "",
-            "context": self.context  
+            "context": {**self.context, "examples": examples},
+            "trace_id": self.trace_id
         }
-        result = self.graph.invoke(config)
+        timings = OllamaTimingHandler()
+        result = self.graph.invoke(config, {
+            "configurable": {"on_entry": on_entry, "cancel_event": cancel_event},
+            "callbacks": [timings]
+        })
+        self.last_timings = timings.last
         self.context = result.get("context", {})
-        return result.get("command")
+        self.context.pop("examples", None)
+        self.instructions.append(prompt)
+        command = result.get("command")
+        attempts = result.get("attempts", 0)
+        error = result.get("error", "")
+        try:
+            get_generation_stats().record(
+                self.config["provider"], self.config.get("model_name") or "",
+                parse_failed=attempts > 0 or bool(error), attempts=attempts,
+                ok=result.get("status") == "completed"
+            )
+        except sqlite3.Error:
+            pass
+        if error:
+            raise ValueError(f"Could not parse the model reply after {attempts} repair attempts: {error}")
+
+        # Only sequences that passed validate_command; an "invalid" route still returns its command
+        if key is not None and command and result.get("status") == "completed":
+            try:
+                self.cache.put(key, prompt, command)
+            except Exception:
+                pass
+        return command
+
+GRAPH_CONFIG_KEYS = (
+    "provider", "model_name", "api_key", "keep_alive", "ollama_options",
+    "prompt_budget", "structured_output", "langsmith", "llm_timeout", "ollama_url", "groq_url", "hedge",
+    "groq_limits"
+)
+
+_processors = {}
+_processors_lock = threading.Lock()
+_cache = None
+
+def get_cache() -> CommandCache:
+    global _cache
+    with _processors_lock:
+        if _cache is None:
+            _cache = CommandCache()
+        return _cache
+
+def cache_stats() -> dict:
+    return get_cache().stats()
+
+def config_signature(config: dict) -> str:
+    return json.dumps({key: config.get(key) for key in GRAPH_CONFIG_KEYS}, sort_keys=True, default=str)
+
+def get_processor(session_id: str, config: dict):
+    """Return (processor, lock) for a session, rebuilding the processor when its config changed.
+
+    Callers hold the lock while generating; processors of different
+    sessions run concurrently.
+    """
+    cache = get_cache()
+    signature = config_signature(config)
+    with _processors_lock:
+        entry = _processors.get(session_id)
+        if entry is None or entry[2] != signature:
+            processor = CommandProcessor(config, cache=cache, session_id=session_id)
+            if entry is not None:
+                processor.context = entry[0].context
+                processor.instructions = entry[0].instructions
+            entry = _processors[session_id] = (processor, entry[1] if entry else threading.Lock(), signature)
+        entry[0].config = config
+        return entry[0], entry[1]
+
+def fork_processor(source_id: str, target_id: str, config: dict):
+    """Start target_id's processor from the conversation context and history of source_id's"""
+    source, lock = get_processor(source_id, config)
+    target, _ = get_processor(target_id, config)
+    with lock:
+        target.context = dict(source.context)
+        target.instructions = list(source.instructions)
+
+def release_processor(session_id: str):
+    with _processors_lock:
+        _processors.pop(session_id, None)
 
-_processor = None
+def session_count() -> int:
+    return len(_processors)
 
-def generate_command(prompt: str, config: dict):
-    global _processor
-    if _processor is None:
-        _processor = CommandProcessor(config)
-    return _processor.generate_command(prompt)
\ No newline at end of file
+def generate_command(prompt: str, config: dict, bypass_cache: bool = False, on_entry=None,
+                     session_id: str = "default", cancel_event=None):
+    processor, lock = get_processor(session_id, config)
+    with lock:
+        return processor.generate_command(prompt, bypass_cache=bypass_cache, on_entry=on_entry,
+                                          cancel_event=cancel_event)
@@ -1,36 +1,101 @@
+import requests
 from langchain_groq import ChatGroq
-from langchain_ollama import OllamaLLM
+from langchain_ollama import ChatOllama
+from langchain_core.callbacks import BaseCallbackHandler
+from core.groq_scheduler import GROQ_API_BASE, ScheduledChatGroq, get_groq_http_client, get_groq_scheduler
+from core.ollama_installer import DEFAULT_KEEP_ALIVE, DEFAULT_OLLAMA_OPTIONS, runtime_options
+from core.multiple_command_model import CommandSequence
 from typing import Union, Tuple
 
+OLLAMA_TIMING_FIELDS = ("load_duration", "prompt_eval_duration", "eval_duration", "total_duration")
+
+class OllamaTimingHandler(BaseCallbackHandler):
+    """Keep Ollama's load / prompt-eval / generation timings of the last request it saw.
+
+    Pass a new handler in the callbacks of each call, so concurrent calls
+    do not overwrite each other's numbers.
+    """
+
+    def __init__(self):
+        self.last = {}
+
+    def on_llm_end(self, response, **kwargs):
+        try:
+            info = response.generations[0][0].generation_info or {}
+        except (IndexError, AttributeError):
+            return
+        if "load_duration" not in info:
+            return
+        timings = {field: (info.get(field) or 0) / 1e9 for field in OLLAMA_TIMING_FIELDS}
+        timings["prompt_eval_count"] = info.get("prompt_eval_count") or 0
+        timings["eval_count"] = info.get("eval_count") or 0
+        self.last = timings
+
 class LLMClient:
-    DEFAULT_GROQ_MODEL = "llama3-8b-8192" 
+    DEFAULT_GROQ_MODEL = "llama-3.1-8b-instant"
+    PROVIDERS = {}
+    DEFAULT_KEEP_ALIVE = DEFAULT_KEEP_ALIVE
+    # Seconds before a model request is abandoned
+    DEFAULT_TIMEOUT = 120
+    DEFAULT_OLLAMA_OPTIONS = DEFAULT_OLLAMA_OPTIONS
     
     @staticmethod
-    def validate_groq_key(api_key: str) -> Tuple[bool, str]:
-        """Validate Groq API key by attempting to create a client"""
+    def validate_groq_key(api_key: str, base_url: str = None) -> Tuple[bool, str]:
+        """Validate Groq API key by listing models, which spends no tokens"""
         try:
-            client = ChatGroq(
-                api_key=api_key,
-                model=LLMClient.DEFAULT_GROQ_MODEL
+            response = requests.get(
+                f"{(base_url or GROQ_API_BASE).rstrip('/')}/openai/v1/models",
+                headers={"Authorization": f"Bearer {api_key}"},
+                timeout=15
             )
-            response = client.invoke("test")
-            if response:
-                return True, "API key is valid"
-            return False, "Could not validate API key"
-        except Exception as e:
-            if "authentication" in str(e).lower():
-                return False, "Invalid API key"
-            elif "quota" in str(e).lower():
-                return False, "API quota exceeded"
+        except requests.RequestException as e:
             return False, f"API error: {str(e)}"
+        if response.status_code == 200:
+            return True, "API key is valid"
+        if response.status_code in (401, 403):
+            return False, "Invalid API key"
+        if response.status_code == 429:
+            return False, "API quota exceeded, try again later"
+        return False, f"API error: HTTP {response.status_code}"
         
     @staticmethod
-    def get_llm(provider: str, **kwargs) -> Union[OllamaLLM, ChatGroq]:
+    def register_provider(name: str, factory):
+        """Register factory(**kwargs) -> chat model under a provider name, e.g. for offline benchmarks"""
+        LLMClient.PROVIDERS[name] = factory
+
+    @staticmethod
+    def get_llm(provider: str, **kwargs) -> Union[ChatOllama, ChatGroq]:
+        if provider in LLMClient.PROVIDERS:
+            return LLMClient.PROVIDERS[provider](**kwargs)
+        # None picks the provider default: on for Ollama, whose schema-constrained replies
+        # still stream, off for Groq, where JSON mode turns streaming off
+        structured = kwargs.get("structured_output")
+        timeout = kwargs.get("llm_timeout") or LLMClient.DEFAULT_TIMEOUT
         if provider == "ollama":
-            return OllamaLLM(model=kwargs.get("model_name", "llama2"))
+            return ChatOllama(
+                model=kwargs.get("model_name", "llama2"),
+                keep_alive=kwargs.get("keep_alive") or LLMClient.DEFAULT_KEEP_ALIVE,
+                format=CommandSequence.model_json_schema() if structured is not False else None,
+                client_kwargs={"timeout": timeout},
+                base_url=kwargs.get("ollama_url"),
+                **runtime_options(kwargs.get("ollama_options"))
+            )
         elif provider == "groq":
-            return ChatGroq(
+            # Requests queue on the key's scheduler instead of retrying 429s inside the SDK.
+            # Groq's JSON mode does not stream, so with it stream() falls back to a single chunk
+            structured = bool(structured)
+            scheduler = get_groq_scheduler(kwargs.get("api_key"), kwargs.get("groq_limits"),
+                                           kwargs.get("groq_max_wait") or 120.0)
+            return ScheduledChatGroq(
                 api_key=kwargs.get("api_key"),
-                model_name=LLMClient.DEFAULT_GROQ_MODEL
+                model_name=kwargs.get("model_name") or LLMClient.DEFAULT_GROQ_MODEL,
+                model_kwargs={"response_format": {"type": "json_object"}} if structured else {},
+                disable_streaming=structured,
+                request_timeout=timeout,
+                base_url=kwargs.get("groq_url"),
+                max_retries=0,
+                http_client=get_groq_http_client(),
+                scheduler=scheduler,
+                usage_session=kwargs.get("usage_session") or "default"
             )
         raise ValueError(f"Unsupported provider: {provider}")
\ No newline at end of file
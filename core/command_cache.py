@@ -0,0 +1,123 @@
+import sqlite3
+import hashlib
+import json
+import threading
+import time
+from typing import Optional
+from core.multiple_command_model import CommandSequence
+
+class CommandCache:
+    """Persistent instruction -> CommandSequence cache with LRU/TTL eviction"""
+
+    def __init__(self, db_path="command_cache.db", max_entries=500, ttl_seconds=7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.setup_database()
+
+    def setup_database(self):
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS command_cache (
+                key TEXT PRIMARY KEY,
+                instruction TEXT NOT NULL,
+                sequence TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_command_cache_last_used ON command_cache (last_used)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def normalize(instruction: str) -> str:
+        return " ".join(instruction.lower().split()).rstrip(".!?")
+
+    @staticmethod
+    def make_key(instruction: str, provider: str, model: str, cwd: str = "", history=None) -> str:
+        payload = json.dumps({
+            "instruction": CommandCache.normalize(instruction),
+            "provider": provider or "",
+            "model": model or "",
+            "cwd": cwd or "",
+            "history": [CommandCache.normalize(h) for h in (history or [])]
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CommandSequence]:
+        now = time.time()
+        with self.lock:
+            self.cursor.execute(
+                "SELECT sequence, created_at FROM command_cache WHERE key = ?",
+                (key,)
+            )
+            row = self.cursor.fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                try:
+                    sequence = CommandSequence.model_validate_json(row[0])
+                except Exception:
+                    sequence = None
+                if sequence is not None and sequence.commands:
+                    self.cursor.execute(
+                        "UPDATE command_cache SET last_used = ? WHERE key = ?",
+                        (now, key)
+                    )
+                    self.conn.commit()
+                    self.hits += 1
+                    return sequence
+            if row:
+                self.cursor.execute("DELETE FROM command_cache WHERE key = ?", (key,))
+                self.conn.commit()
+            self.misses += 1
+            return None
+
+    def put(self, key: str, instruction: str, sequence: CommandSequence):
+        if isinstance(sequence, dict):
+            sequence = CommandSequence(**sequence)
+        now = time.time()
+        with self.lock:
+            self.cursor.execute(
+                "INSERT OR REPLACE INTO command_cache (key, instruction, sequence, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, instruction, sequence.model_dump_json(), now, now)
+            )
+            self.evict(now)
+            self.conn.commit()
+
+    def evict(self, now: float):
+        self.cursor.execute(
+            "DELETE FROM command_cache WHERE created_at < ?",
+            (now - self.ttl_seconds,)
+        )
+        self.cursor.execute('''
+            DELETE FROM command_cache WHERE key IN (
+                SELECT key FROM command_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,))
+
+    def clear(self):
+        with self.lock:
+            self.cursor.execute("DELETE FROM command_cache")
+            self.conn.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            self.cursor.execute("SELECT COUNT(*) FROM command_cache")
+            entries = self.cursor.fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def __del__(self):
+        if hasattr(self, 'conn'):
+            self.conn.close()
@@ -0,0 +1,386 @@
+import os
+import threading
+import time
+import pexpect
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import List, Optional
+from core.command_scheduler import CommandPlan, uses_sudo
+from core.multiple_command_model import CommandSequence
+from core.output_reader import OutputReader
+from core.output_store import OutputStore
+from core.resource_usage import ResourceMonitor
+from core.shell_pool import get_shell_pool
+from core.tracing import get_tracer, span
+
+@dataclass
+class PromptInfo:
+    type: str
+    message: str
+    options: List[str] = None
+
+# Characters of each step's output kept on its CommandResult
+RESULT_TAIL_CHARS = 4096
+# Started in a validated shell so it shares that terminal's sudo timestamp; its pid
+# is kept in the shell so the run can stop it, and it also ends with the shell
+SUDO_KEEPALIVE = (
+    "{{ while sleep {interval} && kill -0 $$ && sudo -n -v; do :; done & }} >/dev/null 2>&1; "
+    "NIDA_SUDO_KEEPALIVE=$!; disown $NIDA_SUDO_KEEPALIVE 2>/dev/null"
+)
+SUDO_RELEASE = "kill $NIDA_SUDO_KEEPALIVE 2>/dev/null; unset NIDA_SUDO_KEEPALIVE; sudo -k"
+
+@dataclass
+class CommandResult:
+    order: int
+    command: str
+    exit_code: Optional[int]
+    output: str
+    duration: float = 0.0
+    output_bytes: int = 0
+    interrupted: Optional[str] = None
+    user_cpu: Optional[float] = None
+    system_cpu: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+
+    def usage(self) -> dict:
+        """Exit status and resource figures, as logged and returned by the daemon"""
+        return {
+            "order": self.order,
+            "command": self.command,
+            "exit_code": self.exit_code,
+            "duration": round(self.duration, 4),
+            "user_cpu": self.user_cpu,
+            "system_cpu": self.system_cpu,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "output_bytes": self.output_bytes,
+            "interrupted": self.interrupted
+        }
+
+class OrderedOutput:
+    """Forward per-step output in step order, buffering steps that run ahead.
+
+    Buffers are OutputStores, so a step that runs ahead with a lot of
+    output spills to disk instead of growing in memory.
+    """
+
+    def __init__(self, orders: List[int], emit):
+        self.orders = sorted(orders)
+        self.emit = emit
+        self.index = 0
+        self.buffers = {}
+        self.finished = set()
+        self.lock = threading.Lock()
+
+    def write(self, order: int, text: str):
+        with self.lock:
+            if self.index < len(self.orders) and order == self.orders[self.index]:
+                self.emit(text)
+            else:
+                buffer = self.buffers.get(order)
+                if buffer is None:
+                    buffer = self.buffers[order] = OutputStore()
+                buffer.append(text)
+
+    def finish(self, order: int):
+        with self.lock:
+            self.finished.add(order)
+            while self.index < len(self.orders) and self.orders[self.index] in self.finished:
+                self.index += 1
+                buffer = self.buffers.pop(self.orders[self.index], None) if self.index < len(self.orders) else None
+                if buffer is not None:
+                    for page in buffer.iter_pages():
+                        self.emit(page)
+                    buffer.discard()
+
+class CommandExecutor:
+    """Run a CommandSequence on pooled shells, reporting through plain callbacks.
+
+    Needs no Qt event loop, so the GUI thread wrapper and the headless
+    daemon share it. on_output(text) and on_prompt(PromptInfo) are called
+    from worker threads. Everything sent to on_output is also kept in
+    self.output, an OutputStore that run() returns.
+
+    cancel(), command_timeout and sequence_timeout stop the running
+    command's whole process group, keep its partial output and skip the
+    steps that have not started.
+
+    With sudo_session, a plan that uses sudo validates it once up front on
+    the primary shell, runs its sudo steps there and keeps the timestamp
+    fresh every sudo_refresh seconds, so later steps do not prompt again.
+    The keep-alive is stopped and the timestamp dropped when the run ends.
+    """
+
+    def __init__(self, command_sequence: CommandSequence, session_id: str = "default", shell_pool=None,
+                 max_workers: int = 1, trace_id: str = None, on_output=None, on_prompt=None,
+                 command_timeout: float = None, sequence_timeout: float = None, sudo_session: bool = False,
+                 sudo_refresh: float = 60):
+        self.emit_output = on_output or (lambda text: None)
+        self.output = OutputStore()
+        self.on_prompt = on_prompt or (lambda prompt_info: None)
+        self.command_sequence = command_sequence
+        self.session_id = session_id
+        self.trace_id = trace_id
+        self.shell_pool = shell_pool or get_shell_pool()
+        self.max_workers = max(1, max_workers)
+        self.command_timeout = command_timeout or None
+        self.sequence_timeout = sequence_timeout or None
+        self.sudo_session = sudo_session
+        self.sudo_refresh = sudo_refresh
+        self.sudo_validated = False
+        self.cancel_event = threading.Event()
+        self.deadline = None
+        self.current_command = 0
+        self.results = []
+        self.duration = 0.0
+        self.response = None
+        self.response_ready = threading.Condition()
+        self.current_dir = None 
+        self.prompt_lock = threading.Lock()
+        self.helpers = []
+        self.helper_count = 0
+        self.helpers_lock = threading.Lock()
+        self.primary = None
+        self.state_path = None
+        self.state_version = 0
+        self.synced = {}
+
+    def on_output(self, text: str):
+        self.output.append(text)
+        self.emit_output(text)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+        with self.response_ready:
+            self.response_ready.notify_all()
+
+    def run(self) -> OutputStore:
+        session = None
+        results = {}
+        started_at = time.monotonic()
+        if self.sequence_timeout:
+            self.deadline = started_at + self.sequence_timeout
+        try:
+            with span("shell_acquire", trace_id=self.trace_id, session_id=self.session_id):
+                session = self.shell_pool.acquire(self.session_id)
+            self.primary = session
+            plan = CommandPlan(self.command_sequence.commands)
+            workers = 1 if plan.is_sequential() else self.max_workers
+            output = OrderedOutput([entry.order for entry in plan.commands], self.on_output)
+            if workers > 1:
+                self.on_output(f"⚡ Running independent steps on up to {workers} shells")
+                self.refresh_state(session)
+            pinned = set()
+            if self.sudo_session and any(uses_sudo(entry) for entry in plan.commands):
+                if self.validate_sudo(session):
+                    pinned = {entry.order for entry in plan.commands if uses_sudo(entry)}
+
+            free = [session]
+            running = {}
+            done, started = set(), set()
+            aborted = False
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                while running or (not aborted and len(started) < len(plan.commands)):
+                    for entry in ([] if aborted else plan.ready(done, started)):
+                        if len(running) >= workers:
+                            break
+                        if plan.is_barrier(entry.order):
+                            if running:
+                                break
+                            shell_session = session
+                            free.remove(session)
+                        elif entry.order in pinned:
+                            if session not in free:
+                                continue
+                            shell_session = session
+                            free.remove(session)
+                        elif free:
+                            shell_session = session if session in free else free[0]
+                            free.remove(shell_session)
+                        else:
+                            shell_session = None
+                        started.add(entry.order)
+                        future = executor.submit(self.execute_step, shell_session, entry, output)
+                        running[future] = entry
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        entry = running.pop(future)
+                        shell_session, result = future.result()
+                        results[entry.order] = result
+                        done.add(entry.order)
+                        free.append(shell_session)
+                        if result.exit_code is None or result.interrupted:
+                            aborted = True
+                        elif plan.is_barrier(entry.order) and workers > 1:
+                            self.refresh_state(session)
+
+            self.results = [results[order] for order in sorted(results)]
+            skipped = len(plan.commands) - len(started)
+            if skipped:
+                self.on_output(f"⏭ Skipped {skipped} command(s) that had not started")
+
+        except Exception as e:
+            self.on_output(f"Error: {str(e)}")
+        finally:
+            if session is not None:
+                if self.sudo_validated:
+                    self.release_sudo(session)
+                self.shell_pool.release(self.session_id, session)
+            for helper_id, helper in self.helpers:
+                self.shell_pool.release(helper_id, helper)
+            if self.state_path:
+                os.remove(self.state_path)
+
+        self.duration = time.monotonic() - started_at
+        get_tracer().record("execute", self.duration, trace_id=self.trace_id, commands=len(self.results))
+        self.output.close()
+        return self.output
+
+    def refresh_state(self, session):
+        """Snapshot the primary shell's cwd/env for helper shells to pick up"""
+        if self.state_path:
+            os.remove(self.state_path)
+        self.state_path = session.snapshot()
+        self.state_version += 1
+
+    def helper_session(self):
+        with self.helpers_lock:
+            self.helper_count += 1
+            helper_id = f"{self.session_id}:{self.helper_count}"
+        with span("shell_acquire", trace_id=self.trace_id, session_id=helper_id):
+            helper = self.shell_pool.acquire(helper_id)
+        # Only shells that were actually acquired are released by run()
+        with self.helpers_lock:
+            self.helpers.append((helper_id, helper))
+        return helper
+
+    def stop_reason(self, started_at: float) -> Optional[str]:
+        if self.cancel_event.is_set():
+            return "cancelled"
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            return f"sequence timeout ({self.sequence_timeout:g}s)"
+        if self.command_timeout and now - started_at >= self.command_timeout:
+            return f"timeout ({self.command_timeout:g}s)"
+        return None
+
+    def execute_step(self, session, cmd_entry, output: OrderedOutput):
+        reason = self.stop_reason(time.monotonic())
+        if reason is not None:
+            output.finish(cmd_entry.order)
+            return session, CommandResult(cmd_entry.order, cmd_entry.command, None, "", interrupted=reason)
+        if session is None:
+            session = self.helper_session()
+        if session is not self.primary and self.synced.get(id(session)) != self.state_version:
+            session.restore(self.state_path)
+            self.synced[id(session)] = self.state_version
+
+        shell = session.shell
+        reader = OutputReader(shell, session.sentinel)
+
+        output.write(cmd_entry.order, f"\n🔄 Executing command {cmd_entry.order}/{self.command_sequence.total_commands}:")
+        output.write(cmd_entry.order, f"$ {cmd_entry.command}\n")
+
+        monitor = ResourceMonitor(shell.pid)
+        monitor.start()
+        started_at = time.monotonic()
+        shell.sendline(cmd_entry.command)
+        step_output = OutputStore(memory_chars=RESULT_TAIL_CHARS, tail_chars=RESULT_TAIL_CHARS, spill_dir=None)
+
+        def handle_output(text):
+            step_output.append(text)
+            output.write(cmd_entry.order, text)
+
+        exit_code = reader.read_until_prompt(
+            handle_output, lambda kind, message: self.answer_prompt(shell, kind, message, started_at),
+            should_stop=lambda: self.stop_reason(started_at), on_tick=monitor.sample
+        )
+        duration = time.monotonic() - started_at
+        usage = monitor.stop()
+        get_tracer().record(
+            "command", duration, trace_id=self.trace_id, status="ok" if exit_code == 0 else "error",
+            order=cmd_entry.order, exit_code=exit_code, **usage,
+            **({"interrupted": reader.interrupted} if reader.interrupted else {})
+        )
+
+        if reader.interrupted:
+            output.write(
+                cmd_entry.order,
+                f"⏹ Stopped after {duration:.1f}s: {reader.interrupted}"
+                + (" (the shell did not recover and was discarded)" if exit_code is None else "")
+            )
+        elif exit_code is None:
+            output.write(cmd_entry.order, "⚠️ Shell exited")
+        elif exit_code != 0:
+            output.write(cmd_entry.order, f"⚠️ Command exited with status {exit_code}")
+        output.finish(cmd_entry.order)
+
+        result = CommandResult(
+            cmd_entry.order, cmd_entry.command, exit_code, step_output.tail().rstrip("\n")[-RESULT_TAIL_CHARS:],
+            duration, output_bytes=step_output.size, interrupted=reader.interrupted, **usage
+        )
+        return session, result
+
+    def validate_sudo(self, session) -> bool:
+        """Authenticate sudo once on the primary shell and start its keep-alive loop there"""
+        shell = session.shell
+        reader = OutputReader(shell, session.sentinel)
+        started_at = time.monotonic()
+        self.on_output("🔐 Validating sudo for this session")
+        shell.sendline("sudo -v")
+        exit_code = reader.read_until_prompt(
+            self.on_output, lambda kind, message: self.answer_prompt(shell, kind, message, started_at),
+            should_stop=lambda: self.stop_reason(started_at)
+        )
+        if exit_code != 0:
+            if not reader.interrupted:
+                self.on_output("⚠️ sudo could not be validated; steps will ask for the password themselves")
+            return False
+        shell.sendline(SUDO_KEEPALIVE.format(interval=max(1, int(self.sudo_refresh))))
+        reader.read_until_prompt(self.on_output, lambda kind, message: None)
+        self.sudo_validated = True
+        return True
+
+    def release_sudo(self, session):
+        """Stop this run's keep-alive loop and drop the sudo timestamp, so later runs ask again"""
+        self.sudo_validated = False
+        if not session.isalive():
+            return
+        try:
+            session.shell.sendline(SUDO_RELEASE)
+            session.sync()
+        except (pexpect.TIMEOUT, pexpect.EOF):
+            pass
+
+    def answer_prompt(self, shell, kind: str, message: str, started_at: float):
+        """Forward a prompt to on_prompt and type the answer once send_response() delivers it"""
+        with self.prompt_lock:
+            with self.response_ready:
+                self.response = None
+            if kind == "password":
+                self.on_prompt(PromptInfo("password", message))
+            else:
+                self.on_prompt(PromptInfo("yesno", message, ["yes", "no"]))
+            response = self.wait_for_response(started_at)
+            if response is not None:
+                shell.sendline(response)
+
+    def wait_for_response(self, started_at: float) -> Optional[str]:
+        """Block until send_response() is called; None if the step is stopped first"""
+        with self.response_ready:
+            while self.response is None:
+                if self.stop_reason(started_at) is not None:
+                    return None
+                # Woken at once by send_response() or cancel(); the timeout only serves the deadlines
+                self.response_ready.wait(0.5)
+            response, self.response = self.response, None
+            return response
+
+    def send_response(self, text):
+        with self.response_ready:
+            self.response = text
+            self.response_ready.notify_all()
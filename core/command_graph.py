@@ -1,23 +1,31 @@
-from langchain_ollama import OllamaLLM
 from core.api_client import LLMClient
 from langgraph.graph import StateGraph, START, END
-from core.nodes_graph import ChatState, generate_command, validate_command, process_command
+from core.nodes_graph import ChatState, generate_command, repair_command, validate_command, process_command
+from core.prompt_builder import PromptBuilder
+from core.prompts import SYSTEM_PROMPT, TURN_PROMPT
 
 def create_command_graph(provider: str, **kwargs) -> StateGraph:
     workflow = StateGraph(ChatState)
     
     llm = LLMClient.get_llm(provider, **kwargs)
-    workflow.add_node("generate", lambda x: generate_command(x, llm))
+    if kwargs.get("hedge"):
+        from core.provider_race import create_race
+        llm = create_race(provider, llm, LLMClient.get_llm, **kwargs)
+    builder = PromptBuilder(TURN_PROMPT, prefix=SYSTEM_PROMPT, **(kwargs.get("prompt_budget") or {}))
+    workflow.add_node("generate", lambda x, config: generate_command(x, llm, config, builder))
+    workflow.add_node("repair", lambda x, config: repair_command(x, llm, config, builder))
     workflow.add_node("process", process_command)
     workflow.add_edge(START, "generate")
-    workflow.add_conditional_edges(
-        "generate",
-        validate_command,
-        {
-            "valid": "process",
-            "invalid": END
-        }
-    )
+    for node in ("generate", "repair"):
+        workflow.add_conditional_edges(
+            node,
+            validate_command,
+            {
+                "valid": "process",
+                "repair": "repair",
+                "invalid": END
+            }
+        )
     workflow.add_edge("process", END)
 
     return workflow.compile()
\ No newline at end of file
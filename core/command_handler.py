@@ -1,11 +1,15 @@
 from core.interactive_command import InteractiveCommandThread
 from core.multiple_command_model import CommandSequence
 
-def create_command_executor(command_sequence: CommandSequence) -> InteractiveCommandThread:
+def create_command_executor(command_sequence: CommandSequence, session_id: str = "default",
+                            max_workers: int = 1, trace_id: str = None, command_timeout: float = None,
+                            sequence_timeout: float = None, sudo_session: bool = False) -> InteractiveCommandThread:
     if not isinstance(command_sequence, CommandSequence):
         if isinstance(command_sequence, dict):
             command_sequence = CommandSequence(**command_sequence)
         else:
             raise ValueError(f"Invalid command sequence type: {type(command_sequence)}")
             
-    return InteractiveCommandThread(command_sequence)
\ No newline at end of file
+    return InteractiveCommandThread(command_sequence, session_id=session_id, max_workers=max_workers,
+                                    trace_id=trace_id, command_timeout=command_timeout,
+                                    sequence_timeout=sequence_timeout, sudo_session=sudo_session)
\ No newline at end of file
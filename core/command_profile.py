@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import threading
+from typing import List
+from core.command_scheduler import program_words, split_command
+
+def command_name(command: str) -> str:
+    """The program a command line runs, ignoring sudo/env wrappers and paths: "sudo /usr/bin/apt update" -> "apt" """
+    words = program_words(split_command(command))
+    return os.path.basename(words[0]) if words else ""
+
+class CommandProfile:
+    """Per-program totals of runs, failures, wall time, CPU, peak memory and output size"""
+
+    def __init__(self, db_path="command_profile.db"):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.setup_database()
+
+    def setup_database(self):
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS command_profile (
+                name TEXT PRIMARY KEY,
+                runs INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                total_duration REAL NOT NULL DEFAULT 0,
+                max_duration REAL NOT NULL DEFAULT 0,
+                total_user_cpu REAL NOT NULL DEFAULT 0,
+                total_system_cpu REAL NOT NULL DEFAULT 0,
+                max_rss_bytes INTEGER,
+                total_output_bytes INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self.conn.commit()
+
+    def record(self, results):
+        """Add the CommandResults of one run; steps that never started are skipped"""
+        rows = [
+            (
+                command_name(result.command), int(result.exit_code != 0), result.duration, result.duration,
+                result.user_cpu or 0.0, result.system_cpu or 0.0, result.peak_rss_bytes, result.output_bytes
+            )
+            for result in results if result.duration or result.exit_code is not None
+        ]
+        rows = [row for row in rows if row[0]]
+        if not rows:
+            return
+        with self.lock:
+            self.cursor.executemany('''
+                INSERT INTO command_profile (name, runs, failures, total_duration, max_duration, total_user_cpu,
+                                             total_system_cpu, max_rss_bytes, total_output_bytes)
+                VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    runs = runs + 1,
+                    failures = failures + excluded.failures,
+                    total_duration = total_duration + excluded.total_duration,
+                    max_duration = MAX(max_duration, excluded.max_duration),
+                    total_user_cpu = total_user_cpu + excluded.total_user_cpu,
+                    total_system_cpu = total_system_cpu + excluded.total_system_cpu,
+                    max_rss_bytes = MAX(COALESCE(max_rss_bytes, 0), COALESCE(excluded.max_rss_bytes, 0)),
+                    total_output_bytes = total_output_bytes + excluded.total_output_bytes
+            ''', rows)
+            self.conn.commit()
+
+    def stats(self, order_by: str = "total_duration", limit: int = 20) -> List[dict]:
+        """Most expensive programs first; order_by is runs, total_duration, cpu or max_rss_bytes"""
+        order = {
+            "runs": "runs", "total_duration": "total_duration", "max_rss_bytes": "max_rss_bytes",
+            "cpu": "total_user_cpu + total_system_cpu"
+        }.get(order_by, "total_duration")
+        with self.lock:
+            self.cursor.execute(
+                "SELECT name, runs, failures, total_duration, max_duration, total_user_cpu, total_system_cpu, "
+                f"max_rss_bytes, total_output_bytes FROM command_profile ORDER BY {order} DESC LIMIT ?",
+                (limit,)
+            )
+            rows = self.cursor.fetchall()
+        results = []
+        for name, runs, failures, total_duration, max_duration, user_cpu, system_cpu, max_rss, output_bytes in rows:
+            results.append({
+                "name": name,
+                "runs": runs,
+                "failures": failures,
+                "failure_rate": round(failures / runs, 4) if runs else 0.0,
+                "total_duration": round(total_duration, 3),
+                "mean_duration": round(total_duration / runs, 4) if runs else 0.0,
+                "max_duration": round(max_duration, 3),
+                "user_cpu": round(user_cpu, 3),
+                "system_cpu": round(system_cpu, 3),
+                "max_rss_bytes": max_rss or None,
+                "total_output_bytes": output_bytes
+            })
+        return results
+
+    def __del__(self):
+        if hasattr(self, 'conn'):
+            self.conn.close()
+
+_profile = None
+_profile_lock = threading.Lock()
+
+def get_command_profile() -> CommandProfile:
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            _profile = CommandProfile()
+        return _profile
@@ -0,0 +1,298 @@
+import os
+import shlex
+from typing import Dict, List, Optional, Set
+from core.multiple_command_model import CommandEntry
+
+SHELL_STATE_COMMANDS = {
+    "cd", "pushd", "popd", "export", "unset", "source", ".", "alias", "unalias",
+    "set", "shopt", "umask", "ulimit", "declare", "eval", "exec", "exit", "trap"
+}
+LOCK_GROUPS = {
+    "apt": "dpkg", "apt-get": "dpkg", "aptitude": "dpkg", "dpkg": "dpkg",
+    "yum": "rpm", "dnf": "rpm", "rpm": "rpm", "zypper": "rpm",
+    "pacman": "pacman", "snap": "snap", "brew": "brew",
+    "pip": "pip", "pip3": "pip", "npm": "npm", "systemctl": "systemd"
+}
+LOCK_FREE_SUBCOMMANDS = {"download", "source", "show", "search", "list", "info"}
+WRAPPERS = {"sudo", "env", "nice", "nohup", "time", "command"}
+# Programs that write what they fetch under names the command line need not spell out
+FETCHERS = {"wget", "curl", "git", "scp", "rsync", "aria2c", "svn", "hg", "ftp", "sftp"}
+CLONE_SUBCOMMANDS = {"clone", "checkout", "co", "export"}
+# Options of the fetchers above that take a value in the next word
+VALUE_OPTIONS = {
+    "git": {"-b", "--branch", "--depth", "-o", "--origin", "-c", "--config", "--reference",
+            "-j", "--jobs", "--template", "-u", "--upload-pack", "--filter", "-C"},
+    "hg": {"-r", "--rev", "-b", "--branch", "-u", "--updaterev", "-e", "--ssh"},
+    "svn": {"-r", "--revision", "--depth", "--username", "--password"},
+    "curl": {"-o", "--output", "--output-dir", "-d", "--data", "--data-binary", "-H", "--header",
+             "-A", "--user-agent", "-e", "--referer", "-X", "--request", "-F", "--form", "-T",
+             "--upload-file", "-u", "--user", "-r", "--range", "-m", "--max-time", "-x", "--proxy"},
+    "wget": {"-O", "--output-document", "-P", "--directory-prefix", "-o", "--output-file",
+             "-a", "--append-output", "-i", "--input-file", "-t", "--tries", "-T", "--timeout",
+             "-U", "--user-agent", "--header"},
+    "aria2c": {"-o", "--out", "-d", "--dir", "-i", "--input-file", "-x", "-s", "-j"},
+    "scp": {"-P", "-i", "-o", "-F", "-c", "-l", "-S", "-J"},
+    "rsync": {"-e", "--rsh", "--exclude", "--include", "--filter", "-f", "--port", "--timeout"},
+}
+REDIRECTS = {">", ">>", "<", "2>", "2>>", "&>", "&>>", "|", "||", "&&", ";", "&"}
+
+
+def split_command(command: str) -> List[str]:
+    try:
+        return shlex.split(command, comments=True)
+    except ValueError:
+        return command.split()
+
+
+def program_words(tokens: List[str]) -> List[str]:
+    """Strip sudo/env-style wrappers, their options and leading VAR=value assignments"""
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token in WRAPPERS or token.startswith("-") or ("=" in token and not token.startswith("=")):
+            index += 1
+            continue
+        break
+    return tokens[index:]
+
+
+def segment_heads(tokens: List[str]) -> List[str]:
+    """First word of every simple command in a (possibly chained) command line"""
+    heads = []
+    expect_head = True
+    for token in tokens:
+        if token in ("&&", "||", ";", "|", "&"):
+            expect_head = True
+        elif expect_head:
+            heads.append(token)
+            expect_head = False
+    return heads
+
+
+def command_segments(tokens: List[str]) -> List[List[str]]:
+    """Words of every simple command in a (possibly chained) command line, wrappers stripped"""
+    segments = [[]]
+    for token in tokens:
+        if token in ("&&", "||", ";", "|", "&"):
+            segments.append([])
+        else:
+            segments[-1].append(token)
+    return [program_words(words) for words in segments if program_words(words)]
+
+
+def is_shell_state_change(entry: CommandEntry) -> bool:
+    if entry.needs_dir_change:
+        return True
+    for head in segment_heads(split_command(entry.command)):
+        if head in SHELL_STATE_COMMANDS or ("=" in head and not head.startswith("=")):
+            return True
+    return False
+
+
+def uses_sudo(entry: CommandEntry) -> bool:
+    return "sudo" in segment_heads(split_command(entry.command))
+
+
+def lock_group(entry: CommandEntry):
+    words = program_words(split_command(entry.command))
+    if not words:
+        return None
+    group = LOCK_GROUPS.get(os.path.basename(words[0]))
+    if group and len(words) > 1 and words[1] in LOCK_FREE_SUBCOMMANDS:
+        return None
+    return group
+
+
+def touched_paths(entry: CommandEntry) -> Set[str]:
+    words = program_words(split_command(entry.command))
+    paths = set()
+    for token in words[1:]:
+        if token in REDIRECTS or token.startswith("-"):
+            continue
+        for operator in (">>", ">", "<"):
+            if token.startswith(operator):
+                token = token[len(operator):]
+                break
+        token = token.rstrip(";&")
+        if not token or "://" in token or token.replace(".", "", 1).isdigit():
+            continue
+        if "/" in token or "." in token or token.startswith("~") or entry.needs_file_check:
+            paths.add(os.path.normpath(os.path.expanduser(token)))
+    return paths | (fetch_targets(entry) or set())
+
+
+def url_basename(url: str) -> str:
+    return os.path.basename(url.split("?")[0].split("#")[0].rstrip("/"))
+
+
+def fetch_arguments(words: List[str]):
+    """Split a fetcher's arguments into its options (with their values) and positional words"""
+    value_options = VALUE_OPTIONS.get(os.path.basename(words[0]), set())
+    options = {}
+    positional = []
+    index = 1
+    while index < len(words):
+        word = words[index]
+        if word.startswith("--") and "=" in word:
+            name, value = word.split("=", 1)
+            options[name] = value
+        elif word in value_options and index + 1 < len(words):
+            options[word] = words[index + 1]
+            index += 1
+        elif word.startswith("-") and len(word) > 2 and not word.startswith("--"):
+            # Short flags clustered as in `curl -sSLO` or `wget -qO file`
+            last = "-" + word[-1]
+            for flag in word[1:-1]:
+                options["-" + flag] = None
+            if last in value_options and index + 1 < len(words):
+                options[last] = words[index + 1]
+                index += 1
+            else:
+                options[last] = None
+        elif word.startswith("-"):
+            options[word] = None
+        else:
+            positional.append(word)
+        index += 1
+    return options, positional
+
+
+def fetch_target(words: List[str]) -> Optional[Set[str]]:
+    """Paths a download or clone writes without naming them, e.g. `repo` for `git clone URL/repo.git`.
+
+    An empty set means it writes nothing implicitly (to stdout, or a remote
+    destination); None means the target cannot be worked out.
+    """
+    program = os.path.basename(words[0])
+    options, positional = fetch_arguments(words)
+    if program in ("git", "hg", "svn"):
+        if not positional or positional[0] not in CLONE_SUBCOMMANDS or len(positional) < 2:
+            return None
+        name = positional[2] if len(positional) > 2 else url_basename(positional[1].split(":")[-1])
+        if name.endswith(".git") and len(positional) == 2:
+            name = name[:-len(".git")]
+        if not name:
+            return None
+        return {os.path.join(options["-C"], name) if options.get("-C") else name}
+    urls = [word for word in positional if "://" in word]
+    if program == "curl":
+        output = options.get("-o", options.get("--output"))
+        if output:
+            targets = {output}
+        elif "-O" in options or "--remote-name" in options:
+            targets = {url_basename(url) for url in urls}
+        else:
+            return set()
+        directory = options.get("--output-dir")
+        return {os.path.join(directory, target) for target in targets} if directory else targets
+    if program in ("wget", "aria2c"):
+        output = options.get("-O", options.get("--output-document", options.get("--out")))
+        if program == "aria2c":
+            output = options.get("-o", output)
+        if output == "-":
+            return set()
+        targets = {output} if output else {url_basename(url) or "index.html" for url in urls}
+        directory = options.get("-P", options.get("--directory-prefix", options.get("-d", options.get("--dir"))))
+        if directory:
+            targets = {os.path.join(directory, target) for target in targets}
+        return targets or None
+    if program in ("scp", "rsync") and len(positional) > 1:
+        destination = positional[-1]
+        if ":" in destination.split("/")[0]:
+            return set()
+        return {destination}
+    return None
+
+
+def fetch_targets(entry: CommandEntry) -> Optional[Set[str]]:
+    """Implicit outputs of every download in the step; None when one of them cannot be worked out"""
+    targets = set()
+    for words in command_segments(split_command(entry.command)):
+        if os.path.basename(words[0]) in FETCHERS:
+            target = fetch_target(words)
+        elif any("://" in word for word in words):
+            target = None
+        else:
+            continue
+        if target is None:
+            return None
+        targets.update(os.path.normpath(os.path.expanduser(path)) for path in target)
+    return targets
+
+
+def has_independent_target(entry: CommandEntry) -> bool:
+    """True when the step names what it works on (paths or packages for a lock-free subcommand)"""
+    words = program_words(split_command(entry.command))
+    if touched_paths(entry):
+        return True
+    return len(words) > 2 and words[1] in LOCK_FREE_SUBCOMMANDS
+
+
+def paths_overlap(first: Set[str], second: Set[str]) -> bool:
+    for a in first:
+        for b in second:
+            if any(c in a + b for c in "*?[") or a == b:
+                return True
+            if a.startswith(b.rstrip("/") + "/") or b.startswith(a.rstrip("/") + "/"):
+                return True
+    return False
+
+
+class CommandPlan:
+    """Conservative dependency graph over the steps of a CommandSequence.
+
+    A step waits for an earlier step when either changes shell state (cwd,
+    env), fetches a URL whose output cannot be worked out or names
+    nothing it works on, when both use the same
+    package-manager lock, or when they touch overlapping paths. Steps with
+    an explicit depends_on list use it as is.
+    """
+
+    def __init__(self, commands: List[CommandEntry]):
+        self.commands = sorted(commands, key=lambda entry: entry.order)
+        self.barriers = set()
+        self.serial = set()
+        self.dependencies: Dict[int, Set[int]] = {}
+        self.build()
+
+    def build(self):
+        seen = []
+        for entry in self.commands:
+            if is_shell_state_change(entry):
+                self.barriers.add(entry.order)
+                self.serial.add(entry.order)
+            elif fetch_targets(entry) is None or not has_independent_target(entry):
+                self.serial.add(entry.order)
+
+            if entry.depends_on is not None:
+                earlier_orders = {earlier.order for earlier in seen}
+                deps = {order for order in entry.depends_on if order in earlier_orders}
+            else:
+                deps = set()
+                group = lock_group(entry)
+                paths = touched_paths(entry)
+                for earlier in seen:
+                    if entry.order in self.serial or earlier.order in self.serial:
+                        deps.add(earlier.order)
+                    elif group and group == lock_group(earlier):
+                        deps.add(earlier.order)
+                    elif paths_overlap(paths, touched_paths(earlier)):
+                        deps.add(earlier.order)
+            self.dependencies[entry.order] = deps
+            seen.append(entry)
+
+    def is_barrier(self, order: int) -> bool:
+        return order in self.barriers
+
+    def ready(self, done: Set[int], started: Set[int]) -> List[CommandEntry]:
+        return [
+            entry for entry in self.commands
+            if entry.order not in started and self.dependencies[entry.order] <= done
+        ]
+
+    def is_sequential(self) -> bool:
+        orders = [entry.order for entry in self.commands]
+        return all(
+            previous in self.dependencies[current]
+            for previous, current in zip(orders, orders[1:])
+        )
@@ -1,20 +1,46 @@
+import threading
 from PyQt5.QtCore import QThread, pyqtSignal
-from core.ai_engine import generate_command
 from core.logger import log_action
 from core.multiple_command_model import CommandSequence
 
 class CommandThread(QThread):
     result_ready = pyqtSignal(str, object)  
+    entry_ready = pyqtSignal(object)
     error_signal = pyqtSignal(str)
+    cancelled_signal = pyqtSignal()
 
-    def __init__(self, instruction: str, config: dict):
+    def __init__(self, instruction: str, config: dict, bypass_cache: bool = False, session_id: str = "default"):
         super().__init__()
         self.instruction = instruction
+        self.session_id = session_id
         self.config = config
+        self.bypass_cache = bypass_cache
+        self.from_cache = False
+        self.reused_from = None
+        self.timings = {}
+        self.trace_id = None
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Abandon the model request at its next streamed chunk"""
+        self.cancel_event.set()
 
     def run(self):
         try:
-            command_sequence = generate_command(self.instruction, self.config)
+            from core.ai_engine import get_processor
+            from core.groq_scheduler import RateLimited
+            from core.nodes_graph import GenerationCancelled
+            processor, lock = get_processor(self.session_id, self.config)
+            with lock:
+                command_sequence = processor.generate_command(
+                    self.instruction, bypass_cache=self.bypass_cache,
+                    on_entry=self.entry_ready.emit if self.config.get("stream", True) else None,
+                    cancel_event=self.cancel_event
+                )
+                self.from_cache = processor.last_from_cache
+                self.reused_from = processor.reused_from
+                self.timings = processor.last_timings
+                self.trace_id = processor.trace_id
             
             if isinstance(command_sequence, dict):
                 command_sequence = CommandSequence(**command_sequence)
@@ -29,5 +55,12 @@ class CommandThread(QThread):
                 
             self.result_ready.emit(self.instruction, command_sequence)
             
+        except GenerationCancelled:
+            self.cancelled_signal.emit()
+        except RateLimited as e:
+            self.error_signal.emit(str(e))
         except Exception as e:
+            if self.cancel_event.is_set():
+                self.cancelled_signal.emit()
+                return
             self.error_signal.emit(f"Command generation error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,288 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+
+PROTOCOL_VERSION = 1
+MAX_MESSAGE_BYTES = 4 * 1024 * 1024
+
+def default_socket_path() -> str:
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "nida.sock")
+    return f"/tmp/nida-{os.getuid()}.sock"
+
+def send_message(wfile, message: dict):
+    wfile.write((json.dumps(message, default=str, ensure_ascii=False) + "\n").encode("utf-8"))
+    wfile.flush()
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """One client connection: newline-delimited JSON requests, answered in order.
+
+    Every request carries an "op" and an optional "id" that is echoed on
+    each reply. Long operations send {"event": ...} messages before the
+    final reply, which always has "ok".
+    """
+
+    def handle(self):
+        self.write_lock = threading.Lock()
+        while True:
+            line = self.rfile.readline(MAX_MESSAGE_BYTES)
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                self.reply({}, {"ok": False, "error": f"bad request: {e}"})
+                continue
+            handler = getattr(self.server.nida, f"op_{request.get('op')}", None)
+            if handler is None:
+                self.reply(request, {"ok": False, "error": f"unknown op: {request.get('op')}"})
+                continue
+            try:
+                result = handler(request, lambda event: self.reply(request, event))
+                self.reply(request, {"ok": True, **(result or {})})
+            except Exception as e:
+                self.reply(request, {"ok": False, "error": str(e)})
+            if request.get("op") == "shutdown":
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+    def reply(self, request: dict, message: dict):
+        if "id" in request:
+            message = {"id": request["id"], **message}
+        with self.write_lock:
+            try:
+                send_message(self.wfile, message)
+            except OSError:
+                pass
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class NidaDaemon:
+    """Headless server that keeps compiled command graphs and warm shells for local clients"""
+
+    def __init__(self, config: dict, socket_path: str = None):
+        self.config = config
+        self.socket_path = socket_path or default_socket_path()
+        self.started_at = time.time()
+        self.server = None
+        self.running = {}
+        self.running_lock = threading.Lock()
+
+    def processor(self, session_id: str):
+        from core.ai_engine import get_processor
+        return get_processor(session_id, self.config)
+
+    @contextmanager
+    def cancellable(self, session_id: str, cancel, respond=None):
+        """Make cancel() and respond(text) reachable by op_cancel and op_respond from another connection"""
+        controls = {"cancel": cancel, "respond": respond}
+        with self.running_lock:
+            self.running[session_id] = controls
+        try:
+            yield
+        finally:
+            with self.running_lock:
+                if self.running.get(session_id) is controls:
+                    del self.running[session_id]
+
+    def follow_client(self, session_id: str, request):
+        """Run the session's commands in the client's directory, and key its cache entries on it"""
+        from core.shell_pool import get_shell_pool
+        cwd = request.get("cwd")
+        if cwd is None:
+            return
+        if not os.path.isdir(cwd):
+            raise ValueError(f"cwd is not a directory: {cwd}")
+        get_shell_pool().set_directory(session_id, cwd)
+
+    def controls(self, request) -> dict:
+        with self.running_lock:
+            return self.running.get(request.get("session_id") or "default") or {}
+
+    def warm_up(self):
+        """Compile the default session's graph and spawn a shell before the first request"""
+        from core.shell_pool import get_shell_pool
+        self.processor("default")
+        get_shell_pool().prewarm()
+
+    def op_ping(self, request, emit):
+        from core.ai_engine import session_count
+        return {
+            "version": PROTOCOL_VERSION,
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started_at, 3),
+            "provider": self.config["provider"],
+            "model": self.config.get("model_name"),
+            "sessions": session_count()
+        }
+
+    def op_generate(self, request, emit):
+        from core.multiple_command_model import CommandSequence
+        from core.nodes_graph import GenerationCancelled
+        instruction = (request.get("instruction") or "").strip()
+        if not instruction:
+            raise ValueError("instruction is required")
+        session_id = request.get("session_id") or "default"
+        self.follow_client(session_id, request)
+        processor, lock = self.processor(session_id)
+        on_entry = (lambda entry: emit({"event": "entry", "entry": entry.model_dump()})) if request.get("stream") else None
+        cancel_event = threading.Event()
+        with lock, self.cancellable(session_id, cancel_event.set):
+            try:
+                sequence = processor.generate_command(
+                    instruction, bypass_cache=bool(request.get("bypass_cache")), on_entry=on_entry,
+                    cancel_event=cancel_event
+                )
+            except GenerationCancelled:
+                raise RuntimeError("generation cancelled") from None
+            cached, reused_from, trace_id = processor.last_from_cache, processor.reused_from, processor.trace_id
+        if isinstance(sequence, dict):
+            sequence = CommandSequence(**sequence)
+        if not sequence or not sequence.commands:
+            raise ValueError("No commands generated")
+        return {"sequence": sequence.model_dump(), "cached": cached, "reused_from": reused_from, "trace_id": trace_id}
+
+    def op_execute(self, request, emit):
+        from core.command_executor import CommandExecutor
+        from core.command_profile import get_command_profile
+        from core.example_store import get_example_store
+        from core.logger import log_action
+        from core.multiple_command_model import CommandSequence
+        sequence = CommandSequence(**request["sequence"])
+        session_id = request.get("session_id") or "default"
+        self.follow_client(session_id, request)
+        executor = CommandExecutor(
+            sequence,
+            session_id=session_id,
+            max_workers=self.config.get("max_parallel_commands", 4),
+            trace_id=request.get("trace_id"),
+            on_output=lambda text: emit({"event": "output", "text": text}),
+            on_prompt=lambda prompt: emit({"event": "prompt", "type": prompt.type, "message": prompt.message}),
+            command_timeout=request.get("command_timeout", self.config.get("command_timeout", 600)),
+            sequence_timeout=request.get("sequence_timeout", self.config.get("sequence_timeout")),
+            sudo_session=request.get("sudo_session", self.config.get("sudo_session", False))
+        )
+        with self.cancellable(session_id, executor.cancel, executor.send_response):
+            output = executor.run()
+        log_action(
+            request.get("instruction") or "", sequence, output,
+            results=executor.results, duration=executor.duration, session_id=session_id
+        )
+        get_command_profile().record(executor.results)
+        if self.config.get("examples", True):
+            get_example_store(self.config).record(request.get("instruction") or "", sequence, executor.results)
+        return {
+            "results": [result.usage() for result in executor.results],
+            "duration": round(executor.duration, 4),
+            "cancelled": executor.cancelled
+        }
+
+    def op_cancel(self, request, emit):
+        """Stop the generation or execution running for a session; sent on a second connection"""
+        cancel = self.controls(request).get("cancel")
+        if cancel is not None:
+            cancel()
+        return {"cancelled": cancel is not None}
+
+    def op_respond(self, request, emit):
+        """Answer the password or yes/no prompt a session's execute reported in a "prompt" event"""
+        respond = self.controls(request).get("respond")
+        if respond is None:
+            raise ValueError("no command is waiting for input in this session")
+        respond(request.get("text") or "")
+        return {}
+
+    def op_stats(self, request, emit):
+        from core.ai_engine import cache_stats
+        from core.command_profile import get_command_profile
+        from core.example_store import get_example_store
+        from core.generation_stats import get_generation_stats
+        from core.groq_scheduler import groq_usage
+        from core.provider_race import get_provider_latency
+        from core.tracing import get_tracer
+        return {
+            "providers": get_provider_latency().stats(),
+            "cache": cache_stats(),
+            "commands": get_command_profile().stats(request.get("order_by", "total_duration")),
+            "examples": get_example_store(self.config).count(),
+            "generation": get_generation_stats().stats(),
+            "groq": groq_usage(),
+            "stages": get_tracer().summary()
+        }
+
+    def op_shutdown(self, request, emit):
+        return {}
+
+    def bind(self):
+        """Bind the socket, replacing a stale socket file left by a dead daemon"""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise RuntimeError(f"a daemon is already listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(self.socket_path)
+            finally:
+                probe.close()
+        old_umask = os.umask(0o177)
+        try:
+            self.server = DaemonServer(self.socket_path, DaemonHandler)
+        finally:
+            os.umask(old_umask)
+        self.server.nida = self
+
+    def serve_forever(self):
+        if self.server is None:
+            self.bind()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+class DaemonClient:
+    """Blocking client for NidaDaemon's JSON lines protocol"""
+
+    def __init__(self, socket_path: str = None, timeout: float = None):
+        self.socket_path = socket_path or default_socket_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(self.socket_path)
+        self.rfile = self.sock.makefile("rb")
+        self.wfile = self.sock.makefile("wb")
+        self.next_id = 0
+
+    def request(self, op: str, on_event=None, **payload) -> dict:
+        """Send one request and return its final reply; events go to on_event(message)"""
+        self.next_id += 1
+        send_message(self.wfile, {"id": self.next_id, "op": op, **payload})
+        return self.read_reply(on_event)
+
+    def read_reply(self, on_event=None) -> dict:
+        """Wait for the final reply of the request in flight, e.g. after asking to cancel it"""
+        while True:
+            line = self.rfile.readline(MAX_MESSAGE_BYTES)
+            if not line:
+                raise ConnectionError("daemon closed the connection")
+            message = json.loads(line)
+            if "event" in message:
+                if on_event is not None:
+                    on_event(message)
+                continue
+            return message
+
+    def close(self):
+        for stream in (self.rfile, self.wfile, self.sock):
+            try:
+                stream.close()
+            except OSError:
+                pass
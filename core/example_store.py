@@ -0,0 +1,244 @@
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from typing import List, Optional
+from core.command_cache import CommandCache
+from core.multiple_command_model import CommandSequence
+from core.prompt_builder import compact_commands
+
+EXAMPLE_DIR = "example_index"
+WORD = re.compile(r"[^\s,;:!?()\[\]{}]+")
+# Tokens that name something specific (files, numbers, options) rather than an action
+LITERAL = re.compile(r"[\d./~_\-'\"$*]")
+STOPWORDS = frozenset(
+    "a an the me my i please can could would you to of in on for all that which are is it this called named "
+    "and with from".split()
+)
+# Words that say what to do; two requests with different ones never share a sequence
+ACTION_WORDS = frozenset(
+    "list ls show display print find search grep count check test verify view read cat open watch monitor "
+    "delete remove rm erase clean clear prune purge wipe kill stop start restart reload run execute launch "
+    "install uninstall reinstall update upgrade downgrade create make add new touch mkdir mount unmount umount "
+    "copy cp move mv rename compress extract archive unzip zip untar download upload fetch clone push pull "
+    "enable disable change set edit write append replace sort backup restore sync format chmod chown "
+    "connect disconnect block allow deny lock unlock".split()
+)
+# Cosine similarity needed to reuse a stored sequence, per embedder
+DEFAULT_THRESHOLDS = {"hashing": 0.8, "minilm": 0.92}
+
+def words(text: str) -> List[str]:
+    return [word.strip("'\".") or word for word in WORD.findall(text.lower())]
+
+class HashingEmbedder:
+    """Feature-hashed word and character trigram vectors; deterministic and needs no model download"""
+    name = "hashing"
+
+    def __init__(self, dims: int = 1024):
+        self.dims = dims
+
+    def features(self, text: str):
+        kept = [word for word in words(text) if word not in STOPWORDS]
+        for word in kept:
+            yield f"w:{word}", 1.0
+        padded = f" {' '.join(kept)} "
+        for pos in range(len(padded) - 2):
+            yield f"c:{padded[pos:pos + 3]}", 0.5
+
+    def embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dims
+        for feature, weight in self.features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dims
+            vector[index] += weight if digest[4] & 1 else -weight
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed(text) for text in texts]
+
+class MiniLMEmbedder:
+    """chromadb's bundled all-MiniLM-L6-v2 model, downloaded to ~/.cache/chroma on first use"""
+    name = "minilm"
+
+    def __init__(self):
+        from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+        self.function = DefaultEmbeddingFunction()
+        self(["probe"])
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        return [[float(value) for value in vector] for vector in self.function(texts)]
+
+def load_embedder(name: str):
+    if name == "minilm":
+        try:
+            return MiniLMEmbedder()
+        except Exception:
+            pass
+    return HashingEmbedder()
+
+def actions(instruction: str) -> frozenset:
+    """The verb-like words of an instruction: its first content word plus any known action word"""
+    kept = [word for word in words(instruction) if word not in STOPWORDS]
+    found = {word for word in kept if word in ACTION_WORDS}
+    if kept and not LITERAL.search(kept[0]):
+        found.add(kept[0])
+    return frozenset(found)
+
+def same_arguments(instruction: str, stored_instruction: str, stored_sequence: CommandSequence) -> bool:
+    """Guard near-duplicate reuse against requests that differ only in what they act on.
+
+    Words of the stored instruction that were copied into its commands
+    ("demo" in "mkdir demo") must appear in the new instruction, and
+    literal-looking words of the new instruction must appear in the stored one.
+    """
+    new_words = set(words(instruction))
+    stored_words = set(words(stored_instruction))
+    command_words = set(words(" ".join(compact_commands(stored_sequence))))
+    copied = {word for word in stored_words & command_words if len(word) > 1}
+    literals = {word for word in new_words if LITERAL.search(word)}
+    return copied <= new_words and literals <= stored_words
+
+class ExampleStore:
+    """Local chromadb index of instructions whose commands ran successfully.
+
+    Used two ways before a model call: a near-duplicate above the
+    similarity threshold that asks for the same actions on the same
+    arguments is offered again as is, otherwise the top-k
+    similar pairs are sent as few-shot examples instead of the raw session
+    history. Lookups fail soft: without chromadb the store stays empty.
+    """
+
+    def __init__(self, path: str = EXAMPLE_DIR, embedding: str = "hashing", threshold: float = None,
+                 top_k: int = 3, min_similarity: float = 0.25, max_examples: int = 2000):
+        self.path = path
+        self.embedding = embedding
+        self.threshold = threshold
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.max_examples = max_examples
+        self.lock = threading.Lock()
+        self.embedder = None
+        self.collection = None
+        self.loaded = False
+
+    def get_collection(self):
+        with self.lock:
+            if not self.loaded:
+                self.loaded = True
+                try:
+                    import chromadb
+                    self.embedder = load_embedder(self.embedding)
+                    client = chromadb.PersistentClient(path=self.path)
+                    self.collection = client.get_or_create_collection(
+                        f"examples-{self.embedder.name}", embedding_function=None,
+                        metadata={"hnsw:space": "cosine"}
+                    )
+                except Exception:
+                    self.collection = None
+                if self.threshold is None:
+                    self.threshold = DEFAULT_THRESHOLDS.get(getattr(self.embedder, "name", ""), 0.9)
+        return self.collection
+
+    @staticmethod
+    def example_id(instruction: str) -> str:
+        return hashlib.sha256(CommandCache.normalize(instruction).encode("utf-8")).hexdigest()[:32]
+
+    def add(self, instruction: str, sequence: CommandSequence):
+        collection = self.get_collection()
+        if collection is None or not instruction.strip():
+            return
+        embedding = self.embedder([instruction])[0]
+        with self.lock:
+            collection.upsert(
+                ids=[self.example_id(instruction)],
+                embeddings=[embedding],
+                documents=[instruction],
+                metadatas=[{"sequence": json.dumps(sequence.model_dump()), "updated": time.time()}]
+            )
+            self.evict(collection)
+
+    def evict(self, collection):
+        excess = collection.count() - self.max_examples
+        if excess <= 0:
+            return
+        rows = collection.get(include=["metadatas"])
+        oldest = sorted(zip(rows["ids"], rows["metadatas"]), key=lambda row: row[1].get("updated", 0))
+        collection.delete(ids=[example_id for example_id, _ in oldest[:excess]])
+
+    def record(self, instruction: str, sequence: CommandSequence, results):
+        """Index a confirmed run when every command exited with status 0"""
+        if sequence is None or not results or any(result.exit_code != 0 for result in results):
+            return
+        try:
+            self.add(instruction, sequence)
+        except Exception:
+            pass
+
+    def search(self, instruction: str, k: int = None) -> List[dict]:
+        """Most similar stored examples first, as dicts with instruction, sequence and similarity"""
+        collection = self.get_collection()
+        if collection is None:
+            return []
+        try:
+            embedding = self.embedder([instruction])[0]
+            with self.lock:
+                count = collection.count()
+                if not count:
+                    return []
+                rows = collection.query(
+                    query_embeddings=[embedding], n_results=min(k or self.top_k, count),
+                    include=["documents", "metadatas", "distances"]
+                )
+            return [
+                {
+                    "instruction": document,
+                    "sequence": CommandSequence(**json.loads(metadata["sequence"])),
+                    "similarity": 1.0 - distance
+                }
+                for document, metadata, distance in zip(rows["documents"][0], rows["metadatas"][0], rows["distances"][0])
+            ]
+        except Exception:
+            return []
+
+    def near_duplicate(self, instruction: str, matches: List[dict] = None) -> Optional[dict]:
+        """The stored example close enough to reuse without a model call, if any"""
+        matches = self.search(instruction) if matches is None else matches
+        if not matches:
+            return None
+        best = matches[0]
+        if (best["similarity"] >= self.threshold and actions(instruction) == actions(best["instruction"])
+                and same_arguments(instruction, best["instruction"], best["sequence"])):
+            return best
+        return None
+
+    def few_shot(self, matches: List[dict]) -> List[dict]:
+        """Matches worth showing the model, least similar first, as prompt history turns"""
+        return [
+            {"instruction": match["instruction"], "commands": match["sequence"]}
+            for match in reversed(matches) if match["similarity"] >= self.min_similarity
+        ]
+
+    def count(self) -> int:
+        collection = self.get_collection()
+        if collection is None:
+            return 0
+        with self.lock:
+            return collection.count()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_example_store(config: dict = None) -> ExampleStore:
+    global _store
+    config = config or {}
+    with _store_lock:
+        if _store is None:
+            _store = ExampleStore(
+                embedding=config.get("example_embedding", "hashing"),
+                threshold=config.get("example_threshold"),
+                top_k=config.get("example_top_k", 3)
+            )
+        return _store
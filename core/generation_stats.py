@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+from typing import List
+
+class GenerationStats:
+    """Per-model counters of unparseable replies and repair attempts"""
+
+    def __init__(self, db_path="generation_stats.db"):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.setup_database()
+
+    def setup_database(self):
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS generation_stats (
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                parse_failures INTEGER NOT NULL DEFAULT 0,
+                repair_attempts INTEGER NOT NULL DEFAULT 0,
+                repaired INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (provider, model)
+            )
+        ''')
+        self.conn.commit()
+
+    def record(self, provider: str, model: str, parse_failed: bool, attempts: int, ok: bool):
+        """Record one generation: whether its first reply failed to parse, repairs made and outcome"""
+        with self.lock:
+            self.cursor.execute('''
+                INSERT INTO generation_stats (provider, model, requests, parse_failures, repair_attempts, repaired, failed)
+                VALUES (?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT(provider, model) DO UPDATE SET
+                    requests = requests + 1,
+                    parse_failures = parse_failures + excluded.parse_failures,
+                    repair_attempts = repair_attempts + excluded.repair_attempts,
+                    repaired = repaired + excluded.repaired,
+                    failed = failed + excluded.failed
+            ''', (provider, model or "", int(parse_failed), attempts, int(ok and parse_failed), int(not ok)))
+            self.conn.commit()
+
+    def stats(self) -> List[dict]:
+        with self.lock:
+            self.cursor.execute(
+                "SELECT provider, model, requests, parse_failures, repair_attempts, repaired, failed "
+                "FROM generation_stats ORDER BY provider, model"
+            )
+            rows = self.cursor.fetchall()
+        results = []
+        for provider, model, requests, parse_failures, repair_attempts, repaired, failed in rows:
+            results.append({
+                "provider": provider,
+                "model": model,
+                "requests": requests,
+                "parse_failures": parse_failures,
+                "repair_attempts": repair_attempts,
+                "repaired": repaired,
+                "failed": failed,
+                "parse_failure_rate": round(parse_failures / requests, 4) if requests else 0.0,
+                "retry_rate": round(repair_attempts / requests, 4) if requests else 0.0
+            })
+        return results
+
+    def __del__(self):
+        if hasattr(self, 'conn'):
+            self.conn.close()
+
+_stats = None
+_stats_lock = threading.Lock()
+
+def get_generation_stats() -> GenerationStats:
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = GenerationStats()
+        return _stats
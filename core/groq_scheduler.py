@@ -0,0 +1,334 @@
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+import httpx
+from langchain_groq import ChatGroq
+from core.prompt_builder import get_token_counter
+
+GROQ_API_BASE = "https://api.groq.com"
+# Free-tier limits of the default model; override with config["groq_limits"]
+DEFAULT_LIMITS = {"requests_per_minute": 30, "tokens_per_minute": 6000}
+# Tokens reserved for a reply when the request sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+# Per-message framing tokens added by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+RESET_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+class RateLimited(RuntimeError):
+    pass
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds in a Groq reset header such as "7.66s", "1m30s" or "250ms"; plain numbers are seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = RESET_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+class TokenBucket:
+    """Capacity refilled continuously at per_second; level may go negative when a reply overruns its reservation"""
+
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self.refill(now)
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.per_second) if self.per_second else (0.0 if needed <= 0 else float("inf"))
+
+@dataclass
+class Reservation:
+    tokens: int
+    header_version: int
+    queued: float = 0.0
+
+class GroqUsage:
+    """Requests, tokens, queueing time and 429s per session"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def add(self, session: str, **counts):
+        with self.lock:
+            row = self.sessions.setdefault(session, {
+                "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "queued_seconds": 0.0,
+                "rate_limited": 0
+            })
+            for key, value in counts.items():
+                row[key] += value
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                session: {**row, "queued_seconds": round(row["queued_seconds"], 3),
+                          "total_tokens": row["prompt_tokens"] + row["completion_tokens"]}
+                for session, row in self.sessions.items()
+            }
+
+class GroqScheduler:
+    """Client-side requests- and tokens-per-minute budget shared by all requests made with one API key.
+
+    acquire() queues callers in arrival order until both buckets can cover
+    the request, instead of letting Groq answer 429. The token bucket
+    follows the server: x-ratelimit-remaining-tokens replaces its level,
+    less what requests still in flight have reserved. Groq's request
+    headers count per day, so they only pause the queue once exhausted,
+    as does a 429 for its retry-after.
+    """
+
+    def __init__(self, requests_per_minute: int = DEFAULT_LIMITS["requests_per_minute"],
+                 tokens_per_minute: int = DEFAULT_LIMITS["tokens_per_minute"], max_wait: float = 120.0):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.max_wait = max_wait
+        self.condition = threading.Condition()
+        self.waiting = deque()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.header_version = 0
+        self.usage = GroqUsage()
+
+    def acquire(self, tokens: int, session: str = "default") -> Reservation:
+        """Block until the request fits the budget and reserve it; pass the result to settle()"""
+        waiter = object()
+        started = time.monotonic()
+        with self.condition:
+            self.waiting.append(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    elapsed = now - started
+                    if self.waiting[0] is waiter:
+                        wait = max(self.paused_until - now, self.requests.wait_time(1, now),
+                                   self.tokens.wait_time(tokens, now))
+                        if wait <= 0:
+                            self.requests.level -= 1
+                            self.tokens.level -= tokens
+                            self.in_flight += tokens
+                            reservation = Reservation(tokens, self.header_version)
+                            break
+                        expected = elapsed + wait
+                    else:
+                        # Woken when the head of the queue leaves
+                        wait = self.max_wait - elapsed
+                        expected = elapsed
+                    if expected > self.max_wait:
+                        raise RateLimited(
+                            f"Groq rate limit: a request would wait more than {self.max_wait:g}s "
+                            f"({self.status_text()}); try again shortly"
+                        )
+                    self.condition.wait(min(wait, self.max_wait - elapsed))
+            finally:
+                self.waiting.remove(waiter)
+                self.condition.notify_all()
+        reservation.queued = time.monotonic() - started
+        self.usage.add(session, queued_seconds=reservation.queued)
+        return reservation
+
+    def settle(self, reservation: Reservation, used: int):
+        """Release a reservation, charging the tokens actually used unless the server already reported them"""
+        with self.condition:
+            self.in_flight -= reservation.tokens
+            if self.header_version != reservation.header_version:
+                self.tokens.level += reservation.tokens
+            else:
+                self.tokens.level += reservation.tokens - used
+            self.condition.notify_all()
+
+    def observe_headers(self, headers):
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        with self.condition:
+            now = time.monotonic()
+            try:
+                limit = float(headers.get("x-ratelimit-limit-tokens") or 0)
+                if limit:
+                    self.tokens.capacity = limit
+                    self.tokens.per_second = limit / 60
+                if remaining_tokens is not None:
+                    self.tokens.refill(now)
+                    self.tokens.level = float(remaining_tokens) - self.in_flight
+                    self.header_version += 1
+                if headers.get("x-ratelimit-remaining-requests") == "0":
+                    reset = parse_reset(headers.get("x-ratelimit-reset-requests"))
+                    if reset:
+                        self.paused_until = max(self.paused_until, now + reset)
+            except ValueError:
+                pass
+            self.condition.notify_all()
+
+    def observe_response(self, response):
+        """httpx response hook: track the rate-limit headers of every Groq response"""
+        self.observe_headers(response.headers)
+        if response.status_code == 429:
+            self.pause(parse_reset(response.headers.get("retry-after"))
+                       or parse_reset(response.headers.get("x-ratelimit-reset-tokens")) or 1.0)
+
+    def pause(self, seconds: float):
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.condition.notify_all()
+
+    def budget(self) -> dict:
+        with self.condition:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            return {
+                "requests_left": max(0, int(self.requests.level)),
+                "requests_per_minute": int(self.requests.capacity),
+                "tokens_left": max(0, int(self.tokens.level)),
+                "tokens_per_minute": int(self.tokens.capacity),
+                "queued": len(self.waiting),
+                "paused_seconds": round(max(0.0, self.paused_until - now), 1)
+            }
+
+    def status_text(self) -> str:
+        budget = self.budget()
+        return (f"{budget['requests_left']}/{budget['requests_per_minute']} requests and "
+                f"{budget['tokens_left']}/{budget['tokens_per_minute']} tokens left this minute")
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+_http_client = None
+
+def key_hash(api_key: str) -> str:
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+
+def get_groq_scheduler(api_key: str = None, limits: dict = None, max_wait: float = 120.0) -> GroqScheduler:
+    """The scheduler for an API key; limits only apply when it is first created"""
+    key = key_hash(api_key)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = _schedulers[key] = GroqScheduler(max_wait=max_wait, **{**DEFAULT_LIMITS, **(limits or {})})
+        return scheduler
+
+def observe_groq_response(response):
+    """httpx response hook: hand the response to the scheduler of the API key that sent it"""
+    authorization = response.request.headers.get("authorization", "")
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key_hash(authorization[len("Bearer "):]))
+    if scheduler is not None:
+        scheduler.observe_response(response)
+
+def get_groq_http_client() -> httpx.Client:
+    """One connection pool for every Groq client in the process; timeouts are set per request"""
+    global _http_client
+    with _schedulers_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(event_hooks={"response": [observe_groq_response]})
+        return _http_client
+
+def groq_usage() -> dict:
+    """Usage per session and remaining budget, over every API key in use"""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    sessions = {}
+    for scheduler in schedulers:
+        for session, row in scheduler.usage.snapshot().items():
+            total = sessions.setdefault(session, dict.fromkeys(row, 0))
+            for key, value in row.items():
+                total[key] += value
+    return {"sessions": sessions, "budgets": [scheduler.budget() for scheduler in schedulers]}
+
+def count_prompt_tokens(messages) -> int:
+    counter = get_token_counter()
+    total = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        total += counter.count(content) + MESSAGE_OVERHEAD_TOKENS
+    return total
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+class ScheduledChatGroq(ChatGroq):
+    """ChatGroq whose calls wait for the shared GroqScheduler and are counted per session.
+
+    A 429 pauses the queue and the call is queued again, up to
+    max_rate_retries times, before RateLimited is raised.
+    """
+    scheduler: Any = None
+    usage_session: str = "default"
+    max_rate_retries: int = 3
+
+    def reservation(self, messages) -> tuple:
+        prompt_tokens = count_prompt_tokens(messages)
+        return prompt_tokens, prompt_tokens + (self.max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+    def record(self, reserved: Reservation, prompt_tokens: int, completion_tokens: int):
+        self.scheduler.settle(reserved, prompt_tokens + completion_tokens)
+        self.scheduler.usage.add(self.usage_session, requests=1, prompt_tokens=prompt_tokens,
+                                 completion_tokens=completion_tokens)
+
+    def rate_limited(self, error: Exception, attempt: int):
+        self.scheduler.usage.add(self.usage_session, rate_limited=1)
+        headers = getattr(getattr(error, "response", None), "headers", {}) or {}
+        self.scheduler.pause(parse_reset(headers.get("retry-after")) or 2.0 ** attempt)
+        if attempt >= self.max_rate_retries:
+            raise RateLimited(f"Groq rate limit: still refused after {attempt + 1} attempts "
+                              f"({self.scheduler.status_text()})") from None
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.streaming:
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        prompt_tokens, estimate = self.reservation(messages)
+        for attempt in range(self.max_rate_retries + 1):
+            reserved = self.scheduler.acquire(estimate, self.usage_session)
+            try:
+                result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                self.scheduler.settle(reserved, 0)
+                if not is_rate_limit_error(e):
+                    raise
+                self.rate_limited(e, attempt)
+                continue
+            usage = (result.llm_output or {}).get("token_usage") or {}
+            completion = usage.get("completion_tokens")
+            if completion is None:
+                completion = get_token_counter().count(result.generations[0].text if result.generations else "")
+            self.record(reserved, usage.get("prompt_tokens") or prompt_tokens, completion)
+            return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt_tokens, estimate = self.reservation(messages)
+        for attempt in range(self.max_rate_retries + 1):
+            reserved = self.scheduler.acquire(estimate, self.usage_session)
+            text = []
+            usage = {}
+            try:
+                for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    text.append(chunk.text)
+                    usage = getattr(chunk.message, "usage_metadata", None) or usage
+                    yield chunk
+            except Exception as e:
+                if text or not is_rate_limit_error(e):
+                    self.record(reserved, prompt_tokens, get_token_counter().count("".join(text)))
+                    raise
+                self.scheduler.settle(reserved, 0)
+                self.rate_limited(e, attempt)
+                continue
+            except GeneratorExit:
+                self.record(reserved, prompt_tokens, get_token_counter().count("".join(text)))
+                raise
+            self.record(reserved, usage.get("input_tokens") or prompt_tokens,
+                        usage.get("output_tokens") or get_token_counter().count("".join(text)))
+            return
@@ -0,0 +1,207 @@
+import ast
+import glob
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Optional
+from core.logger import LOG_DIR
+from core.multiple_command_model import CommandSequence
+
+TEXT_LOG_ENTRY = re.compile(
+    r'\[(?P<ts>\d{4}-\d\d-\d\d [\d:.]+)\]\n'
+    r'User Input: (?P<instruction>.*?)\n'
+    r'Command: (?P<command>.*?)\n'
+    r'Result: (?P<result>.*?)-{40}',
+    re.DOTALL
+)
+REPR_ORDER = re.compile(r'\border=(\d+)')
+REPR_COMMAND = re.compile(r'\bcommand=(\'(?:[^\'\\]|\\.)*\'|"(?:[^"\\]|\\.)*")')
+SEARCH_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+def parse_logged_sequence(raw) -> Optional[CommandSequence]:
+    """Recover a CommandSequence from a logged dict or its str()/repr() form"""
+    if isinstance(raw, dict):
+        data = raw
+    else:
+        try:
+            data = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            orders = [int(order) for order in REPR_ORDER.findall(raw)]
+            commands = [ast.literal_eval(command) for command in REPR_COMMAND.findall(raw)]
+            if not commands:
+                return None
+            data = {
+                "commands": [
+                    {"order": orders[i] if i < len(orders) else i + 1, "command": command}
+                    for i, command in enumerate(commands)
+                ],
+                "total_commands": len(commands)
+            }
+    try:
+        return CommandSequence(**data)
+    except Exception:
+        return None
+
+class HistoryIndex:
+    """SQLite FTS5 index over executed instructions and their command sequences"""
+
+    def __init__(self, db_path="history.db"):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.setup_database()
+
+    def setup_database(self):
+        self.cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL,
+                instruction TEXT NOT NULL,
+                commands TEXT NOT NULL,
+                sequence TEXT NOT NULL,
+                exit_code INTEGER,
+                UNIQUE(ts, instruction)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+                instruction, commands,
+                content='history', content_rowid='id',
+                prefix='2 3'
+            );
+            CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+                INSERT INTO history_fts (rowid, instruction, commands)
+                VALUES (new.id, new.instruction, new.commands);
+            END;
+            CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+                INSERT INTO history_fts (history_fts, rowid, instruction, commands)
+                VALUES ('delete', old.id, old.instruction, old.commands);
+            END;
+            CREATE TABLE IF NOT EXISTS backfilled_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+        ''')
+        self.conn.commit()
+
+    @staticmethod
+    def to_row(record: dict):
+        sequence = parse_logged_sequence(record.get("sequence"))
+        if sequence is None:
+            return None
+        exit_codes = [c.get("exit_code") for c in record.get("commands", []) if c.get("exit_code") is not None]
+        return (
+            record.get("ts", ""),
+            record.get("instruction", ""),
+            "\n".join(entry.command for entry in sequence.commands),
+            sequence.model_dump_json(),
+            next((code for code in exit_codes if code), 0) if exit_codes else None
+        )
+
+    def add_records(self, records: List[dict]):
+        rows = [row for row in (self.to_row(record) for record in records) if row]
+        if not rows:
+            return 0
+        with self.lock:
+            self.cursor.executemany(
+                "INSERT OR IGNORE INTO history (ts, instruction, commands, sequence, exit_code) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            inserted = self.cursor.rowcount
+            self.conn.commit()
+        return inserted
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        tokens = SEARCH_TOKEN.findall(query)
+        return " AND ".join(f'"{token}"*' for token in tokens)
+
+    def search(self, query: str, limit: int = 50) -> List[dict]:
+        expression = self.match_expression(query)
+        with self.lock:
+            if not expression:
+                self.cursor.execute(
+                    "SELECT id, ts, instruction, commands, exit_code FROM history "
+                    "ORDER BY id DESC LIMIT ?",
+                    (limit,)
+                )
+            else:
+                self.cursor.execute('''
+                    SELECT h.id, h.ts, h.instruction, h.commands, h.exit_code
+                    FROM history h JOIN (
+                        SELECT rowid FROM history_fts WHERE history_fts MATCH ?
+                        ORDER BY rowid DESC LIMIT ?
+                    ) hits ON h.id = hits.rowid
+                    ORDER BY h.id DESC
+                ''', (expression, limit))
+            rows = self.cursor.fetchall()
+        return [
+            {"id": row[0], "ts": row[1], "instruction": row[2], "commands": row[3], "exit_code": row[4]}
+            for row in rows
+        ]
+
+    def get_sequence(self, entry_id: int) -> Optional[CommandSequence]:
+        with self.lock:
+            self.cursor.execute("SELECT sequence FROM history WHERE id = ?", (entry_id,))
+            row = self.cursor.fetchone()
+        return CommandSequence.model_validate_json(row[0]) if row else None
+
+    def read_log_file(self, path: str) -> List[dict]:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            if ".jsonl" in path:
+                records = []
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+                return records
+            return [
+                {
+                    "ts": match.group("ts"),
+                    "instruction": match.group("instruction"),
+                    "sequence": match.group("command")
+                }
+                for match in TEXT_LOG_ENTRY.finditer(f.read())
+            ]
+
+    def backfill(self, log_dir: str = LOG_DIR) -> int:
+        """Index existing text and JSON Lines logs not yet seen at their current size"""
+        paths = glob.glob(os.path.join(log_dir, "log_*.txt")) + glob.glob(os.path.join(log_dir, "activity*.jsonl*"))
+        added = 0
+        for path in sorted(paths):
+            size = os.path.getsize(path)
+            with self.lock:
+                self.cursor.execute("SELECT size FROM backfilled_files WHERE path = ?", (path,))
+                row = self.cursor.fetchone()
+            if row and row[0] == size:
+                continue
+            try:
+                added += self.add_records(self.read_log_file(path))
+            except OSError:
+                continue
+            with self.lock:
+                self.cursor.execute(
+                    "INSERT OR REPLACE INTO backfilled_files (path, size) VALUES (?, ?)",
+                    (path, size)
+                )
+                self.conn.commit()
+        return added
+
+    def __del__(self):
+        if hasattr(self, 'conn'):
+            self.conn.close()
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_history_index() -> HistoryIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = HistoryIndex()
+        return _index
@@ -0,0 +1,243 @@
+import itertools
+import threading
+import time
+from PyQt5.QtCore import QObject, pyqtSignal
+from core.command_handler import create_command_executor
+from core.command_profile import get_command_profile
+from core.command_thread import CommandThread
+from core.example_store import get_example_store
+from core.logger import log_action
+from core.shell_pool import get_shell_pool
+from core.tracing import get_tracer
+
+QUEUED = "queued"
+GENERATING = "generating"
+AWAITING_CONFIRMATION = "awaiting confirmation"
+READY = "ready"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (GENERATING, RUNNING)
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+class Job:
+    """One instruction moving through generation, confirmation and execution"""
+
+    def __init__(self, job_id: int, instruction: str, session_id: str, sequence=None, bypass_cache: bool = False):
+        self.id = job_id
+        self.instruction = instruction
+        self.session_id = session_id
+        self.sequence = sequence
+        self.bypass_cache = bypass_cache
+        self.status = QUEUED
+        self.error = None
+        self.output = None
+        self.from_cache = False
+        self.reused_from = None
+        self.timings = {}
+        self.trace_id = None
+        self.thread = None
+        self.executor = None
+        self.confirm_started = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINAL_STATES
+
+class JobQueue(QObject):
+    """Runs several instructions at once, each with its own processor context and shell.
+
+    Each job's session ("<window>/<job>") is forked from the window's: its
+    processor starts from the window's conversation history, and its shell
+    from the window's cwd and environment. A job's generated turn and, once
+    it has run, its shell state are merged back into the window's session,
+    so later jobs carry on from them. A job holds a slot while its commands
+    are generated and while they run; waiting for the user's confirmation
+    does not. Jobs beyond max_concurrent wait in submission order.
+    """
+    job_added = pyqtSignal(object)
+    job_updated = pyqtSignal(object)
+    job_entry = pyqtSignal(object, object)
+    job_output = pyqtSignal(object, str)
+    job_prompt = pyqtSignal(object, object)
+
+    def __init__(self, config: dict, session_id: str, max_concurrent: int = 2, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.session_id = session_id
+        self.jobs = {}
+        self.ids = itertools.count(1)
+        self.max_concurrent = 1
+        self.set_max_concurrent(max_concurrent)
+
+    def set_max_concurrent(self, count: int):
+        self.max_concurrent = max(1, count)
+        get_shell_pool().reserve(self.max_concurrent)
+        self.pump()
+
+    def active_count(self) -> int:
+        return sum(job.status in ACTIVE_STATES for job in self.jobs.values())
+
+    def submit(self, instruction: str, sequence=None, bypass_cache: bool = False) -> Job:
+        """Queue an instruction; with a sequence, generation is skipped and the job awaits confirmation"""
+        job_id = next(self.ids)
+        job = Job(job_id, instruction, f"{self.session_id}/{job_id}", sequence=sequence, bypass_cache=bypass_cache)
+        self.jobs[job_id] = job
+        self.job_added.emit(job)
+        if sequence is not None:
+            self.await_confirmation(job)
+        else:
+            self.pump()
+        return job
+
+    def pump(self):
+        """Start waiting jobs, oldest first, while there are free slots"""
+        for job in sorted(self.jobs.values(), key=lambda job: job.id):
+            if self.active_count() >= self.max_concurrent:
+                return
+            if job.status == QUEUED:
+                self.start_generation(job)
+            elif job.status == READY:
+                self.start_execution(job)
+
+    def set_status(self, job: Job, status: str, error: str = None):
+        job.status = status
+        job.error = error
+        self.job_updated.emit(job)
+
+    def start_generation(self, job: Job):
+        from core.ai_engine import fork_processor
+        fork_processor(self.session_id, job.session_id, self.config)
+        get_shell_pool().fork(self.session_id, job.session_id)
+        job.thread = CommandThread(job.instruction, self.config, bypass_cache=job.bypass_cache,
+                                   session_id=job.session_id)
+        job.thread.entry_ready.connect(lambda entry: self.job_entry.emit(job, entry))
+        job.thread.result_ready.connect(lambda instruction, sequence: self.on_generated(job, sequence))
+        job.thread.error_signal.connect(lambda message: self.on_failed(job, message))
+        job.thread.cancelled_signal.connect(lambda: self.finish(job, CANCELLED))
+        self.set_status(job, GENERATING)
+        job.thread.start()
+
+    def on_generated(self, job: Job, sequence):
+        from core.ai_engine import get_processor
+        if job.thread.cancel_event.is_set():
+            self.finish(job, CANCELLED)
+            return
+        processor, lock = get_processor(self.session_id, self.config)
+        with lock:
+            processor.remember(job.instruction, sequence)
+        job.sequence = sequence
+        job.from_cache = job.thread.from_cache
+        job.reused_from = job.thread.reused_from
+        job.timings = job.thread.timings
+        job.trace_id = job.thread.trace_id
+        self.await_confirmation(job)
+        self.pump()
+
+    def await_confirmation(self, job: Job):
+        job.confirm_started = time.perf_counter()
+        self.set_status(job, AWAITING_CONFIRMATION)
+
+    def record_confirmation(self, job: Job, confirmed: bool):
+        get_tracer().record("confirm_wait", time.perf_counter() - job.confirm_started,
+                            trace_id=job.trace_id, confirmed=confirmed)
+
+    def confirm(self, job: Job):
+        if job.status != AWAITING_CONFIRMATION:
+            return
+        self.record_confirmation(job, True)
+        self.set_status(job, READY)
+        self.pump()
+
+    def cancel(self, job: Job) -> bool:
+        """Cancel or stop a job; returns whether it was not already finished.
+
+        A generating job drops its model request and a running one has
+        its current command interrupted; both finish as cancelled once
+        their thread returns.
+        """
+        if job.finished:
+            return False
+        if job.status == GENERATING:
+            job.thread.cancel()
+            return True
+        if job.status == RUNNING:
+            job.executor.cancel()
+            return True
+        if job.status == AWAITING_CONFIRMATION:
+            self.record_confirmation(job, False)
+        self.finish(job, CANCELLED)
+        return True
+
+    def start_execution(self, job: Job):
+        # Pick up what jobs that finished since this one was generated left behind
+        get_shell_pool().fork(self.session_id, job.session_id)
+        try:
+            job.executor = create_command_executor(
+                job.sequence,
+                session_id=job.session_id,
+                max_workers=self.config.get("max_parallel_commands", 4),
+                trace_id=job.trace_id,
+                command_timeout=self.config.get("command_timeout", 600),
+                sequence_timeout=self.config.get("sequence_timeout"),
+                sudo_session=self.config.get("sudo_session", False)
+            )
+        except Exception as e:
+            self.on_failed(job, f"Error executing command: {e}")
+            return
+        job.executor.output_signal.connect(lambda text: self.job_output.emit(job, text))
+        job.executor.prompt_signal.connect(lambda prompt: self.job_prompt.emit(job, prompt))
+        job.executor.finished_signal.connect(lambda output: self.on_executed(job, output))
+        self.set_status(job, RUNNING)
+        job.executor.start()
+
+    def send_response(self, job: Job, text: str):
+        if job.executor is not None:
+            job.executor.send_response(text)
+
+    def on_executed(self, job: Job, output):
+        job.output = output
+        log_action(
+            job.instruction, job.sequence, output,
+            results=job.executor.results, duration=job.executor.duration, session_id=job.session_id
+        )
+        results = job.executor.results
+        threading.Thread(target=get_command_profile().record, args=(results,), daemon=True).start()
+        if self.config.get("examples", True):
+            threading.Thread(
+                target=get_example_store(self.config).record,
+                args=(job.instruction, job.sequence, results),
+                daemon=True
+            ).start()
+        get_tracer().dump_metrics()
+        self.finish(job, CANCELLED if job.executor.executor.cancelled else DONE)
+
+    def on_failed(self, job: Job, message: str):
+        self.finish(job, FAILED, error=message or "Invalid input.")
+
+    def finish(self, job: Job, status: str, error: str = None):
+        if job.executor is not None:
+            get_shell_pool().fork(job.session_id, self.session_id)
+        self.release_session(job.session_id)
+        self.set_status(job, status, error)
+        self.pump()
+
+    def release_session(self, session_id: str):
+        from core.ai_engine import release_processor
+        get_shell_pool().close_helpers(session_id)
+        get_shell_pool().close_session(session_id)
+        release_processor(session_id)
+
+    def close(self):
+        """Release the window's and its jobs' shells and processors, e.g. when it closes"""
+        for job in self.jobs.values():
+            self.cancel(job)
+            self.release_session(job.session_id)
+        self.release_session(self.session_id)
+
+    def forget(self, job: Job):
+        """Drop a finished job, e.g. when its pane is closed"""
+        if job.finished:
+            self.jobs.pop(job.id, None)
@@ -0,0 +1,98 @@
+import json
+import re
+from typing import Optional
+from pydantic import ValidationError
+from core.multiple_command_model import CommandSequence
+
+CODE_FENCE = re.compile(r'```(?:json|JSON)?\s*\n?(.*?)```', re.DOTALL)
+TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+def balanced_object(text: str, start: int) -> Optional[str]:
+    """Return the {...} block opening at start, honouring strings and escapes"""
+    depth = 0
+    in_string = False
+    escape = False
+    for pos in range(start, len(text)):
+        char = text[pos]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+    return None
+
+def loads_tolerant(raw: str):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        pass
+    try:
+        return json.loads(TRAILING_COMMA.sub(r'\1', raw))
+    except ValueError:
+        return None
+
+def extract_json(text: str):
+    """Pull the first JSON object out of a model reply with code fences or prose around it"""
+    text = text.strip()
+    if text.startswith("{"):
+        data = loads_tolerant(text)
+        if data is not None:
+            return data
+
+    candidates = [match.group(1) for match in CODE_FENCE.finditer(text)] + [text]
+    fallback = None
+    for candidate in candidates:
+        start = candidate.find("{")
+        while start != -1:
+            block = balanced_object(candidate, start)
+            if block is None:
+                break
+            data = loads_tolerant(block)
+            if isinstance(data, dict):
+                if "commands" in data:
+                    return data
+                fallback = fallback or data
+                start = candidate.find("{", start + len(block))
+            else:
+                start = candidate.find("{", start + 1)
+    return fallback
+
+def parse_command_sequence(text: str) -> CommandSequence:
+    """Parse a model reply into a CommandSequence; raises ValueError with a short reason"""
+    data = extract_json(text)
+    if data is None:
+        start = text.find("{")
+        block = balanced_object(text, start) if start != -1 else None
+        if block is None:
+            raise ValueError("no JSON object found in the reply")
+        try:
+            json.loads(block)
+        except ValueError as e:
+            raise ValueError(f"invalid JSON: {e}") from None
+        raise ValueError("the reply is not a JSON object")
+    if "commands" not in data and "command" in data:
+        data = {"commands": [{"order": 1, **data}]}
+    commands = data.get("commands")
+    if not isinstance(commands, list) or not commands:
+        raise ValueError('"commands" must be a non-empty array')
+    for index, entry in enumerate(commands):
+        if isinstance(entry, dict):
+            entry.setdefault("order", index + 1)
+    data.setdefault("total_commands", len(commands))
+    try:
+        return CommandSequence(**data)
+    except ValidationError as e:
+        errors = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()[:3]
+        )
+        raise ValueError(errors) from None
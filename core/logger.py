@@ -1,14 +1,178 @@
+import atexit
+import gzip
+import json
 import os
+import queue
+import shutil
+import threading
+import time
 from datetime import datetime
 
 LOG_DIR = "logs"
+ACTIVITY_LOG = os.path.join(LOG_DIR, "activity.jsonl")
 os.makedirs(LOG_DIR, exist_ok=True)
 
-def log_action(user_input: str, command: str, result: str):
-    log_file = os.path.join(LOG_DIR, f"log_{datetime.now().strftime('%Y_%m_%d')}.txt")
-    with open(log_file, "a") as f:
-        f.write(f"\n[{datetime.now()}]\n")
-        f.write(f"User Input: {user_input}\n")
-        f.write(f"Command: {command}\n")
-        f.write(f"Result: {result}\n")
-        f.write("-" * 40)
+class LogWriter:
+    """Background JSON Lines writer with batched fsync and size/daily rotation.
+
+    write() never blocks: records go to a bounded queue and are dropped
+    (and counted) if the disk cannot keep up. close() drains the queue and
+    is registered with atexit. Batch writes are timed as "log_write" spans
+    unless traced is False (as for the trace log itself).
+    """
+
+    def __init__(self, path: str = ACTIVITY_LOG, max_queue: int = 10000, batch_size: int = 256,
+                 fsync_interval: float = 1.0, max_bytes: int = 10 * 1024 * 1024, compress: bool = True,
+                 traced: bool = True):
+        self.path = path
+        self.traced = traced
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.written = 0
+        self.listeners = []
+        self.file = None
+        self.opened_on = None
+        self.stop_marker = object()
+        self.thread = threading.Thread(target=self.run, name="nida-log-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def write(self, record: dict) -> bool:
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def add_listener(self, callback):
+        """Call callback(records) on the writer thread after each written batch"""
+        self.listeners.append(callback)
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.opened_on = datetime.now().date()
+
+    def rotate(self):
+        self.file.close()
+        self.file = None
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        base, ext = os.path.splitext(self.path)
+        rotated = f"{base}-{stamp}{ext}"
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self.open()
+
+    def needs_rotation(self) -> bool:
+        size = self.file.tell()
+        return size > 0 and (size >= self.max_bytes or datetime.now().date() != self.opened_on)
+
+    def run(self):
+        tracer = None
+        if self.traced:
+            from core.tracing import get_tracer
+            tracer = get_tracer()
+        self.open()
+        last_sync = time.monotonic()
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self.queue.get(timeout=self.fsync_interval)
+                if item is self.stop_marker:
+                    stopping = True
+                else:
+                    batch.append(item)
+                while len(batch) < self.batch_size and not stopping:
+                    item = self.queue.get_nowait()
+                    if item is self.stop_marker:
+                        stopping = True
+                    else:
+                        batch.append(item)
+            except queue.Empty:
+                pass
+
+            write_started = time.perf_counter()
+            try:
+                if batch:
+                    self.file.write("".join(
+                        json.dumps(record, default=str, ensure_ascii=False) + "\n" for record in batch
+                    ))
+                    self.written += len(batch)
+                now = time.monotonic()
+                if batch or stopping:
+                    self.file.flush()
+                    if stopping or now - last_sync >= self.fsync_interval:
+                        os.fsync(self.file.fileno())
+                        last_sync = now
+                if self.needs_rotation():
+                    self.rotate()
+            except OSError:
+                pass
+            if tracer is not None and batch:
+                tracer.record("log_write", time.perf_counter() - write_started, records=len(batch))
+
+            for listener in list(self.listeners) if batch else []:
+                try:
+                    listener(batch)
+                except Exception:
+                    pass
+
+        self.file.close()
+
+    def close(self, timeout: float = 5.0):
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(self.stop_marker, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_log_writer() -> LogWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter()
+        return _writer
+
+def sequence_to_dict(command):
+    if hasattr(command, "model_dump"):
+        return command.model_dump()
+    return command
+
+def log_action(user_input: str, command, result, results=None, duration: float = None,
+               session_id: str = None):
+    """Log one executed instruction.
+
+    result is either a string or an OutputStore; for the latter only its
+    size, spill file path, head and tail are logged.
+    """
+    if hasattr(result, "excerpt"):
+        output_bytes = result.size
+        output = {"output": result.excerpt()}
+    else:
+        output_bytes = len(result.encode("utf-8", "replace")) if result else 0
+        output = {"result": result}
+    record = {
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "session_id": session_id,
+        "instruction": user_input,
+        "sequence": sequence_to_dict(command),
+        "commands": [item.usage() for item in (results or [])],
+        "duration": round(duration, 4) if duration is not None else None,
+        "output_bytes": output_bytes,
+        **output
+    }
+    get_log_writer().write(record)
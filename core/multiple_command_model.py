@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pydantic import BaseModel, Field
 
 class CommandEntry(BaseModel):
@@ -6,6 +6,7 @@ class CommandEntry(BaseModel):
     command: str = Field(description="The actual bash command to execute")
     needs_dir_change: int = Field(default=0, description="1 if command changes directory, 0 otherwise")
     needs_file_check: int = Field(default=0, description="1 if command needs file verification, 0 otherwise")
+    depends_on: Optional[List[int]] = Field(default=None, description="Orders of steps that must finish first; inferred when omitted")
 
 class CommandSequence(BaseModel):
     commands: List[CommandEntry]
@@ -1,23 +1,28 @@
 from typing import TypedDict, List, Dict
-from langchain_core.messages import BaseMessage, HumanMessage
-from langchain_ollama import OllamaLLM
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langgraph.graph import START, END
-from langchain_core.output_parsers import JsonOutputParser
 from core.multiple_command_model import CommandSequence
-import os
+from core.stream_parser import CommandStreamParser
+from core.prompt_builder import PromptBuilder, remember_turn
+from core.prompts import REPAIR_PROMPT, SYSTEM_PROMPT, TURN_PROMPT
+from core.json_extract import parse_command_sequence
+from core.tracing import span
 from dotenv import load_dotenv
 load_dotenv()
 
-os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGCHAIN_API_KEY")
-os.environ["LANGSMITH_ENDPOINT"] = "https://api.smith.langchain.com"
-os.environ["LANGCHAIN_PROJECT"] = "AI_LINUX"
-os.environ["LANGSMITH_TRACING"] = "true"
-
 class ChatState(TypedDict):
     messages: List[BaseMessage]
     command: CommandSequence
     status: str
     context: Dict[str, any]
+    attempts: int
+    error: str
+    raw: str
+    trace_id: str
+
+class GenerationCancelled(Exception):
+    """Raised inside the graph when the caller's cancel event is set"""
 
 def get_response_content(response) -> str:
     """Extract content from different types of LLM responses"""
@@ -25,99 +30,113 @@ def get_response_content(response) -> str:
         return response.content
     return str(response)
 
-def generate_command(state: ChatState, llm: OllamaLLM):
-    """Generate Linux commands in JSON format"""
-    messages = state["messages"]
-    context = state.get("context", {})
-
-    command_history = context.get("command_history", [])
-    if "last_sequence" in context:
-        command_history.append({
-            "instruction": messages[-2].content if len(messages) > 1 else "",
-            "commands": context["last_sequence"]
-        })
-        command_history = command_history[-5:]
-    
-    system_prompt = '''You are a Linux command generator. Convert user requests into JSON-formatted command sequences.
-    Previous commands history (for context):
-    {history}
-    Format your response EXACTLY as a JSON object with this structure:
-    {{
-        "commands": [
-            {{
-                "order": 1,
-                "command": "actual command here",
-                "needs_dir_change": 0,
-                "needs_file_check": 0
-            }}
-        ],
-        "total_commands": 1
-    }}
-
-    Rules:
-    - Return ONLY the JSON, no other text
-    - Order must start from 1
-    - Split chained commands (using &&) into separate command entries
-    - needs_dir_change must be 1 for cd commands, 0 otherwise
-    - needs_file_check must be 1 for file operations, 0 otherwise
-    - Each command must be a single, complete, executable bash command
-    - DO NOT use &&, ||, or ; to chain commands - use separate entries instead
+def invoke_llm(llm, prompt, on_entry=None, cancel_event=None) -> str:
+    """Invoke the LLM, streaming entries to on_entry as they complete when given.
 
-    Example:
-    Instead of:
-    "command": "touch file.txt && echo 'text' > file.txt"
-    
-    Use:
-    "commands": [
-        {{"order": 1, "command": "touch file.txt", "needs_dir_change": 0, "needs_file_check": 1}},
-        {{"order": 2, "command": "echo 'text' > file.txt", "needs_dir_change": 0, "needs_file_check": 1}}
-    ]
+    With a cancel_event the reply is always streamed, so a cancelled
+    request is abandoned at the next chunk instead of running to the end.
+    A ProviderRace (anything with invoke_validated) races its providers.
+    """
+    if hasattr(llm, "invoke_validated"):
+        return llm.invoke_validated(prompt, on_entry, cancel_event)
+    if on_entry is None and cancel_event is None:
+        return get_response_content(llm.invoke(prompt))
 
-    Context: {context}
-    Command History: {history}
-    Request: {user_input}
-    '''
+    parser = CommandStreamParser()
+    chunks = []
+    stream = llm.stream(prompt)
+    try:
+        for chunk in stream:
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled()
+            text = get_response_content(chunk)
+            chunks.append(text)
+            if on_entry is not None:
+                for entry in parser.feed(text):
+                    on_entry(entry)
+    finally:
+        stream.close()
+    if cancel_event is not None and cancel_event.is_set():
+        raise GenerationCancelled()
+    return "".join(chunks)
 
-    history_text = "\n".join([
-        f"Instruction: {entry['instruction']}\n"
-        f"Commands: {entry['commands']}"
-        for entry in command_history
-    ])
+def run_options(config: dict = None) -> dict:
+    return (config or {}).get("configurable") or {}
 
-    prompt = system_prompt.format(
-        context=str(context),
-        history=history_text,
-        user_input=messages[-1].content
-    )
+MAX_REPAIR_ATTEMPTS = 2
+MAX_REPAIR_ECHO_CHARS = 2000
 
-    parser = JsonOutputParser(pydantic_object=CommandSequence)
-    response = llm.invoke(prompt)
-    cleaned_response = get_response_content(response)
+def parse_reply(raw: str, user_input: str, context: dict, prompt_stats: dict, attempts: int, trace_id: str = None):
+    """Turn a raw reply into a state update, recording the parse error for the repair edge"""
     try:
-        command_sequence = parser.parse(cleaned_response)
+        with span("parse", trace_id=trace_id, chars=len(raw)):
+            command_sequence = parse_command_sequence(raw)
+    except ValueError as e:
         return {
-            "command": command_sequence,
+            "command": None,
+            "attempts": attempts,
+            "error": str(e),
+            "raw": raw,
             "context": {
                 **context,
-                "last_sequence": command_sequence,
-                "command_history": command_history
-
+                "prompt_stats": prompt_stats
             }
         }
-    except Exception as e:
-        return {
-            "command": "",
-            "context": {
-                **context,
-                "command_history": command_history
-            }
+    return {
+        "command": command_sequence,
+        "attempts": attempts,
+        "error": "",
+        "raw": "",
+        "context": {
+            **remember_turn(context, user_input, command_sequence),
+            "last_sequence": command_sequence.model_dump(),
+            "prompt_stats": prompt_stats
         }
+    }
+
+def build_prompt(state: ChatState, builder: PromptBuilder = None):
+    builder = builder or PromptBuilder(TURN_PROMPT, prefix=SYSTEM_PROMPT)
+    turn, prompt_stats = builder.build(state["messages"][-1].content, state.get("context", {}))
+    return [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=turn)], prompt_stats
+
+def generate_command(state: ChatState, llm: BaseChatModel, config: dict = None, builder: PromptBuilder = None):
+    """Generate Linux commands in JSON format"""
+    options = run_options(config)
+    prompt, prompt_stats = build_prompt(state, builder)
+    with span("generate", trace_id=state.get("trace_id"), prompt_tokens=prompt_stats["prompt_tokens"]):
+        raw = invoke_llm(llm, prompt, options.get("on_entry"), options.get("cancel_event"))
+    return parse_reply(
+        raw, state["messages"][-1].content, state.get("context", {}), prompt_stats,
+        attempts=0, trace_id=state.get("trace_id")
+    )
+
+def repair_command(state: ChatState, llm: BaseChatModel, config: dict = None, builder: PromptBuilder = None):
+    """Ask the model to fix its last reply, quoting the parse error"""
+    prompt, prompt_stats = build_prompt(state, builder)
+    prompt += [
+        AIMessage(content=state.get("raw", "")[:MAX_REPAIR_ECHO_CHARS]),
+        HumanMessage(content=REPAIR_PROMPT.format(error=state.get("error", "")))
+    ]
+    attempts = state.get("attempts", 0) + 1
+    with span("repair", trace_id=state.get("trace_id"), attempt=attempts):
+        raw = invoke_llm(llm, prompt, cancel_event=run_options(config).get("cancel_event"))
+    return parse_reply(
+        raw, state["messages"][-1].content, state.get("context", {}), prompt_stats,
+        attempts=attempts, trace_id=state.get("trace_id")
+    )
 
 def validate_command(state: ChatState):
     """Check if command sequence is valid"""
+    with span("validate", trace_id=state.get("trace_id")) as attrs:
+        attrs["result"] = check_command(state)
+    return attrs["result"]
+
+def check_command(state: ChatState):
     command = state.get("command")
     
     if not command or not hasattr(command, "commands"):
+        if state.get("error") and state.get("attempts", 0) < MAX_REPAIR_ATTEMPTS:
+            return "repair"
         return "invalid"
         
     if not command.commands or len(command.commands) == 0:
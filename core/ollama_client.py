@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional
+import requests
+from core.resource_usage import format_bytes
+
+OLLAMA_URL = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+if not OLLAMA_URL.startswith("http"):
+    OLLAMA_URL = f"http://{OLLAMA_URL}"
+
+class OllamaError(RuntimeError):
+    pass
+
+@dataclass
+class PullProgress:
+    model: str
+    status: str
+    completed: int = 0
+    total: int = 0
+    done: bool = False
+    error: str = None
+
+    @property
+    def fraction(self) -> Optional[float]:
+        return self.completed / self.total if self.total else None
+
+def canonical_name(name: str) -> str:
+    """Ollama's name for a model: an untagged name means the :latest tag"""
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+class OllamaModelManager:
+    """Model management over Ollama's local HTTP API instead of the ollama CLI.
+
+    The model list from /api/tags is cached for manifest_ttl seconds and
+    refreshed after a pull or delete. Point base_url (or OLLAMA_HOST) at a
+    stub server to exercise it without Ollama.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_URL, manifest_ttl: float = 30.0, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.manifest_ttl = manifest_ttl
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.manifest = None
+        self.manifest_at = 0.0
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def request(self, method: str, path: str, **kwargs) -> dict:
+        try:
+            response = self.session.request(method, self.url(path), timeout=kwargs.pop("timeout", self.timeout), **kwargs)
+        except requests.RequestException as e:
+            raise OllamaError(f"Ollama is not reachable at {self.base_url}: {e}") from None
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            raise OllamaError(f"{path} failed ({response.status_code}): {message}")
+        return response.json() if response.content else {}
+
+    def is_running(self) -> bool:
+        try:
+            self.request("GET", "/api/version", timeout=2)
+            return True
+        except OllamaError:
+            return False
+
+    def wait_until_running(self, timeout: float = 15.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.is_running():
+                return True
+            time.sleep(0.5)
+        return False
+
+    def invalidate(self):
+        with self.lock:
+            self.manifest = None
+
+    def list_models(self, refresh: bool = False) -> List[dict]:
+        """Locally available models as reported by /api/tags"""
+        with self.lock:
+            if not refresh and self.manifest is not None and time.monotonic() - self.manifest_at < self.manifest_ttl:
+                return self.manifest
+        models = self.request("GET", "/api/tags").get("models", [])
+        with self.lock:
+            self.manifest = models
+            self.manifest_at = time.monotonic()
+        return models
+
+    def find_model(self, name: str, refresh: bool = False) -> Optional[dict]:
+        wanted = canonical_name(name)
+        for model in self.list_models(refresh):
+            if canonical_name(model.get("name") or model.get("model", "")) == wanted:
+                return model
+        return None
+
+    def has_model(self, name: str) -> bool:
+        try:
+            return self.find_model(name) is not None
+        except OllamaError:
+            return False
+
+    def running_models(self) -> List[dict]:
+        """Models currently loaded in memory, from /api/ps"""
+        return self.request("GET", "/api/ps").get("models", [])
+
+    def footprint(self, names: List[str] = None) -> List[dict]:
+        """Disk size of each local model and, when loaded, its memory and VRAM use"""
+        loaded = {}
+        try:
+            loaded = {canonical_name(model.get("name") or model.get("model", "")): model for model in self.running_models()}
+        except OllamaError:
+            pass
+        wanted = {canonical_name(name) for name in names} if names else None
+        rows = []
+        for model in self.list_models():
+            name = canonical_name(model.get("name") or model.get("model", ""))
+            if wanted is not None and name not in wanted:
+                continue
+            details = model.get("details") or {}
+            running = loaded.get(name)
+            rows.append({
+                "name": name,
+                "disk_bytes": model.get("size"),
+                "memory_bytes": running.get("size") if running else None,
+                "vram_bytes": running.get("size_vram") if running else None,
+                "parameter_size": details.get("parameter_size"),
+                "quantization": details.get("quantization_level")
+            })
+        return rows
+
+    def pull(self, name: str, on_progress: Callable[[PullProgress], None] = None,
+             cancel_event: threading.Event = None) -> PullProgress:
+        """Pull a model, reporting overall bytes completed across its layers.
+
+        on_progress gets a snapshot per streamed status line, so it may be
+        handed to another thread. Raises OllamaError when the server
+        reports an error.
+        """
+        on_progress = on_progress or (lambda progress: None)
+        layers = {}
+        progress = PullProgress(name, "starting")
+        try:
+            response = self.session.post(
+                self.url("/api/pull"), json={"model": name, "stream": True}, stream=True, timeout=(self.timeout, 300)
+            )
+        except requests.RequestException as e:
+            raise OllamaError(f"Ollama is not reachable at {self.base_url}: {e}") from None
+        with response:
+            if response.status_code >= 400:
+                raise OllamaError(f"pull {name} failed ({response.status_code}): {response.text}")
+            for line in response.iter_lines():
+                if cancel_event is not None and cancel_event.is_set():
+                    raise OllamaError(f"pull {name} cancelled")
+                if not line:
+                    continue
+                event = json.loads(line)
+                if "error" in event:
+                    progress.error = event["error"]
+                    on_progress(replace(progress))
+                    raise OllamaError(f"pull {name} failed: {event['error']}")
+                if event.get("digest") and event.get("total"):
+                    layers[event["digest"]] = (event.get("completed", 0), event["total"])
+                progress.status = event.get("status", progress.status)
+                progress.completed = sum(completed for completed, _ in layers.values())
+                progress.total = sum(total for _, total in layers.values())
+                progress.done = progress.status == "success"
+                on_progress(replace(progress))
+        self.invalidate()
+        if not progress.done:
+            raise OllamaError(f"pull {name} ended before completing ({progress.status})")
+        return progress
+
+    def pull_many(self, names: List[str], on_progress: Callable[[PullProgress], None] = None,
+                  max_parallel: int = 3, skip_present: bool = True) -> Dict[str, Optional[str]]:
+        """Pull several models at once; returns model -> error message, or None on success"""
+        names = list(dict.fromkeys(names))
+        if skip_present:
+            present = [name for name in names if self.has_model(name)]
+            for name in present:
+                if on_progress is not None:
+                    on_progress(PullProgress(name, "already present", done=True))
+        else:
+            present = []
+        errors = {name: None for name in present}
+
+        def pull_one(name):
+            try:
+                self.pull(name, on_progress)
+                return None
+            except (OllamaError, ValueError) as e:
+                return str(e)
+
+        missing = [name for name in names if name not in errors]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(missing)))) as executor:
+                errors.update(zip(missing, executor.map(pull_one, missing)))
+        return errors
+
+    def delete(self, name: str):
+        self.request("DELETE", "/api/delete", json={"model": name})
+        self.invalidate()
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_model_manager() -> OllamaModelManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = OllamaModelManager()
+        return _manager
@@ -1,6 +1,20 @@
 import subprocess
 import shutil
-import json
+import threading
+import time
+import requests
+from core.ollama_client import OLLAMA_URL, OllamaError, format_bytes, get_model_manager
+
+DEFAULT_KEEP_ALIVE = "30m"
+# num_predict guards against a model that never closes its JSON; a longer plan is cut off
+# at this many tokens, so raise it (or set None) in config["ollama_options"] when needed
+DEFAULT_OLLAMA_OPTIONS = {
+    "num_ctx": 4096,
+    "num_predict": 1024,
+    "num_thread": None
+}
+# Seconds between progress lines logged for one model
+PROGRESS_LOG_INTERVAL = 1.0
 
 def is_ollama_installed():
     return shutil.which("ollama") is not None
@@ -11,38 +25,125 @@ def install_ollama(log_callback):
     subprocess.run(command, shell=True)
     log_callback("✅ Ollama installed.")
 
+def ensure_server(log_callback=None) -> bool:
+    """Start `ollama serve` in the background when the API is not answering"""
+    manager = get_model_manager()
+    if manager.is_running():
+        return True
+    if not is_ollama_installed():
+        return False
+    if log_callback:
+        log_callback("🚀 Starting the Ollama server...")
+    subprocess.Popen(
+        ["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    return manager.wait_until_running()
+
 def is_model_pulled(model_name):
-    try:
-        result = subprocess.run(
-            ["ollama", "list", "--json"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        if result.returncode == 0:
-            models = json.loads(result.stdout)
-            return any(model["name"].startswith(model_name) for model in models.get("models", []))
+    return get_model_manager().has_model(model_name)
+
+def progress_logger(log_callback):
+    """Turn PullProgress updates into at most one log line per model per PROGRESS_LOG_INTERVAL"""
+    last = {}
+
+    def on_progress(progress):
+        now = time.monotonic()
+        key = (progress.model, progress.status)
+        if not progress.done and not progress.error and last.get(progress.model, (None, 0))[0] == key \
+                and now - last[progress.model][1] < PROGRESS_LOG_INTERVAL:
+            return
+        last[progress.model] = (key, now)
+        if progress.error:
+            log_callback(f"❌ {progress.model}: {progress.error}")
+        elif progress.total:
+            log_callback(
+                f"{progress.model}: {progress.status} {format_bytes(progress.completed)} / "
+                f"{format_bytes(progress.total)} ({progress.fraction:.0%})"
+            )
         else:
-            return False
-    except Exception:
-        return False
+            log_callback(f"{progress.model}: {progress.status}")
+
+    return on_progress
+
+def pull_models(model_names, log_callback, on_progress=None, max_parallel=3):
+    """Pull several models concurrently over the HTTP API; returns model -> error or None"""
+    log_progress = progress_logger(log_callback)
+
+    def report(progress):
+        log_progress(progress)
+        if on_progress is not None:
+            on_progress(progress)
+
+    log_callback(f"📥 Pulling {', '.join(model_names)}...")
+    errors = get_model_manager().pull_many(model_names, report, max_parallel=max_parallel)
+    for name, error in errors.items():
+        log_callback(f"❌ Could not pull '{name}': {error}" if error else f"✅ Model '{name}' is ready.")
+    return errors
 
 def pull_model(model_name, log_callback):
     if is_model_pulled(model_name):
         log_callback(f"✅ Model '{model_name}' already exists. Skipping pull.")
         return
+    pull_models([model_name], log_callback)
+
+def log_footprint(model_names, log_callback):
+    try:
+        rows = get_model_manager().footprint(model_names)
+    except OllamaError as e:
+        log_callback(f"⚠️ Could not read model sizes: {e}")
+        return
+    for row in rows:
+        memory = f", {format_bytes(row['memory_bytes'])} in memory" if row["memory_bytes"] else ""
+        vram = f" ({format_bytes(row['vram_bytes'])} VRAM)" if row["vram_bytes"] else ""
+        log_callback(f"💾 {row['name']}: {format_bytes(row['disk_bytes'])} on disk{memory}{vram}")
+
+def runtime_options(overrides: dict = None) -> dict:
+    """Options sent with every request for a model; Ollama reloads the runner when they change"""
+    options = {**DEFAULT_OLLAMA_OPTIONS, **(overrides or {})}
+    return {key: value for key, value in options.items() if value is not None}
 
-    log_callback(f"📥 Pulling model: {model_name}...")
-    process = subprocess.Popen(
-        ["ollama", "pull", model_name],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True
+def preload_model(model_name, keep_alive=DEFAULT_KEEP_ALIVE, timeout=600, options: dict = None):
+    """Load the model into Ollama's memory and return its timings in seconds.
+
+    options must be the config's ollama_options, so the runner loaded here
+    is the one chat requests use.
+    """
+    response = requests.post(
+        f"{OLLAMA_URL}/api/generate",
+        json={"model": model_name, "prompt": "", "keep_alive": keep_alive, "stream": False,
+              "options": runtime_options(options)},
+        timeout=timeout
     )
+    response.raise_for_status()
+    data = response.json()
+    return {
+        "load_duration": data.get("load_duration", 0) / 1e9,
+        "total_duration": data.get("total_duration", 0) / 1e9
+    }
+
+class KeepWarm:
+    """Periodically re-send an empty request so Ollama keeps the model loaded"""
+
+    def __init__(self, model_name, keep_alive=DEFAULT_KEEP_ALIVE, interval=240, options: dict = None):
+        self.model_name = model_name
+        self.keep_alive = keep_alive
+        self.options = options
+        self.interval = interval
+        self.last_timings = {}
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="ollama-keep-warm", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.last_timings = preload_model(self.model_name, self.keep_alive, timeout=60,
+                                                  options=self.options)
+            except requests.RequestException:
+                pass
 
-    for line in iter(process.stdout.readline, ''):
-        if line:
-            log_callback(line.strip())
-    process.stdout.close()
-    process.wait()
-    log_callback("✅ Model pulling complete.")
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,82 @@
+from collections import deque
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QPlainTextEdit
+
+class OutputBuffer(QObject):
+    """Coalesce executor output into periodic batches for the GUI.
+
+    Chunks are queued in a bounded ring and flushed every interval_ms, or
+    immediately once flush_chars have accumulated. When the ring overflows
+    the oldest chunks are dropped, and a batch longer than max_lines is cut
+    to its tail, since those lines would scroll out of the bounded view
+    anyway.
+    """
+    flushed = pyqtSignal(str)
+
+    def __init__(self, interval_ms: int = 50, flush_chars: int = 256 * 1024,
+                 max_chunks: int = 4096, max_lines: int = 10000, parent=None):
+        super().__init__(parent)
+        self.flush_chars = flush_chars
+        self.max_lines = max_lines
+        self.pending = deque(maxlen=max_chunks)
+        self.pending_chars = 0
+        self.dropped = 0
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def append(self, text: str):
+        if len(self.pending) == self.pending.maxlen:
+            self.pending_chars -= len(self.pending[0])
+            self.dropped += 1
+        self.pending.append(text)
+        self.pending_chars += len(text)
+        if self.pending_chars >= self.flush_chars:
+            self.flush()
+        elif not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        self.timer.stop()
+        if not self.pending:
+            return
+        text = "\n".join(self.pending)
+        skipped = text.count("\n") + 1 - self.max_lines
+        if skipped > 0:
+            text = text.split("\n", skipped)[-1]
+        if self.dropped or skipped > 0:
+            text = f"… earlier output skipped ({self.dropped} chunks, {max(skipped, 0)} lines) …\n{text}"
+            self.dropped = 0
+        self.pending.clear()
+        self.pending_chars = 0
+        self.flushed.emit(text)
+
+    def clear(self):
+        self.timer.stop()
+        self.pending.clear()
+        self.pending_chars = 0
+        self.dropped = 0
+
+
+class ScrollbackView(QPlainTextEdit):
+    """Read-only plain-text view that keeps at most max_lines lines.
+
+    Trimming happens in bulk once the document is a quarter over the cap,
+    which is much cheaper than QPlainTextEdit's per-block maximumBlockCount.
+    """
+
+    def __init__(self, max_lines: int = 10000, parent=None):
+        super().__init__(parent)
+        self.max_lines = max_lines
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+
+    def append_batch(self, text: str):
+        self.appendPlainText(text)
+        document = self.document()
+        excess = document.blockCount() - self.max_lines
+        if excess > self.max_lines // 4:
+            cursor = QTextCursor(document)
+            cursor.setPosition(document.findBlockByNumber(excess).position(), QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
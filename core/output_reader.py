@@ -0,0 +1,126 @@
+import os
+import re
+import signal
+import time
+import pexpect
+
+ANSI_ESCAPE = re.compile(r'(\x9B|\x1B\[)[0-?]*[ -\/]*[@-~]')
+INTERACTIVE_PROMPT = re.compile(
+    r'(?P<password>password[^\n]*:\s*$)'
+    r'|(?P<yesno>(?:are you sure|do you want to continue)[^\n]*\?\s*\[y/n\]\s*$)',
+    re.IGNORECASE
+)
+PROMPT_SCAN_WINDOW = 256
+# Signals sent to the foreground process group of an interrupted command,
+# with the seconds to wait for the shell prompt after each one
+INTERRUPT_SIGNALS = ((signal.SIGINT, 1.5), (signal.SIGTERM, 1.5), (signal.SIGKILL, 2.0))
+
+def signal_foreground(shell, sig) -> bool:
+    """Signal the foreground job of the shell's terminal; returns False if there is none to signal.
+
+    When bash itself is in the foreground (a builtin such as read is
+    waiting) only SIGINT is sent, to bash, so the shell survives.
+    """
+    try:
+        group = os.tcgetpgrp(shell.child_fd)
+    except OSError:
+        return False
+    try:
+        if group == shell.pid:
+            if sig != signal.SIGINT:
+                return False
+            os.kill(shell.pid, signal.SIGINT)
+        else:
+            os.killpg(group, sig)
+    except ProcessLookupError:
+        pass
+    return True
+
+class OutputReader:
+    """Read command output from a pexpect shell in large chunks until the prompt sentinel.
+
+    The shell prints "<sentinel>:<exit code>" on its own line from
+    PROMPT_COMMAND, so the end of a command is detected with a single
+    search per chunk instead of an expect() per output line.
+    """
+
+    def __init__(self, shell, sentinel: str, chunk_size: int = 65536, poll_timeout: float = 0.05):
+        self.shell = shell
+        self.sentinel = re.compile(re.escape(sentinel) + r':(\d+)\r?\n')
+        self.tail_keep = len(sentinel) + 16
+        self.chunk_size = chunk_size
+        self.poll_timeout = poll_timeout
+        self.interrupted = None
+        self.escalation = None
+        self.next_signal_at = 0.0
+
+    def emit(self, text: str, on_output):
+        cleaned = ANSI_ESCAPE.sub('', text).replace('\r', '').strip()
+        if cleaned:
+            on_output(cleaned)
+
+    def check_interrupt(self, should_stop) -> bool:
+        """Start or advance the signal escalation; returns False once the shell is beyond recovery"""
+        if self.interrupted is None:
+            reason = should_stop() if should_stop is not None else None
+            if reason is None:
+                return True
+            self.interrupted = reason
+            self.escalation = iter(INTERRUPT_SIGNALS)
+            self.next_signal_at = 0.0
+        if time.monotonic() < self.next_signal_at:
+            return True
+        step = next(self.escalation, None)
+        if step is None:
+            return False
+        sig, grace = step
+        if not signal_foreground(self.shell, sig):
+            self.escalation = iter(())
+        self.next_signal_at = time.monotonic() + grace
+        return True
+
+    def read_until_prompt(self, on_output, on_prompt, should_stop=None, on_tick=None):
+        """Stream output to on_output and interactive prompts to on_prompt.
+
+        should_stop() is polled while waiting; once it returns a reason the
+        command's process group gets SIGINT, SIGTERM and SIGKILL in turn
+        until the prompt comes back, and the reason is left in
+        self.interrupted. Returns the command's exit code, or None if the
+        shell exited or did not come back. on_tick() is called once per
+        poll, e.g. to sample resource usage.
+        """
+        pending = ""
+        while True:
+            if on_tick is not None:
+                on_tick()
+            if not self.check_interrupt(should_stop):
+                self.emit(pending, on_output)
+                return None
+            try:
+                chunk = self.shell.read_nonblocking(self.chunk_size, self.poll_timeout)
+            except pexpect.TIMEOUT:
+                continue
+            except pexpect.EOF:
+                self.emit(pending, on_output)
+                return None
+
+            pending += chunk
+            match = self.sentinel.search(pending)
+            if match:
+                self.emit(pending[:match.start()], on_output)
+                return int(match.group(1))
+
+            cut = pending.rfind('\n')
+            if cut >= 0:
+                self.emit(pending[:cut], on_output)
+                pending = pending[cut + 1:]
+            elif len(pending) > self.chunk_size:
+                self.emit(pending[:-self.tail_keep], on_output)
+                pending = pending[-self.tail_keep:]
+
+            prompt = INTERACTIVE_PROMPT.search(pending[-PROMPT_SCAN_WINDOW:])
+            if prompt:
+                kind = "password" if prompt.group("password") else "yesno"
+                message = ANSI_ESCAPE.sub('', pending).replace('\r', '').strip()
+                pending = ""
+                on_prompt(kind, message)
@@ -0,0 +1,160 @@
+import glob
+import os
+import threading
+import uuid
+from collections import deque
+from typing import Iterator
+from core.logger import LOG_DIR
+
+SPILL_DIR = os.path.join(LOG_DIR, "output")
+# Byte offset of every INDEX_EVERY-th line is kept for paging spilled output
+INDEX_EVERY = 1024
+
+def prune_spill_files(spill_dir: str = SPILL_DIR, keep: int = 50):
+    """Delete all but the newest keep spill files"""
+    paths = sorted(glob.glob(os.path.join(spill_dir, "*.log")), key=os.path.getmtime)
+    for path in paths[:-keep] if keep else paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+class OutputStore:
+    """Append-only command output whose memory use stays bounded.
+
+    Output is held in memory until it passes memory_chars. After that
+    everything goes to a spill file under logs/output, and memory keeps
+    only the first head_chars and the last tail_chars characters. A sparse
+    line index allows paging through the file without loading it. With
+    spill_dir=None nothing is written to disk and only head and tail are kept.
+    """
+
+    def __init__(self, memory_chars: int = 256 * 1024, head_chars: int = 4096, tail_chars: int = 64 * 1024,
+                 spill_dir: str = SPILL_DIR, keep_files: int = 50):
+        self.memory_chars = memory_chars
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.spill_dir = spill_dir
+        self.keep_files = keep_files
+        self.lock = threading.Lock()
+        self.chunks = deque()
+        self.memory_used = 0
+        self.head = ""
+        self.path = None
+        self.file = None
+        self.size = 0
+        self.line_count = 0
+        self.spilled_lines = 0
+        self.line_offsets = [0]
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def append(self, text: str):
+        """Add one chunk of output, stored as a line of its own"""
+        text += "\n"
+        data = text.encode("utf-8", "replace")
+        with self.lock:
+            if len(self.head) < self.head_chars:
+                self.head += text[:self.head_chars - len(self.head)]
+            if self.file is None and self.spill_dir and self.memory_used + len(text) > self.memory_chars:
+                self.spill()
+            if self.file is not None:
+                self.index_lines(data)
+                self.file.write(data)
+            self.line_count += text.count("\n")
+            self.size += len(data)
+            self.chunks.append(text)
+            self.memory_used += len(text)
+            limit = self.memory_chars if self.file is None and self.spill_dir else self.tail_chars
+            while self.memory_used > limit and len(self.chunks) > 1:
+                self.memory_used -= len(self.chunks.popleft())
+
+    def spill(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        prune_spill_files(self.spill_dir, self.keep_files - 1)
+        self.path = os.path.join(self.spill_dir, f"{uuid.uuid4().hex}.log")
+        self.file = open(self.path, "w+b")
+        for chunk in self.chunks:
+            data = chunk.encode("utf-8", "replace")
+            self.index_lines(data)
+            self.file.write(data)
+
+    def index_lines(self, data: bytes):
+        """Record offsets of lines crossing an INDEX_EVERY boundary in data about to be written"""
+        base = self.file.tell()
+        position = data.find(b"\n")
+        while position != -1:
+            self.spilled_lines += 1
+            if self.spilled_lines % INDEX_EVERY == 0:
+                self.line_offsets.append(base + position + 1)
+            position = data.find(b"\n", position + 1)
+
+    def tail(self) -> str:
+        with self.lock:
+            return "".join(self.chunks)
+
+    def text(self) -> str:
+        """All output when it is still in memory, else the head and tail around a gap marker"""
+        with self.lock:
+            tail = "".join(self.chunks)
+            if self.path is None:
+                return tail
+            return f"{self.head}\n… {self.size} bytes in {self.line_count} lines, full output in {self.path} …\n{tail}"
+
+    def read_lines(self, start: int, count: int) -> str:
+        """Lines start..start+count, read from the spill file when the output was spilled"""
+        with self.lock:
+            if self.path is None:
+                lines = "".join(self.chunks).split("\n")[:self.line_count]
+                return "\n".join(lines[start:start + count])
+            if self.file is not None:
+                self.file.flush()
+            block = min(start // INDEX_EVERY, len(self.line_offsets) - 1)
+            path = self.path
+            offset = self.line_offsets[block]
+            skip = start - block * INDEX_EVERY
+        lines = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for index, line in enumerate(f):
+                if index < skip:
+                    continue
+                if len(lines) >= count:
+                    break
+                lines.append(line.decode("utf-8", "replace").rstrip("\n"))
+        return "\n".join(lines)
+
+    def iter_pages(self, page_lines: int = INDEX_EVERY) -> Iterator[str]:
+        for start in range(0, self.line_count, page_lines):
+            yield self.read_lines(start, page_lines)
+
+    def excerpt(self, head_chars: int = 2000, tail_chars: int = 2000) -> dict:
+        """Compact reference to the output for logs: sizes, spill path, head and tail"""
+        with self.lock:
+            tail = "".join(self.chunks)
+            complete = self.path is None and len(tail) <= head_chars + tail_chars
+            return {
+                "bytes": self.size,
+                "lines": self.line_count,
+                "path": self.path,
+                "head": tail if complete else self.head[:head_chars],
+                "tail": "" if complete else tail[-tail_chars:]
+            }
+
+    def close(self):
+        """Stop writing; the spill file stays for the log reference"""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def discard(self):
+        """Close and delete the spill file, for output that is not referenced anywhere"""
+        self.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,167 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+from core.prompts import EXAMPLES_HEADING, HISTORY_HEADING
+
+PROMPT_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+CONTEXT_SKIP_KEYS = {"command_history", "examples", "last_sequence", "prompt_stats"}
+MAX_STORED_TURNS = 20
+
+class TokenCounter:
+    """Count and truncate text in tokens, falling back to a character estimate.
+
+    tiktoken downloads its BPE tables on first use; when that fails (offline,
+    no cache) lengths are estimated at CHARS_PER_TOKEN characters per token.
+    """
+
+    def __init__(self, encoding_name: str = PROMPT_ENCODING):
+        self.encoding_name = encoding_name
+        self.encoding = None
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def get_encoding(self):
+        with self.lock:
+            if not self.loaded:
+                try:
+                    import tiktoken
+                    self.encoding = tiktoken.get_encoding(self.encoding_name)
+                except Exception:
+                    self.encoding = None
+                self.loaded = True
+        return self.encoding
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        encoding = self.get_encoding()
+        if encoding is None:
+            return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int, keep: str = "head") -> str:
+        """Cut text to max_tokens, keeping its head or its tail"""
+        if max_tokens <= 0:
+            return ""
+        encoding = self.get_encoding()
+        if encoding is None:
+            limit = max_tokens * CHARS_PER_TOKEN
+            if len(text) <= limit:
+                return text
+            return text[:limit] if keep == "head" else text[-limit:]
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        kept = tokens[:max_tokens] if keep == "head" else tokens[-max_tokens:]
+        return encoding.decode(kept)
+
+_counter = TokenCounter()
+
+def get_token_counter() -> TokenCounter:
+    return _counter
+
+def compact_commands(sequence) -> List[str]:
+    """Reduce a CommandSequence (model, dict or list of commands) to its command strings"""
+    if sequence is None:
+        return []
+    if hasattr(sequence, "commands"):
+        entries = sequence.commands
+    elif isinstance(sequence, dict):
+        entries = sequence.get("commands", [])
+    else:
+        entries = sequence
+    commands = []
+    for entry in entries:
+        if isinstance(entry, str):
+            commands.append(entry)
+        elif isinstance(entry, dict):
+            commands.append(entry.get("command", ""))
+        else:
+            commands.append(getattr(entry, "command", ""))
+    return [command for command in commands if command]
+
+def remember_turn(context: dict, instruction: str, sequence, max_turns: int = MAX_STORED_TURNS) -> dict:
+    """Return context with this turn appended to its compact command_history"""
+    history = list(context.get("command_history", []))
+    history.append({"instruction": instruction, "commands": compact_commands(sequence)})
+    return {**context, "command_history": history[-max_turns:]}
+
+class PromptBuilder:
+    """Assemble the generation prompt within fixed per-section token budgets.
+
+    Each history turn is rendered once, newest first, as its instruction and
+    its commands joined by " ; ". Turns that no longer fit are reduced to
+    their instruction and then dropped, so prompt size stays flat however
+    long the session runs. When the context carries retrieved "examples"
+    they fill the same section and budget in place of the history, most
+    similar last. The static prefix is sent separately ahead of the
+    rendered template and only counted here.
+    """
+
+    def __init__(self, template: str, prefix: str = "", history_tokens: int = 600, context_tokens: int = 200,
+                 request_tokens: int = 500, counter: TokenCounter = None):
+        self.template = template
+        self.prefix = prefix
+        self.prefix_tokens = None
+        self.history_tokens = history_tokens
+        self.context_tokens = context_tokens
+        self.request_tokens = request_tokens
+        self.counter = counter or get_token_counter()
+
+    def render_context(self, context: dict) -> str:
+        lines = [
+            f"{key}: {value}" for key, value in context.items()
+            if key not in CONTEXT_SKIP_KEYS and value not in (None, "", [], {})
+        ]
+        return self.counter.truncate("\n".join(lines), self.context_tokens)
+
+    def render_history(self, history: List[Dict]) -> Tuple[str, int]:
+        """Render as many of the newest turns as fit; returns (text, dropped turns)"""
+        budget = self.history_tokens
+        lines = []
+        seen = set()
+        dropped = 0
+        for index, turn in enumerate(reversed(history)):
+            instruction = str(turn.get("instruction", "")).strip()
+            commands = " ; ".join(compact_commands(turn.get("commands")))
+            if (instruction, commands) in seen:
+                continue
+            seen.add((instruction, commands))
+            for line in (f"- {instruction} => {commands}", f"- {instruction}"):
+                cost = self.counter.count(line) + 1
+                if cost <= budget:
+                    lines.append(line)
+                    budget -= cost
+                    break
+            else:
+                dropped = len(history) - index
+                break
+        lines.reverse()
+        if dropped:
+            lines.insert(0, f"({dropped} earlier requests omitted)")
+        return "\n".join(lines), dropped
+
+    def build(self, user_input: str, context: Optional[dict] = None) -> Tuple[str, Dict[str, int]]:
+        context = context or {}
+        examples = context.get("examples")
+        history_text, dropped = self.render_history(examples or context.get("command_history", []))
+        context_text = self.render_context(context)
+        request_text = self.counter.truncate(user_input, self.request_tokens)
+        prompt = self.template.format(
+            history_heading=EXAMPLES_HEADING if examples else HISTORY_HEADING,
+            history=history_text or "(none)",
+            context=context_text or "(none)",
+            user_input=request_text
+        )
+        if self.prefix_tokens is None:
+            self.prefix_tokens = self.counter.count(self.prefix)
+        stats = {
+            "prompt_tokens": self.prefix_tokens + self.counter.count(prompt),
+            "prefix_tokens": self.prefix_tokens,
+            "history_tokens": self.counter.count(history_text),
+            "context_tokens": self.counter.count(context_text),
+            "request_tokens": self.counter.count(request_text),
+            "examples": len(examples or []),
+            "dropped_turns": dropped
+        }
+        return prompt, stats
@@ -0,0 +1,231 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+from core.json_extract import parse_command_sequence
+from core.nodes_graph import GenerationCancelled, invoke_llm
+from core.tracing import get_tracer, span
+
+class ProviderLatency:
+    """Rolling window of reply latencies per provider, for picking the hedge delay, and race wins.
+
+    A request abandoned before it replied, e.g. a loser cancelled when
+    another provider won, is kept as a censored sample: its latency is at
+    least the time it ran. Percentiles use the Kaplan-Meier estimate, so
+    losing slow requests does not make a provider look faster.
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.wins = {}
+        self.hedged_wins = {}
+
+    def record_win(self, label: str, hedged: bool):
+        with self.lock:
+            self.wins[label] = self.wins.get(label, 0) + 1
+            if hedged:
+                self.hedged_wins[label] = self.hedged_wins.get(label, 0) + 1
+
+    def record(self, label: str, seconds: float, censored: bool = False):
+        with self.lock:
+            self.samples.setdefault(label, deque(maxlen=self.window)).append((seconds, censored))
+        if not censored:
+            get_tracer().record("provider_reply", seconds, provider=label)
+
+    def percentile(self, label: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """Latency below which a share q of replies arrive; the longest censored time when too few finished"""
+        with self.lock:
+            # Replies before censorings at the same time, as Kaplan-Meier requires
+            samples = sorted(self.samples.get(label, ()))
+        if sum(not censored for _, censored in samples) < max(1, min_samples):
+            return None
+        survival = 1.0
+        at_risk = len(samples)
+        for seconds, censored in samples:
+            if not censored:
+                survival *= 1 - 1 / at_risk
+                if 1 - survival >= q:
+                    return seconds
+            at_risk -= 1
+        return samples[-1][0]
+
+    def count(self, label: str, censored: bool = False) -> int:
+        with self.lock:
+            return sum(flag == censored for _, flag in self.samples.get(label, ()))
+
+    def stats(self) -> dict:
+        with self.lock:
+            labels = list(dict.fromkeys(list(self.samples) + list(self.wins)))
+        stats = {}
+        for label in labels:
+            stats[label] = {"replies": self.count(label), "abandoned": self.count(label, censored=True),
+                            "wins": self.wins.get(label, 0), "hedged_wins": self.hedged_wins.get(label, 0)}
+            if stats[label]["replies"]:
+                stats[label].update({
+                    "p50_s": round(self.percentile(label, 0.5), 3),
+                    "p90_s": round(self.percentile(label, 0.9), 3),
+                    "p99_s": round(self.percentile(label, 0.99), 3)
+                })
+        return stats
+
+_latency = None
+_latency_lock = threading.Lock()
+
+def get_provider_latency() -> ProviderLatency:
+    global _latency
+    with _latency_lock:
+        if _latency is None:
+            _latency = ProviderLatency()
+        return _latency
+
+class AnyEvent:
+    """is_set() while any of the wrapped events is set"""
+
+    def __init__(self, *events):
+        self.events = [event for event in events if event is not None]
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self.events)
+
+class ProviderRace:
+    """Hedged requests over several chat models, primary first.
+
+    The next provider is asked when the one before it has not replied
+    within the hedge delay, or as soon as it fails. The delay is the
+    percentile-th reply latency of the primary in its recent window,
+    clamped to [min_delay, max_delay], or initial_delay until min_samples
+    replies have been seen. The first reply that parses as a
+    CommandSequence wins and the others are cancelled at their next
+    streamed chunk; a non-streaming request cannot be aborted, so it runs
+    to the end in the background and its reply is dropped. When no reply
+    parses, the primary's raw reply is returned for the repair step.
+    Streamed entries come from whichever provider streams first.
+    """
+
+    def __init__(self, providers: List[Tuple[str, object]], percentile: float = 0.9, initial_delay: float = 2.0,
+                 min_delay: float = 0.25, max_delay: float = 15.0, min_samples: int = 5,
+                 latency: ProviderLatency = None):
+        self.providers = providers
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.latency = latency or get_provider_latency()
+        self.last_winner = None
+
+    def hedge_delay(self, label: str) -> float:
+        observed = self.latency.percentile(label, self.percentile, self.min_samples)
+        if observed is None:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    def invoke_validated(self, prompt, on_entry=None, cancel_event=None) -> str:
+        """Race the providers on prompt and return the winning raw reply; called by invoke_llm"""
+        results = queue.Queue()
+        stops = []
+        leader = []
+        leader_lock = threading.Lock()
+
+        def attempt(index: int):
+            label, llm = self.providers[index]
+
+            def forward(entry):
+                with leader_lock:
+                    if not leader:
+                        leader.append(index)
+                if leader[0] == index:
+                    on_entry(entry)
+
+            started = time.monotonic()
+            try:
+                raw = invoke_llm(llm, prompt, forward if on_entry is not None else None,
+                                 AnyEvent(stops[index], cancel_event))
+            except GenerationCancelled:
+                self.latency.record(label, time.monotonic() - started, censored=True)
+                results.put((index, None, GenerationCancelled()))
+                return
+            except Exception as e:
+                results.put((index, None, e))
+                return
+            self.latency.record(label, time.monotonic() - started)
+            try:
+                parse_command_sequence(raw)
+                results.put((index, raw, None))
+            except ValueError as e:
+                results.put((index, raw, e))
+
+        def launch():
+            stops.append(threading.Event())
+            threading.Thread(target=attempt, args=(len(stops) - 1,), daemon=True).start()
+
+        with span("race", providers=[label for label, _ in self.providers]) as attrs:
+            delay = self.hedge_delay(self.providers[0][0])
+            attrs["hedge_delay_s"] = round(delay, 3)
+            launch()
+            hedge_at = time.monotonic() + delay
+            pending = 1
+            replies = {}
+            errors = []
+            while pending:
+                if cancel_event is not None and cancel_event.is_set():
+                    for stop in stops:
+                        stop.set()
+                    raise GenerationCancelled()
+                wait = 0.1
+                if len(stops) < len(self.providers):
+                    wait = min(wait, max(0.0, hedge_at - time.monotonic()))
+                try:
+                    index, raw, error = results.get(timeout=wait)
+                except queue.Empty:
+                    if len(stops) < len(self.providers) and time.monotonic() >= hedge_at:
+                        launch()
+                        pending += 1
+                        hedge_at = time.monotonic() + delay
+                    continue
+                pending -= 1
+                if error is None:
+                    for stop in stops:
+                        stop.set()
+                    self.last_winner = self.providers[index][0]
+                    attrs.update(winner=self.last_winner, hedged=len(stops) > 1)
+                    self.latency.record_win(self.last_winner, len(stops) > 1)
+                    return raw
+                if raw is not None:
+                    replies[index] = raw
+                errors.append(error)
+                if len(stops) < len(self.providers):
+                    launch()
+                    pending += 1
+                    hedge_at = time.monotonic() + delay
+            attrs.update(winner=None, hedged=len(stops) > 1)
+        if replies:
+            return replies[min(replies)]
+        raise errors[0]
+
+def create_race(provider: str, llm, get_llm, **kwargs) -> ProviderRace:
+    """Race llm against the provider described by kwargs["hedge"]: get_llm kwargs for it plus
+    "provider", and optionally percentile, initial_delay, min_delay and max_delay.
+    Another provider without a model_name gets its default model, or an error for ollama."""
+    hedge = {key: value for key, value in kwargs["hedge"].items() if value is not None}
+    options = {key: hedge[key] for key in ("percentile", "initial_delay", "min_delay", "max_delay") if key in hedge}
+    secondary_kwargs = {**kwargs, **{key: value for key, value in hedge.items() if key not in options}}
+    secondary_provider = secondary_kwargs.pop("provider")
+    secondary_kwargs.pop("hedge", None)
+    if secondary_provider != provider and "model_name" not in hedge:
+        # The primary's model name means nothing to another provider
+        if secondary_provider == "ollama":
+            raise ValueError("hedging with ollama needs a model_name (--hedge-model)")
+        secondary_kwargs["model_name"] = None
+    secondary = get_llm(secondary_provider, **secondary_kwargs)
+    secondary_model = secondary_kwargs.get("model_name") or getattr(secondary, "model_name", "")
+    return ProviderRace(
+        [
+            (f"{provider}:{kwargs.get('model_name') or ''}", llm),
+            (f"{secondary_provider}:{secondary_model}", secondary)
+        ],
+        **options
+    )
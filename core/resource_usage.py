@@ -0,0 +1,116 @@
+import os
+import time
+from typing import List, Optional, Tuple
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def format_bytes(count: Optional[int]) -> str:
+    if count is None:
+        return "-"
+    if count < 1024:
+        return f"{count} B"
+    size = float(count)
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if size < 1024:
+            break
+    return f"{size:.1f} {unit}"
+
+def format_usage(result) -> str:
+    """One-line summary of a CommandResult: exit status, wall time, CPU, peak memory and output size"""
+    status = "skipped" if result.exit_code is None and not result.duration else f"exit {result.exit_code}"
+    parts = [status, f"{result.duration:.2f}s"]
+    if result.user_cpu is not None:
+        parts.append(f"cpu {result.user_cpu:.2f}u/{result.system_cpu:.2f}s")
+    if result.peak_rss_bytes is not None:
+        parts.append(f"peak {format_bytes(result.peak_rss_bytes)}")
+    parts.append(f"{format_bytes(result.output_bytes)} out")
+    return " · ".join(parts)
+
+def shell_cpu(pid: int) -> Optional[Tuple[float, float]]:
+    """User and system CPU seconds of pid itself plus the processes it has waited for"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # Fields after the parenthesised command name start at field 3 (state)
+    fields = data[data.rfind(")") + 2:].split()
+    # utime, stime, cutime, cstime are fields 14 to 17
+    utime, stime, cutime, cstime = (int(value) for value in fields[11:15])
+    return (utime + cutime) / CLOCK_TICKS, (stime + cstime) / CLOCK_TICKS
+
+def child_pids(pid: int) -> List[int]:
+    pids = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return pids
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+def peak_rss(pid: int) -> Optional[int]:
+    """Highest resident set size pid has reached so far, in bytes (VmHWM)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+class ResourceMonitor:
+    """CPU time and peak memory of the commands run by one shell.
+
+    CPU comes from the shell's own and cumulative children times, read
+    before and after a command, so it covers builtins and every process
+    the command waited for.
+    Peak RSS is the largest VmHWM among the shell's descendants, sampled
+    every interval seconds while the command runs; a process that lives
+    for less than that can be missed. Without /proc every figure is None.
+    """
+
+    def __init__(self, shell_pid: int, interval: float = 0.1):
+        self.shell_pid = shell_pid
+        self.interval = interval
+        self.cpu_before = None
+        self.peak_rss_bytes = None
+        self.next_sample_at = 0.0
+
+    def start(self):
+        self.cpu_before = shell_cpu(self.shell_pid)
+        self.peak_rss_bytes = None
+        self.next_sample_at = 0.0
+
+    def sample(self):
+        now = time.monotonic()
+        if now < self.next_sample_at:
+            return
+        self.next_sample_at = now + self.interval
+        pending = child_pids(self.shell_pid)
+        seen = set()
+        while pending:
+            pid = pending.pop()
+            if pid in seen:
+                continue
+            seen.add(pid)
+            rss = peak_rss(pid)
+            if rss is not None and (self.peak_rss_bytes is None or rss > self.peak_rss_bytes):
+                self.peak_rss_bytes = rss
+            pending.extend(child_pids(pid))
+
+    def stop(self) -> dict:
+        """Usage since start(): user_cpu and system_cpu in seconds, peak_rss_bytes"""
+        after = shell_cpu(self.shell_pid)
+        if self.cpu_before is None or after is None:
+            user_cpu = system_cpu = None
+        else:
+            user_cpu = round(max(0.0, after[0] - self.cpu_before[0]), 3)
+            system_cpu = round(max(0.0, after[1] - self.cpu_before[1]), 3)
+        return {"user_cpu": user_cpu, "system_cpu": system_cpu, "peak_rss_bytes": self.peak_rss_bytes}
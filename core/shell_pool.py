@@ -0,0 +1,269 @@
+import atexit
+import os
+import re
+import shlex
+import shutil
+import tempfile
+import threading
+import uuid
+import pexpect
+from collections import deque
+
+READY_MARKER = "__NIDA_READY__"
+
+class ShellSession:
+    """A pre-initialized interactive bash process that keeps cwd and env between commands"""
+
+    def __init__(self, restore_path: str = None, timeout: int = 10):
+        self.shell = pexpect.spawn('/bin/bash', ['--noediting'], encoding='utf-8')
+        self.shell.setecho(False)
+        self.shell.delaybeforesend = None
+        self.uses = 0
+        self.sentinel = f"__NIDA_{uuid.uuid4().hex[:12]}__"
+        self.sentinel_re = re.compile(re.escape(self.sentinel) + r':(\d+)\r?\n')
+        self.shell.sendline(
+            f"PS1=''; PS2=''; PROMPT_COMMAND='printf \"\\n{self.sentinel}:%d\\n\" $?'"
+        )
+        if restore_path:
+            self.shell.sendline(f"source {restore_path} 2>/dev/null")
+        self.sync(timeout)
+
+    def sync(self, timeout: int = 10):
+        """Round-trip a marker through the shell and discard everything up to the next sentinel"""
+        marker_cmd = f"echo {READY_MARKER[:6]}\"\"{READY_MARKER[6:]}"
+        self.shell.sendline(marker_cmd)
+        self.shell.expect_exact(READY_MARKER, timeout=timeout)
+        self.shell.expect(self.sentinel_re, timeout=timeout)
+
+    def cwd(self):
+        """The shell's current directory, read from /proc without a round trip; None where unavailable"""
+        try:
+            return os.readlink(f"/proc/{self.shell.pid}/cwd")
+        except OSError:
+            return None
+
+    def chdir(self, path: str):
+        self.shell.sendline(f"cd -- {shlex.quote(path)}")
+        self.sync()
+
+    def isalive(self) -> bool:
+        return self.shell.isalive()
+
+    def is_healthy(self, timeout: int = 2) -> bool:
+        if not self.isalive():
+            return False
+        try:
+            self.sync(timeout)
+            return True
+        except (pexpect.TIMEOUT, pexpect.EOF):
+            return False
+
+    def snapshot(self) -> str:
+        """Write cwd and exported environment to a file another session can source"""
+        fd, path = tempfile.mkstemp(prefix="nida_shell_", suffix=".sh")
+        os.close(fd)
+        self.shell.sendline(f"{{ export -p; printf 'cd %q\\n' \"$PWD\"; }} > {path}")
+        self.sync()
+        return path
+
+    def restore(self, path: str):
+        """Load cwd and exported environment written by another session's snapshot()"""
+        self.shell.sendline(f"source {path} 2>/dev/null")
+        self.sync()
+
+    def recycle(self) -> "ShellSession":
+        path = self.snapshot()
+        try:
+            replacement = ShellSession(restore_path=path)
+        finally:
+            os.remove(path)
+        self.close()
+        return replacement
+
+    def close(self):
+        try:
+            self.shell.close(force=True)
+        except Exception:
+            pass
+
+
+class ShellPool:
+    """Warm bash sessions keyed by user session id, plus pre-spawned spares"""
+
+    def __init__(self, spares: int = 1, max_uses: int = 50):
+        self.spare_target = spares
+        self.max_uses = max_uses
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.spares = deque()
+        self.warming = 0
+        # Last known cwd of each session, for while its shell is checked out
+        self.cwds = {}
+        # Directory set by set_directory() and moves still to apply at the next acquire
+        self.directories = {}
+        self.pending_dirs = {}
+        # Snapshots from fork() still to source at the next acquire
+        self.pending_restores = {}
+
+    def acquire(self, session_id: str = "default") -> ShellSession:
+        with self.lock:
+            session = self.idle.pop(session_id, None)
+            if session is None and self.spares:
+                session = self.spares.popleft()
+            directory = self.pending_dirs.pop(session_id, None)
+            restore_path = self.pending_restores.pop(session_id, None)
+        if session is not None and not session.isalive():
+            session.close()
+            session = None
+        if session is None:
+            session = ShellSession()
+        if restore_path is not None:
+            try:
+                session.restore(restore_path)
+            finally:
+                os.remove(restore_path)
+        if directory is not None:
+            session.chdir(directory)
+        self.prewarm()
+        session.uses += 1
+        return session
+
+    def release(self, session_id: str, session: ShellSession):
+        if not session.is_healthy():
+            session.close()
+            return
+        if session.uses >= self.max_uses:
+            try:
+                session = session.recycle()
+            except Exception:
+                session.close()
+                return
+        cwd = session.cwd()
+        with self.lock:
+            previous = self.idle.get(session_id)
+            self.idle[session_id] = session
+            if cwd is not None:
+                self.cwds[session_id] = cwd
+        if previous is not None and previous is not session:
+            previous.close()
+
+    def set_directory(self, session_id: str, path: str):
+        """Move the session's shell to path at its next acquire, when path differs from the last one set.
+
+        For clients with a cwd of their own (the daemon's CLI): a `cd` run
+        by a command sticks until the client itself moves elsewhere.
+        """
+        with self.lock:
+            if self.directories.get(session_id) != path:
+                self.directories[session_id] = path
+                self.pending_dirs[session_id] = path
+
+    def fork(self, source_id: str, target_id: str):
+        """Start target_id's next shell with the cwd and exported environment of source_id's.
+
+        A state forked into a session that has no shell of its own yet is
+        passed on as is, so a session can serve only as the state that
+        other sessions fork from and merge back into.
+        """
+        with self.lock:
+            session = None if source_id in self.pending_restores else self.idle.pop(source_id, None)
+            pending = self.pending_restores.get(source_id)
+            directory = self.pending_dirs.get(source_id)
+            cwd = directory or self.cwds.get(source_id)
+        path = None
+        if pending is not None:
+            fd, path = tempfile.mkstemp(prefix="nida_shell_", suffix=".sh")
+            os.close(fd)
+            shutil.copyfile(pending, path)
+        elif session is not None:
+            try:
+                path = session.snapshot()
+                cwd = session.cwd() or cwd
+            except (pexpect.TIMEOUT, pexpect.EOF):
+                pass
+            self.release(source_id, session)
+        with self.lock:
+            previous = self.pending_restores.pop(target_id, None)
+            if path is not None:
+                self.pending_restores[target_id] = path
+            if directory is not None or (path is None and cwd is not None):
+                self.pending_dirs[target_id] = directory or cwd
+            if cwd is not None:
+                self.cwds[target_id] = cwd
+        if previous is not None:
+            os.remove(previous)
+
+    def session_cwd(self, session_id: str):
+        """Where the session's next command would run, or None before it has a shell"""
+        with self.lock:
+            pending = self.pending_dirs.get(session_id)
+            session = self.idle.get(session_id)
+            known = self.cwds.get(session_id)
+        if pending is not None:
+            return pending
+        return (session.cwd() if session is not None else None) or known
+
+    def prewarm(self):
+        """Top up the spare sessions in the background"""
+        with self.lock:
+            missing = self.spare_target - len(self.spares) - self.warming
+            self.warming += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            threading.Thread(target=self.spawn_spare, daemon=True).start()
+
+    def reserve(self, count: int):
+        """Keep at least count spares warm, e.g. one per job that may start at once"""
+        with self.lock:
+            self.spare_target = max(self.spare_target, count)
+        self.prewarm()
+
+    def spawn_spare(self):
+        try:
+            session = ShellSession()
+        except Exception:
+            session = None
+        with self.lock:
+            self.warming -= 1
+            if session is not None:
+                self.spares.append(session)
+
+    def close_session(self, session_id: str):
+        with self.lock:
+            session = self.idle.pop(session_id, None)
+            self.cwds.pop(session_id, None)
+            self.directories.pop(session_id, None)
+            self.pending_dirs.pop(session_id, None)
+            restore_path = self.pending_restores.pop(session_id, None)
+        if restore_path is not None:
+            os.remove(restore_path)
+        if session is not None:
+            session.close()
+
+    def close_helpers(self, session_id: str):
+        """Close the idle helper shells ("<session_id>:<n>") that ran parallel steps for a session"""
+        prefix = f"{session_id}:"
+        with self.lock:
+            helpers = [self.idle.pop(key) for key in list(self.idle) if key.startswith(prefix)]
+        for session in helpers:
+            session.close()
+
+    def close_all(self):
+        with self.lock:
+            sessions = list(self.idle.values()) + list(self.spares)
+            restore_paths = list(self.pending_restores.values())
+            self.idle.clear()
+            self.spares.clear()
+            self.pending_restores.clear()
+        for session in sessions:
+            session.close()
+        for path in restore_paths:
+            os.remove(path)
+
+_pool = None
+
+def get_shell_pool() -> ShellPool:
+    global _pool
+    if _pool is None:
+        _pool = ShellPool()
+        atexit.register(_pool.close_all)
+    return _pool
@@ -0,0 +1,63 @@
+import json
+import re
+from typing import List
+from core.multiple_command_model import CommandEntry
+
+COMMANDS_KEY = re.compile(r'"commands"\s*:\s*$')
+
+class CommandStreamParser:
+    """Incrementally parse a streamed CommandSequence JSON response.
+
+    Every object inside the top-level "commands" array is returned as a
+    CommandEntry as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.in_commands = False
+        self.entry_start = None
+        self.emitted = 0
+
+    def feed(self, text: str) -> List[CommandEntry]:
+        self.buffer += text
+        entries = []
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if char == "[" and self.stack == ["{"]:
+                    self.in_commands = bool(COMMANDS_KEY.search(self.buffer[:self.pos]))
+                elif char == "{" and self.in_commands and self.stack == ["{", "["]:
+                    self.entry_start = self.pos
+                self.stack.append(char)
+            elif char in "}]" and self.stack:
+                self.stack.pop()
+                if char == "}" and self.entry_start is not None and self.stack == ["{", "["]:
+                    entry = self.parse_entry(self.buffer[self.entry_start:self.pos + 1])
+                    if entry is not None:
+                        entries.append(entry)
+                    self.entry_start = None
+                elif char == "]" and self.stack == ["{"]:
+                    self.in_commands = False
+            self.pos += 1
+        return entries
+
+    def parse_entry(self, raw: str):
+        try:
+            entry = CommandEntry(**json.loads(raw))
+        except Exception:
+            return None
+        self.emitted += 1
+        return entry
@@ -0,0 +1,168 @@
+import atexit
+import bisect
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from core.logger import LOG_DIR, LogWriter
+
+TRACE_LOG = os.path.join(LOG_DIR, "trace.jsonl")
+METRICS_FILE = os.path.join(LOG_DIR, "metrics.prom")
+# Upper bounds in seconds, from cache hits and parsing up to slow model calls
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus style"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound holding the q-th observation (an estimate)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return float("inf") if bound == "+Inf" else bound
+        return float("inf")
+
+class Tracer:
+    """Timing spans for pipeline stages, written to a local JSONL trace and kept as histograms.
+
+    Set NIDA_TRACE=0 to turn span recording off entirely.
+    """
+
+    def __init__(self, path: str = TRACE_LOG, enabled: bool = None):
+        self.path = path
+        self.enabled = os.getenv("NIDA_TRACE", "1") != "0" if enabled is None else enabled
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.writer = None
+
+    def get_writer(self) -> LogWriter:
+        with self.lock:
+            if self.writer is None:
+                self.writer = LogWriter(self.path, traced=False)
+        return self.writer
+
+    def new_trace(self) -> str:
+        """Start a new trace on this thread; later spans on it share the returned id"""
+        self.local.trace_id = uuid.uuid4().hex[:16]
+        return self.local.trace_id
+
+    def current_trace(self) -> str:
+        return getattr(self.local, "trace_id", None)
+
+    def record(self, name: str, seconds: float, trace_id: str = None, status: str = "ok", **attrs):
+        """Record a span whose duration was measured by the caller"""
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+        self.get_writer().write({
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "trace_id": trace_id or self.current_trace(),
+            "span": name,
+            "duration_ms": round(seconds * 1000, 3),
+            "status": status,
+            **({"attrs": attrs} if attrs else {})
+        })
+
+    @contextmanager
+    def span(self, name: str, trace_id: str = None, **attrs):
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield attrs
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, trace_id=trace_id, status=status, **attrs)
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                name: {
+                    "count": histogram.count,
+                    "mean_ms": round(histogram.sum / histogram.count * 1000, 3) if histogram.count else 0.0,
+                    "p50_le_s": histogram.quantile(0.5),
+                    "p95_le_s": histogram.quantile(0.95),
+                    "p99_le_s": histogram.quantile(0.99)
+                }
+                for name, histogram in sorted(self.histograms.items())
+            }
+
+    def metrics_text(self) -> str:
+        lines = [
+            "# HELP nida_stage_duration_seconds Duration of NIDA pipeline stages.",
+            "# TYPE nida_stage_duration_seconds histogram"
+        ]
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                for bound, total in histogram.cumulative():
+                    lines.append(f'nida_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {total}')
+                lines.append(f'nida_stage_duration_seconds_sum{{stage="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'nida_stage_duration_seconds_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def dump_metrics(self, path: str = METRICS_FILE):
+        """Atomically write the Prometheus text exposition to path"""
+        if not self.enabled:
+            return
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.metrics_text())
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+            atexit.register(_tracer.dump_metrics)
+        return _tracer
+
+def span(name: str, **attrs):
+    return get_tracer().span(name, **attrs)
+
+def configure_langsmith(enabled: bool = None) -> bool:
+    """Turn on remote LangSmith tracing only when asked to and a key is present.
+
+    Opt in with config["langsmith"] = True or NIDA_LANGSMITH=1.
+    """
+    if enabled is None:
+        enabled = os.getenv("NIDA_LANGSMITH") == "1"
+    if not enabled or not os.getenv("LANGCHAIN_API_KEY"):
+        return False
+    os.environ.setdefault("LANGSMITH_ENDPOINT", "https://api.smith.langchain.com")
+    os.environ.setdefault("LANGCHAIN_PROJECT", "AI_LINUX")
+    os.environ["LANGSMITH_TRACING"] = "true"
+    return True
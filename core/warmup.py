@@ -0,0 +1,39 @@
+import importlib
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+
+WARMUP_MODULES = [
+    "dotenv",
+    "pydantic",
+    "langchain_core.messages",
+    "langchain_core.output_parsers",
+    "langgraph.graph",
+    "langchain_ollama",
+    "langchain_groq",
+    "core.api_client",
+    "core.command_graph",
+    "core.ai_engine",
+    "ui.main_window",
+    "ui.setup_window",
+]
+
+class WarmupThread(QThread):
+    """Import heavy modules in the background while the splash screen is visible"""
+    progress_signal = pyqtSignal(str, float)
+    finished_signal = pyqtSignal(dict)
+
+    def __init__(self, modules=None):
+        super().__init__()
+        self.modules = modules or WARMUP_MODULES
+
+    def run(self):
+        timings = {}
+        for name in self.modules:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+            timings[name] = time.perf_counter() - started
+            self.progress_signal.emit(name, timings[name])
+        self.finished_signal.emit(timings)
@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import QApplication
-from ui.setup_window import SetupWindow
 from ui.splash_screen import SplashScreen
+from core.warmup import WarmupThread
 import sys
 
 class ApplicationController:
@@ -8,12 +8,17 @@ class ApplicationController:
         self.app = QApplication(sys.argv)
         self.splash = None
         self.setup_window = None
+        self.warmup = None
 
     def show_splash(self):
         self.splash = SplashScreen(self.show_main_window)
         self.splash.show()
+        self.warmup = WarmupThread()
+        self.warmup.finished_signal.connect(self.splash.finish)
+        self.warmup.start()
 
     def show_main_window(self):
+        from ui.setup_window import SetupWindow
         self.setup_window = SetupWindow()
         self.setup_window.show()
         if self.splash:
@@ -0,0 +1,199 @@
+"""Command-line entry point for the headless NIDA daemon.
+
+    python nida.py daemon --provider ollama --model llama3.2
+    python nida.py ask "show disk usage"            # print the generated commands
+    python nida.py ask "show disk usage" --run      # confirm, then execute (Ctrl-C stops it)
+    python nida.py ping | stats | stop
+
+The daemon keeps the compiled command graph, the LLM client and warm
+shells alive, so each client call skips the cold start of main.py.
+"""
+import argparse
+import getpass
+import json
+import os
+import sys
+from core.daemon import DaemonClient, NidaDaemon, default_socket_path
+
+def groq_key(args):
+    api_key = args.api_key or os.getenv("GROQ_API_KEY")
+    if not api_key:
+        from core.db import APIKeyDB
+        api_key = APIKeyDB().get_key("groq")
+    return api_key
+
+def daemon_config(args) -> dict:
+    provider = args.provider or os.getenv("NIDA_PROVIDER", "ollama")
+    config = {
+        "provider": provider,
+        "model_name": args.model or os.getenv("NIDA_MODEL"),
+        "api_key": groq_key(args) if provider == "groq" else None,
+        "cwd": os.getcwd()
+    }
+    if args.hedge_provider:
+        config["hedge"] = {
+            "provider": args.hedge_provider,
+            "model_name": args.hedge_model,
+            "api_key": groq_key(args) if args.hedge_provider == "groq" else None,
+            "percentile": args.hedge_percentile
+        }
+    if args.groq_rpm or args.groq_tpm:
+        config["groq_limits"] = {
+            key: value for key, value in
+            (("requests_per_minute", args.groq_rpm), ("tokens_per_minute", args.groq_tpm)) if value
+        }
+    return config
+
+def run_daemon(args):
+    daemon = NidaDaemon(daemon_config(args), args.socket)
+    daemon.bind()
+    daemon.warm_up()
+    print(f"nida daemon listening on {daemon.socket_path}", file=sys.stderr)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+def send_control(args, op, **payload) -> dict:
+    """Send op on a second connection, for requests about the one still in flight on the first"""
+    client = DaemonClient(args.socket)
+    try:
+        return client.request(op, session_id=args.session, **payload)
+    finally:
+        client.close()
+
+def stoppable_request(client, args, op, on_event=None, **payload) -> dict:
+    """A request that Ctrl-C stops through op_cancel; its final reply is still returned"""
+    try:
+        return client.request(op, on_event=on_event, **payload)
+    except KeyboardInterrupt:
+        print("\nStopping…", file=sys.stderr)
+        send_control(args, "cancel")
+        return client.read_reply(on_event)
+
+def answer_prompt(args, message):
+    """Ask the user for a password or yes/no answer a running command needs, and pass it on"""
+    if not sys.stdin.isatty():
+        text = "" if message["type"] == "password" else "no"
+    elif message["type"] == "password":
+        text = getpass.getpass(message["message"].rstrip() + " ")
+    else:
+        text = input(message["message"].rstrip() + " ")
+    send_control(args, "respond", text=text)
+
+def on_execute_event(args, message):
+    if message["event"] == "prompt":
+        answer_prompt(args, message)
+    else:
+        print(message.get("text", ""), flush=True)
+
+def print_sequence(sequence):
+    for entry in sequence["commands"]:
+        print(f"{entry['order']}. {entry['command']}")
+
+def ask(client, args):
+    streamed = []
+
+    def on_entry(message):
+        if not args.json:
+            streamed.append(message["entry"]["order"])
+            print(f"{message['entry']['order']}. {message['entry']['command']}", flush=True)
+
+    reply = stoppable_request(
+        client, args, "generate", on_event=on_entry, instruction=args.instruction, session_id=args.session,
+        bypass_cache=args.no_cache, stream=not args.json, cwd=os.getcwd()
+    )
+    if not reply["ok"]:
+        print(f"error: {reply['error']}", file=sys.stderr)
+        return 1
+    sequence = reply["sequence"]
+    if reply.get("reused_from") and not args.json:
+        print(f"(reusing the commands of a similar request: {reply['reused_from']})", file=sys.stderr)
+    if args.json and not args.run:
+        print(json.dumps(reply))
+        return 0
+    if not args.json and [entry["order"] for entry in sequence["commands"]] != streamed:
+        print_sequence(sequence)
+    if not args.run:
+        return 0
+    if not args.yes:
+        if not sys.stdin.isatty() or input("Proceed? [y/N] ").strip().lower() not in ("y", "yes"):
+            print("Operation cancelled.", file=sys.stderr)
+            return 1
+
+    timeouts = {"command_timeout": args.timeout} if args.timeout is not None else {}
+    reply = stoppable_request(
+        client, args, "execute",
+        on_event=lambda message: on_execute_event(args, message),
+        sequence=sequence, instruction=args.instruction, session_id=args.session, trace_id=reply.get("trace_id"),
+        sudo_session=args.sudo_session, cwd=os.getcwd(), **timeouts
+    )
+    if not reply["ok"]:
+        print(f"error: {reply['error']}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(reply))
+    if reply.get("cancelled"):
+        return 130
+    failed = [result for result in reply["results"] if result["exit_code"] != 0]
+    return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(prog="nida", description="Headless NIDA daemon and client")
+    parser.add_argument("--socket", default=default_socket_path())
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    daemon = commands.add_parser("daemon", help="run the daemon in the foreground")
+    daemon.add_argument("--provider", choices=["ollama", "groq"])
+    daemon.add_argument("--model", help="model to use; required for ollama")
+    daemon.add_argument("--api-key")
+    daemon.add_argument("--hedge-provider", choices=["ollama", "groq"],
+                        help="also ask this provider when the first one is slow or its reply does not parse")
+    daemon.add_argument("--hedge-model",
+                        help="model of the hedge provider (default: Groq's default model; required for ollama)")
+    daemon.add_argument("--hedge-percentile", type=float, default=0.9,
+                        help="hedge once the first provider is slower than this share of its recent replies")
+    daemon.add_argument("--groq-rpm", type=int, help="Groq requests per minute of your plan (default 30)")
+    daemon.add_argument("--groq-tpm", type=int, help="Groq tokens per minute of your plan (default 6000)")
+
+    ask_parser = commands.add_parser("ask", help="generate commands for an instruction")
+    ask_parser.add_argument("instruction")
+    ask_parser.add_argument("--run", action="store_true", help="execute the generated commands")
+    ask_parser.add_argument("--yes", action="store_true", help="do not ask for confirmation")
+    ask_parser.add_argument("--session", default=f"cli-{os.getppid()}", help="keeps history and cwd per terminal")
+    ask_parser.add_argument("--no-cache", action="store_true")
+    ask_parser.add_argument("--json", action="store_true")
+    ask_parser.add_argument("--timeout", type=float, help="seconds before a running command is interrupted")
+    ask_parser.add_argument("--sudo-session", action="store_true",
+                            help="ask for the sudo password once and keep it valid until the commands finish")
+
+    commands.add_parser("ping", help="check that the daemon is running")
+    commands.add_parser("stats", help="cache, parse, per-stage timing and Groq usage statistics")
+    commands.add_parser("stop", help="shut the daemon down")
+    args = parser.parse_args()
+    if args.command == "daemon":
+        provider = args.provider or os.getenv("NIDA_PROVIDER", "ollama")
+        if provider == "ollama" and not (args.model or os.getenv("NIDA_MODEL")):
+            parser.error("the ollama provider needs --model (or NIDA_MODEL)")
+        if args.hedge_provider == "ollama" and not args.hedge_model and provider != "ollama":
+            parser.error("--hedge-provider ollama needs --hedge-model")
+
+    if args.command == "daemon":
+        run_daemon(args)
+        return 0
+    try:
+        client = DaemonClient(args.socket)
+    except OSError:
+        print(f"nida daemon is not running on {args.socket} (start it with: nida.py daemon)", file=sys.stderr)
+        return 2
+    try:
+        if args.command == "ask":
+            return ask(client, args)
+        reply = client.request({"stop": "shutdown"}.get(args.command, args.command))
+        print(json.dumps(reply, indent=2))
+        return 0 if reply["ok"] else 1
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
+from core.job_queue import (QUEUED, GENERATING, AWAITING_CONFIRMATION, READY, RUNNING, DONE, FAILED,
+                            CANCELLED, ACTIVE_STATES)
+from core.output_buffer import OutputBuffer, ScrollbackView
+from core.resource_usage import format_usage
+
+STATUS_ICONS = {
+    QUEUED: "🕓",
+    GENERATING: "⏳",
+    AWAITING_CONFIRMATION: "❓",
+    READY: "🕓",
+    RUNNING: "⚙️",
+    DONE: "✅",
+    FAILED: "❌",
+    CANCELLED: "🚫"
+}
+
+class JobPane(QWidget):
+    """Status, confirmation buttons and output of a single job.
+
+    The view holds only the newest scrollback_lines lines. Once the job is
+    done, older output is paged in from its OutputStore on request.
+    """
+
+    def __init__(self, job, queue, config: dict, parent=None):
+        super().__init__(parent)
+        self.job = job
+        self.queue = queue
+        self.page_lines = config.get("output_page_lines", 2000)
+        self.page_start = None
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        header = QHBoxLayout()
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        header.addWidget(self.status_label, 1)
+        self.run_button = QPushButton("Run")
+        self.run_button.clicked.connect(lambda: self.queue.confirm(self.job))
+        header.addWidget(self.run_button)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setStyleSheet("background-color: #b33939;")
+        self.cancel_button.clicked.connect(lambda: self.queue.cancel(self.job))
+        header.addWidget(self.cancel_button)
+        layout.addLayout(header)
+
+        self.output_box = ScrollbackView(config.get("scrollback_lines", 10000))
+        self.output_buffer = OutputBuffer(
+            interval_ms=config.get("output_flush_ms", 50),
+            max_lines=self.output_box.max_lines,
+            parent=self
+        )
+        self.output_buffer.flushed.connect(self.output_box.append_batch)
+        layout.addWidget(self.output_box)
+
+        pager = QHBoxLayout()
+        self.page_label = QLabel()
+        pager.addWidget(self.page_label, 1)
+        self.older_button = QPushButton("◀ Older")
+        self.older_button.clicked.connect(lambda: self.show_page(-1))
+        pager.addWidget(self.older_button)
+        self.newer_button = QPushButton("Newer ▶")
+        self.newer_button.clicked.connect(lambda: self.show_page(1))
+        pager.addWidget(self.newer_button)
+        self.pager = QWidget()
+        self.pager.setLayout(pager)
+        self.pager.hide()
+        layout.addWidget(self.pager)
+        self.setLayout(layout)
+        self.update_status()
+
+    def title(self) -> str:
+        instruction = self.job.instruction if len(self.job.instruction) <= 24 else self.job.instruction[:23] + "…"
+        return f"{STATUS_ICONS.get(self.job.status, '')} #{self.job.id} {instruction}"
+
+    def update_status(self):
+        job = self.job
+        text = f"#{job.id} {job.status}: {job.instruction}"
+        if job.status == FAILED and job.error:
+            text += f"\n{job.error}"
+        self.status_label.setText(text)
+        self.run_button.setVisible(job.status == AWAITING_CONFIRMATION)
+        self.cancel_button.setVisible(not job.finished)
+        self.cancel_button.setText("Stop" if job.status in ACTIVE_STATES else "Cancel")
+        if job.status == AWAITING_CONFIRMATION:
+            self.output_box.appendPlainText(f"Generated Command:\n{job.sequence}\n\nProceed?")
+        elif job.status == CANCELLED:
+            self.output_buffer.flush()
+            self.output_box.appendPlainText("Operation stopped." if job.output is not None else "Operation cancelled.")
+            self.append_usage()
+        elif job.status == FAILED:
+            self.output_box.appendPlainText(job.error or "Invalid input.")
+        elif job.status == DONE:
+            self.output_buffer.flush()
+            if not job.output.size:
+                self.output_box.appendPlainText("Command executed successfully (no output)")
+            elif job.output.line_count > self.output_box.max_lines or job.output.spilled:
+                self.pager.show()
+                self.page_label.setText(f"Showing the latest output of {job.output.line_count} lines")
+            self.append_usage()
+
+    def append_usage(self):
+        results = self.job.executor.results if self.job.executor is not None else []
+        if results:
+            self.output_box.appendPlainText(
+                "\n📊 " + "\n📊 ".join(f"{result.order}. {result.command}: {format_usage(result)}" for result in results)
+            )
+
+    def show_page(self, step: int):
+        """Replace the view with the previous or next page_lines lines of the job's output"""
+        total = self.job.output.line_count
+        last_start = max(0, total - self.page_lines)
+        start = last_start if self.page_start is None else self.page_start
+        start = min(max(0, start + step * self.page_lines), last_start)
+        self.page_start = start
+        self.output_box.setPlainText(self.job.output.read_lines(start, self.page_lines))
+        self.page_label.setText(f"Lines {start + 1}–{min(start + self.page_lines, total)} of {total}")
+        self.older_button.setEnabled(start > 0)
+        self.newer_button.setEnabled(start < last_start)
+
+    def append_entry(self, entry):
+        self.output_box.appendPlainText(f"📝 {entry.order}. {entry.command}")
+
+    def append_output(self, text: str):
+        self.output_buffer.append(text)
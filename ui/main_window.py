@@ -1,17 +1,41 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTextEdit, QPushButton, 
-                            QMessageBox, QInputDialog, QLineEdit, QFrame)
-from core.logger import log_action
-from core.command_thread import CommandThread
-from core.overlay_widget import OverlayWidget
-from core.command_handler import create_command_executor
-from PyQt5.QtCore import QThread, pyqtSignal, Qt, QTimer
-from PyQt5.QtWidgets import QApplication 
+                            QInputDialog, QLineEdit, QFrame, QCheckBox, QSpinBox,
+                            QListWidget, QListWidgetItem, QHBoxLayout, QTabWidget)
+from core.logger import get_log_writer
+from core.shell_pool import get_shell_pool
+from core.output_buffer import ScrollbackView
+from core.history_index import get_history_index
+from core.job_queue import JobQueue, AWAITING_CONFIRMATION, DONE, FAILED, CANCELLED, ACTIVE_STATES
+from core.ollama_installer import DEFAULT_KEEP_ALIVE, KeepWarm
+from ui.job_pane import JobPane
+from PyQt5.QtCore import pyqtSignal, Qt, QTimer
+import threading
+import uuid
 
 
 class MainWindow(QWidget):
+    history_backfilled = pyqtSignal()
+
     def __init__(self, config: dict):
         super().__init__()
         self.config = config
+        self.session_id = uuid.uuid4().hex
+        self.jobs = JobQueue(config, self.session_id, config.get("max_concurrent_jobs", 2), parent=self)
+        self.jobs.job_added.connect(self.on_job_added)
+        self.jobs.job_updated.connect(self.on_job_updated)
+        self.jobs.job_entry.connect(self.on_job_entry)
+        self.jobs.job_output.connect(self.on_job_output)
+        self.jobs.job_prompt.connect(self.handle_prompt)
+        self.panes = {}
+        get_shell_pool().prewarm()
+        self.keep_warm = None
+        if config.get("provider") == "ollama" and config.get("model_name"):
+            self.keep_warm = KeepWarm(
+                config["model_name"],
+                keep_alive=config.get("keep_alive") or DEFAULT_KEEP_ALIVE,
+                interval=config.get("keep_warm_interval", 240),
+                options=config.get("ollama_options")
+            ).start()
         self.setWindowTitle("NIDA - Neural Integrated Desktop Assistant")
         self.setGeometry(200, 200, 800, 600)
         self.setStyleSheet("""
@@ -23,7 +47,7 @@ class MainWindow(QWidget):
                 color: #ffffff;
                 font-size: 14px;
             }
-            QTextEdit, QLineEdit {
+            QTextEdit, QPlainTextEdit, QLineEdit {
                 background-color: #3d3d3d;
                 color: #ffffff;
                 border: 1px solid #555;
@@ -72,9 +96,21 @@ class MainWindow(QWidget):
         self.input_box = QTextEdit()
         self.input_box.setPlaceholderText("Type your Linux command instruction here...")
         instruction_layout.addWidget(self.input_box)
+        self.bypass_cache_box = QCheckBox("Bypass command cache")
+        self.bypass_cache_box.setToolTip("Always ask the AI model, even for previously seen instructions")
+        instruction_layout.addWidget(self.bypass_cache_box)
+        self.sudo_session_box = QCheckBox("Ask for the sudo password once per job")
+        self.sudo_session_box.setToolTip(
+            "Validate sudo before a job's first sudo step, keep it valid while the job runs and drop it when the job ends"
+        )
+        self.sudo_session_box.setChecked(bool(self.config.get("sudo_session")))
+        self.sudo_session_box.toggled.connect(lambda checked: self.config.__setitem__("sudo_session", checked))
+        instruction_layout.addWidget(self.sudo_session_box)
         instruction_frame.setLayout(instruction_layout)
         self.layout.addWidget(instruction_frame)
 
+        submit_row = QHBoxLayout()
+        submit_row.addStretch(1)
         self.submit_button = QPushButton("Generate and Execute")
         self.submit_button.clicked.connect(self.process_command)
         self.submit_button.setStyleSheet("""
@@ -87,15 +123,59 @@ class MainWindow(QWidget):
                 background-color: #45a049;
             }
         """)
-        self.layout.addWidget(self.submit_button, 0, Qt.AlignCenter)
+        submit_row.addWidget(self.submit_button)
+        submit_row.addWidget(QLabel("Parallel jobs:"))
+        self.concurrency_box = QSpinBox()
+        self.concurrency_box.setRange(1, 8)
+        self.concurrency_box.setValue(self.jobs.max_concurrent)
+        self.concurrency_box.setToolTip("Instructions generated or executed at the same time")
+        self.concurrency_box.valueChanged.connect(self.jobs.set_max_concurrent)
+        submit_row.addWidget(self.concurrency_box)
+        if "groq" in (config.get("provider"), (config.get("hedge") or {}).get("provider")):
+            self.usage_button = QPushButton("Usage")
+            self.usage_button.setToolTip("Groq requests and tokens per session, and the budget left this minute")
+            self.usage_button.clicked.connect(self.show_usage)
+            submit_row.addWidget(self.usage_button)
+        submit_row.addStretch(1)
+        self.layout.addLayout(submit_row)
+
+        history_frame = QFrame()
+        history_frame.setStyleSheet("padding: 10px;")
+        history_layout = QVBoxLayout()
+        history_header = QHBoxLayout()
+        history_header.addWidget(QLabel("History:"))
+        self.history_search = QLineEdit()
+        self.history_search.setPlaceholderText("Search previous instructions and commands...")
+        history_header.addWidget(self.history_search, 1)
+        self.rerun_button = QPushButton("Re-run Selected")
+        self.rerun_button.clicked.connect(self.rerun_history_entry)
+        history_header.addWidget(self.rerun_button)
+        history_layout.addLayout(history_header)
+        self.history_list = QListWidget()
+        self.history_list.setMaximumHeight(120)
+        self.history_list.itemDoubleClicked.connect(self.rerun_history_entry)
+        history_layout.addWidget(self.history_list)
+        history_frame.setLayout(history_layout)
+        self.layout.addWidget(history_frame)
+
+        self.history = get_history_index()
+        get_log_writer().add_listener(self.history.add_records)
+        self.history_timer = QTimer(self)
+        self.history_timer.setSingleShot(True)
+        self.history_timer.setInterval(120)
+        self.history_timer.timeout.connect(self.refresh_history)
+        self.history_search.textChanged.connect(lambda _: self.history_timer.start())
+        self.history_backfilled.connect(self.history_timer.start)
+        threading.Thread(target=self.backfill_history, daemon=True).start()
 
         output_frame = QFrame()
         output_frame.setStyleSheet("padding: 10px;")
         output_layout = QVBoxLayout()
-        output_layout.addWidget(QLabel("Command Output:"))
-        self.output_box = QTextEdit()
-        self.output_box.setReadOnly(True)
-        output_layout.addWidget(self.output_box)
+        output_layout.addWidget(QLabel("Jobs:"))
+        self.job_tabs = QTabWidget()
+        self.job_tabs.setTabsClosable(True)
+        self.job_tabs.tabCloseRequested.connect(self.close_job_tab)
+        output_layout.addWidget(self.job_tabs)
         output_frame.setLayout(output_layout)
         self.layout.addWidget(output_frame, 1)
 
@@ -103,128 +183,159 @@ class MainWindow(QWidget):
         log_frame.setStyleSheet("padding: 10px;")
         log_layout = QVBoxLayout()
         log_layout.addWidget(QLabel("Logs:"))
-        self.log_view = QTextEdit()
-        self.log_view.setReadOnly(True)
+        self.log_view = ScrollbackView(self.config.get("log_scrollback_lines", 2000))
         log_layout.addWidget(self.log_view)
         log_frame.setLayout(log_layout)
         self.layout.addWidget(log_frame, 1)
 
-        self.overlay = OverlayWidget()
         self.setLayout(self.layout)
 
     def log(self, message):
-        self.log_view.append(message)
-        self.log_view.verticalScrollBar().setValue(
-            self.log_view.verticalScrollBar().maximum()
-        )
-        QApplication.processEvents()
-
-    def on_command_done(self, instruction, command):
-        self.overlay.hide() 
-        self.log(f"✅ Command Generated: {command}")  
-
-        reply = QMessageBox.question(self, "Confirm Command",
-                                     f"Generated Command:\n\n{command}\n\nProceed?",
-                                     QMessageBox.Yes | QMessageBox.No)
-
-        if reply == QMessageBox.Yes:
-            self.execute_command(instruction, command)
-        else:
-            self.log("🚫 Operation cancelled.")
-            self.output_box.setText("Operation cancelled.")
-            self.submit_button.setEnabled(True) 
-
-    def execute_command(self, instruction, command):
-        try:
-            self.log("⚙️ Executing command...")
-            
-            self.command_executor = create_command_executor(command)
-            self.command_executor.output_signal.connect(self.update_output)
-            self.command_executor.prompt_signal.connect(self.handle_prompt)
-            self.command_executor.finished_signal.connect(
-                lambda output: self.handle_command_finished(instruction, command, output)
-            )
-            self.command_executor.start()
+        self.log_view.append_batch(message)
+
+    def show_usage(self):
+        from ui.usage_dialog import UsageDialog
+        dialog = UsageDialog(self.session_id, parent=self)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+        dialog.show()
+
+    def backfill_history(self):
+        self.history.backfill()
+        self.history_backfilled.emit()
+
+    def refresh_history(self):
+        self.history_list.clear()
+        for entry in self.history.search(self.history_search.text()):
+            status = "" if entry["exit_code"] in (None, 0) else f" [exit {entry['exit_code']}]"
+            commands = entry["commands"].replace("\n", " ; ")
+            item = QListWidgetItem(f"{entry['ts'][:16]}  {entry['instruction']}  →  {commands}{status}")
+            item.setData(Qt.UserRole, entry["id"])
+            item.setData(Qt.UserRole + 1, entry["instruction"])
+            self.history_list.addItem(item)
+
+    def rerun_history_entry(self, *args):
+        item = self.history_list.currentItem()
+        if item is None:
+            return
+        sequence = self.history.get_sequence(item.data(Qt.UserRole))
+        if sequence is None:
+            return
+        self.log("♻️ Loaded command sequence from history (no AI call)")
+        self.jobs.submit(item.data(Qt.UserRole + 1), sequence=sequence)
 
-        except Exception as e:
-            self.log(f"❌ Error executing command: {e}")
-            self.output_box.setText(f"Error executing command: {e}")
+    def job_pane(self, job):
+        return self.panes.get(job.id)
 
-    def update_output(self, text):
-        self.output_box.append(text)
+    def on_job_added(self, job):
+        pane = JobPane(job, self.jobs, self.config)
+        self.panes[job.id] = pane
+        self.job_tabs.addTab(pane, pane.title())
+        self.job_tabs.setCurrentWidget(pane)
+        self.trim_job_tabs()
 
-    def handle_prompt(self, prompt_info):
+    def trim_job_tabs(self):
+        """Close the oldest finished panes beyond max_job_panes"""
+        limit = self.config.get("max_job_panes", 20)
+        index = 0
+        while self.job_tabs.count() > limit and index < self.job_tabs.count():
+            if self.job_tabs.widget(index).job.finished:
+                self.close_job_tab(index)
+            else:
+                index += 1
+
+    def closeEvent(self, event):
+        self.jobs.close()
+        super().closeEvent(event)
+
+    def close_job_tab(self, index):
+        pane = self.job_tabs.widget(index)
+        if not pane.job.finished:
+            active = pane.job.status in ACTIVE_STATES
+            self.jobs.cancel(pane.job)
+            if active:
+                self.log(f"⏹ Stopping job #{pane.job.id}; close its tab once it has stopped")
+                return
+        self.job_tabs.removeTab(index)
+        self.panes.pop(pane.job.id, None)
+        self.jobs.forget(pane.job)
+        pane.deleteLater()
+
+    def on_job_entry(self, job, entry):
+        pane = self.job_pane(job)
+        if pane is not None:
+            pane.append_entry(entry)
+
+    def on_job_output(self, job, text):
+        pane = self.job_pane(job)
+        if pane is not None:
+            pane.append_output(text)
+
+    def on_job_updated(self, job):
+        pane = self.job_pane(job)
+        if pane is not None:
+            pane.update_status()
+            self.job_tabs.setTabText(self.job_tabs.indexOf(pane), pane.title())
+        if job.status == AWAITING_CONFIRMATION:
+            self.on_command_done(job)
+        elif job.status == DONE:
+            self.log(f"✅ Job #{job.id} executed successfully")
+            if job.output.size:
+                self.log(f"Output: {job.output.line_count} lines (see job #{job.id})")
+            self.history_timer.start()
+        elif job.status == FAILED:
+            self.log(f"❌ Job #{job.id} error: {job.error}")
+        elif job.status == CANCELLED:
+            self.log(f"🚫 Job #{job.id} cancelled.")
+
+    def on_command_done(self, job):
+        if job.from_cache:
+            from core.ai_engine import cache_stats
+            stats = cache_stats()
+            self.log(f"⚡ Loaded from cache ({stats['hits']} hits / {stats['misses']} misses)")
+        elif job.reused_from:
+            self.log(f"♻️ Reusing the commands of a similar earlier request: {job.reused_from} (no AI call)")
+        elif job.timings:
+            timings = job.timings
+            self.log(
+                f"⏱ Ollama: load {timings['load_duration']:.2f}s · "
+                f"prompt eval {timings['prompt_eval_duration']:.2f}s ({timings['prompt_eval_count']} tokens) · "
+                f"generation {timings['eval_duration']:.2f}s ({timings['eval_count']} tokens)"
+            )
+        self.log(f"✅ Job #{job.id} command generated: {job.sequence} (press Run in its tab)")
+
+    def handle_prompt(self, job, prompt_info):
+        title = f"Job #{job.id}: {job.instruction}"
         if prompt_info.type == "password":
             password, ok = QInputDialog.getText(
                 self, 
-                "Password Required",
+                f"Password Required - {title}",
                 prompt_info.message,
                 QLineEdit.Password
             )
             if ok:
-                self.command_executor.send_response(password)
+                self.jobs.send_response(job, password)
             else:
-                self.command_executor.send_response("")
+                self.jobs.send_response(job, "")
 
         elif prompt_info.type == "yesno":
             reply, ok = QInputDialog.getItem(
                 self,
-                "Confirmation Required",
+                f"Confirmation Required - {title}",
                 prompt_info.message,
                 prompt_info.options,
                 editable=False
             )
             if ok:
-                self.command_executor.send_response(reply)
+                self.jobs.send_response(job, reply)
             else:
-                self.command_executor.send_response("no")
-
-    def handle_command_finished(self, instruction, command, output):
-        """Handle command completion"""
-        if hasattr(self, 'command_executor'):
-            self.command_executor.output_signal.disconnect()
-            self.command_executor.finished_signal.disconnect()
-            self.command_executor.prompt_signal.disconnect()
-            
-        self.log("✅ Command executed successfully")
-        
-        if output and output.strip():
-            self.log(f"Output:\n{output}")
-            self.output_box.setText(output)
-            log_action(instruction, command, output)
-        else:
-            message = "Command executed successfully (no output)"
-            self.log(message)
-            self.output_box.setText(message)
-            log_action(instruction, command, "No output")
-        
-        self.overlay.hide()
-        self.submit_button.setEnabled(True)
-
-    def on_command_error(self, error_message):
-        self.overlay.hide()  
-        self.log(f"❌ Error: {error_message}")
-        self.output_box.setText(error_message or "Invalid input.")
-        self.submit_button.setEnabled(True)
-    
+                self.jobs.send_response(job, "no")
+
     def process_command(self):
-        self.output_box.clear()
-        self.submit_button.setEnabled(False) 
-    
         instruction = self.input_box.toPlainText().strip()
         if not instruction:
-            self.output_box.setText("Please enter an instruction.")
-            self.submit_button.setEnabled(True)           
+            self.log("Please enter an instruction.")
             return
 
-        self.overlay.show()  
-        self.overlay.setGeometry(0, 0, self.width(), self.height())  
-        self.overlay.show()  
-        self.repaint()  
-
-        self.log("Generating command from AI...")
-
-        self.command_thread = CommandThread(instruction, self.config)
-        self.command_thread.result_ready.connect(self.on_command_done)
-        self.command_thread.error_signal.connect(self.on_command_error)
-        self.command_thread.start()
\ No newline at end of file
+        job = self.jobs.submit(instruction, bypass_cache=self.bypass_cache_box.isChecked())
+        self.log(f"Generating command from AI... (job #{job.id})")
+        self.input_box.clear()
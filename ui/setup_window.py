@@ -1,21 +1,36 @@
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTextEdit, QPushButton, 
-                           QComboBox, QLineEdit, QStackedWidget, QHBoxLayout, QFrame, QMessageBox)
+                           QComboBox, QLineEdit, QStackedWidget, QHBoxLayout, QFrame, QMessageBox,
+                           QListWidget, QListWidgetItem, QProgressBar)
 from PyQt5.QtCore import QThread, pyqtSignal, Qt, QTimer
 from PyQt5.QtGui import QPixmap, QFont
 from core import ollama_installer  
-from ui.main_window import MainWindow
-from core.api_client import LLMClient   
+from core.ollama_client import OllamaError, format_bytes, get_model_manager
 from PyQt5.QtWidgets import QApplication 
 from core.db import APIKeyDB 
 
+MODEL_CHOICES = ["llama2", "codellama", "mistral", "gemma:2b"]
+
+class ModelInfoThread(QThread):
+    """Fetch the local model list and sizes without blocking the setup window"""
+    info_signal = pyqtSignal(list)
+
+    def run(self):
+        try:
+            self.info_signal.emit(get_model_manager().footprint())
+        except OllamaError:
+            self.info_signal.emit([])
+
 class PullModelThread(QThread):
     log_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(object)
     finished_signal = pyqtSignal()
 
-    def __init__(self, model_name):
+    def __init__(self, model_name, keep_alive=ollama_installer.DEFAULT_KEEP_ALIVE, extra_models=None):
         super().__init__()
         self.model_name = model_name
+        self.keep_alive = keep_alive
+        self.extra_models = [name for name in (extra_models or []) if name != model_name]
 
     def log_callback(self, message):
         self.log_signal.emit(message)
@@ -24,10 +39,23 @@ class PullModelThread(QThread):
         if not ollama_installer.is_ollama_installed():
             self.log_callback("🔍 Ollama not found. Installing...\n")
             ollama_installer.install_ollama(self.log_callback)
+        if not ollama_installer.ensure_server(self.log_callback):
+            self.log_callback("❌ The Ollama server is not reachable.")
+            self.finished_signal.emit()
+            return
 
-        self.log_callback(f"\n📦 Preparing model '{self.model_name}'...\n")
-        ollama_installer.pull_model(self.model_name, self.log_callback)
+        models = [self.model_name] + self.extra_models
+        self.log_callback(f"\n📦 Preparing {', '.join(models)}...\n")
+        ollama_installer.pull_models(models, self.log_callback, on_progress=self.progress_signal.emit)
 
+        self.log_callback(f"🔥 Loading '{self.model_name}' into memory (keep_alive={self.keep_alive})...")
+        try:
+            timings = ollama_installer.preload_model(self.model_name, self.keep_alive)
+            self.log_callback(f"✅ Model loaded in {timings['load_duration']:.2f}s")
+        except Exception as e:
+            self.log_callback(f"⚠️ Could not preload model: {e}")
+
+        ollama_installer.log_footprint(models, self.log_callback)
         self.finished_signal.emit()
 
 
@@ -109,9 +137,26 @@ class SetupWindow(QWidget):
         ollama_layout = QVBoxLayout()
         ollama_layout.addWidget(QLabel("Select Model:"))
         self.model_selector = QComboBox()
-        self.model_selector.addItems(["llama2", "codellama", "mistral", "gemma:2b"])
+        for name in MODEL_CHOICES:
+            self.model_selector.addItem(name, name)
         ollama_layout.addWidget(self.model_selector)
+        ollama_layout.addWidget(QLabel("Also download (pulled in parallel):"))
+        self.extra_models = QListWidget()
+        self.extra_models.setMaximumHeight(90)
+        for name in MODEL_CHOICES:
+            item = QListWidgetItem(name)
+            item.setData(Qt.UserRole, name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.extra_models.addItem(item)
+        ollama_layout.addWidget(self.extra_models)
+        self.progress_layout = QVBoxLayout()
+        ollama_layout.addLayout(self.progress_layout)
+        self.progress_bars = {}
         ollama_frame.setLayout(ollama_layout)
+        self.model_info = ModelInfoThread()
+        self.model_info.info_signal.connect(self.show_model_info)
+        self.model_info.start()
         
         groq_frame = QFrame()
         groq_frame.setStyleSheet("padding: 10px;")
@@ -161,6 +206,28 @@ class SetupWindow(QWidget):
         )
         QApplication.processEvents()
 
+    def show_model_info(self, rows):
+        """Mark models that are already installed, with their size on disk"""
+        sizes = {row["name"]: row["disk_bytes"] for row in rows}
+        for index in range(self.model_selector.count()):
+            name = self.model_selector.itemData(index)
+            size = sizes.get(name if ":" in name else f"{name}:latest")
+            if size is not None:
+                self.model_selector.setItemText(index, f"{name}  (installed, {format_bytes(size)})")
+                self.extra_models.item(index).setText(f"{name}  (installed, {format_bytes(size)})")
+
+    def show_pull_progress(self, progress):
+        bar = self.progress_bars.get(progress.model)
+        if bar is None:
+            bar = self.progress_bars[progress.model] = QProgressBar()
+            bar.setRange(0, 1000)
+            self.progress_layout.addWidget(bar)
+        if progress.total:
+            bar.setValue(int(progress.fraction * 1000))
+        elif progress.done:
+            bar.setValue(1000)
+        bar.setFormat(f"{progress.model}: {progress.error or progress.status} %p%")
+
     def on_provider_changed(self, provider):
         self.settings_stack.setCurrentIndex(0 if provider == "ollama" else 1)
         if provider == "groq":
@@ -219,9 +286,14 @@ class SetupWindow(QWidget):
         provider = self.provider_selector.currentText()
 
         if provider == "ollama":
-            model_name = self.model_selector.currentText()
-            self.thread = PullModelThread(model_name)
+            model_name = self.model_selector.currentData()
+            extra_models = [
+                self.extra_models.item(index).data(Qt.UserRole) for index in range(self.extra_models.count())
+                if self.extra_models.item(index).checkState() == Qt.Checked
+            ]
+            self.thread = PullModelThread(model_name, extra_models=extra_models)
             self.thread.log_signal.connect(self.append_log)
+            self.thread.progress_signal.connect(self.show_pull_progress)
             self.thread.finished_signal.connect(
                 lambda: self.launch_main_app(provider)
             )
@@ -235,6 +307,7 @@ class SetupWindow(QWidget):
                 return
             
             self.append_log("🔍 Validating Groq API key...")
+            from core.api_client import LLMClient
             is_valid, message = LLMClient.validate_groq_key(api_key)
             
             if not is_valid:
@@ -251,10 +324,12 @@ class SetupWindow(QWidget):
 
     def launch_main_app(self, provider):
         self.log_view.append("\nSetup complete! Launching Assistant...\n")
+        from ui.main_window import MainWindow
         config = {
             "provider": provider,
-            "model_name": self.model_selector.currentText() if provider == "ollama" else None,
-            "api_key": self.api_key_input.text() if provider == "groq" else None
+            "model_name": self.model_selector.currentData() if provider == "ollama" else None,
+            "api_key": self.api_key_input.text() if provider == "groq" else None,
+            "keep_alive": ollama_installer.DEFAULT_KEEP_ALIVE
         }
         self.main_window = MainWindow(config=config)
         self.main_window.show()
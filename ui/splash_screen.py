@@ -1,11 +1,14 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt, QTimer, QSize, QElapsedTimer
+from PyQt5.QtGui import QPixmap, QImageReader
 
 class SplashScreen(QWidget):
-    def __init__(self, on_close_callback):
+    def __init__(self, on_close_callback, min_display_ms: int = 500):
         super().__init__()
         self.on_close_callback = on_close_callback
+        self.min_display_ms = min_display_ms
+        self.shown_timer = QElapsedTimer()
+        self.shown_timer.start()
         self.setWindowTitle("AI Linux Assistant")
         self.setFixedSize(800, 750)
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
@@ -20,20 +23,18 @@ class SplashScreen(QWidget):
         self.splash_image.setMinimumSize(800, 600)  
         self.splash_image.setStyleSheet("background-color: black;")
 
-        pixmap = QPixmap("splash_screen.png")
-        scaled_pixmap = pixmap.scaled(
-            800, 600,
-            Qt.IgnoreAspectRatio,
-            Qt.SmoothTransformation
-        )
-        self.splash_image.setPixmap(scaled_pixmap)
-        self.splash_image.setScaledContents(True) 
+        reader = QImageReader("splash_screen.png")
+        reader.setScaledSize(QSize(800, 600))
+        self.splash_image.setPixmap(QPixmap.fromImage(reader.read()))
         
         layout.addWidget(self.splash_image)
         self.setLayout(layout)
-        
-        QTimer.singleShot(4000, self.close)
+
+    def finish(self, *args):
+        """Close once background warm-up is done, but not before min_display_ms"""
+        remaining = self.min_display_ms - self.shown_timer.elapsed()
+        QTimer.singleShot(max(0, remaining), self.close)
 
     def closeEvent(self, event):
         self.on_close_callback()
-        event.accept()
+        event.accept()
\ No newline at end of file
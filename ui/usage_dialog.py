@@ -0,0 +1,69 @@
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtCore import QTimer
+from core.groq_scheduler import groq_usage
+
+COLUMNS = (
+    ("Session", None),
+    ("Requests", "requests"),
+    ("Prompt tokens", "prompt_tokens"),
+    ("Completion tokens", "completion_tokens"),
+    ("Total tokens", "total_tokens"),
+    ("Queued (s)", "queued_seconds"),
+    ("429s", "rate_limited")
+)
+
+class UsageDialog(QDialog):
+    """Groq requests and tokens per session, with the budget left this minute; refreshed every second"""
+
+    def __init__(self, session_id: str, parent=None):
+        super().__init__(parent)
+        self.session_id = session_id
+        self.setWindowTitle("Groq usage")
+        self.resize(720, 300)
+        layout = QVBoxLayout()
+        self.budget_label = QLabel()
+        self.budget_label.setWordWrap(True)
+        layout.addWidget(self.budget_label)
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for title, _ in COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+
+    def refresh(self):
+        usage = groq_usage()
+        if not usage["budgets"]:
+            self.budget_label.setText("No Groq requests yet.")
+        else:
+            self.budget_label.setText("\n".join(
+                f"{budget['requests_left']}/{budget['requests_per_minute']} requests and "
+                f"{budget['tokens_left']}/{budget['tokens_per_minute']} tokens left this minute · "
+                f"{budget['queued']} queued"
+                + (f" · paused {budget['paused_seconds']}s after a rate limit" if budget["paused_seconds"] else "")
+                for budget in usage["budgets"]
+            ))
+        job_prefix = f"{self.session_id}/"
+        sessions = sorted(
+            usage["sessions"].items(),
+            key=lambda item: not (item[0] == self.session_id or item[0].startswith(job_prefix))
+        )
+        self.table.setRowCount(len(sessions))
+        for row, (session, counts) in enumerate(sessions):
+            for column, (_, key) in enumerate(COLUMNS):
+                if key is None:
+                    if session == self.session_id:
+                        text = "This window"
+                    elif session.startswith(job_prefix):
+                        text = f"This window, job {session[len(job_prefix):]}"
+                    else:
+                        text = session
+                else:
+                    text = str(counts[key])
+                self.table.setItem(row, column, QTableWidgetItem(text))